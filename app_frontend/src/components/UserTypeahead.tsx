@@ -0,0 +1,78 @@
+import { useEffect, useState } from "react";
+import { searchUsers } from "../services/authService";
+
+export interface User {
+  id: number;
+  email: string;
+  first_name: string;
+  last_name: string;
+}
+
+interface UserTypeaheadProps {
+  placeholder: string;
+  onSelect: (user: User) => void;
+}
+
+// Wait for a pause in typing before asking the server
+const SEARCH_DELAY_MS = 250;
+
+const UserTypeahead: React.FC<UserTypeaheadProps> = ({ placeholder, onSelect }) => {
+  const [query, setQuery] = useState("");
+  const [results, setResults] = useState<User[]>([]);
+
+  useEffect(() => {
+    const text = query.trim();
+    if (!text) {
+      setResults([]);
+      return;
+    }
+    let cancelled = false; // Drop answers to queries the user has typed past
+    const timer = setTimeout(async () => {
+      try {
+        const data = await searchUsers(text);
+        if (!cancelled) setResults(data);
+      } catch (error) {
+        console.error("Failed to search users:", error);
+      }
+    }, SEARCH_DELAY_MS);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  const handleSelect = (user: User) => {
+    onSelect(user);
+    setQuery("");
+    setResults([]);
+  };
+
+  return (
+    <div className="relative ml-2 inline-block">
+      <input
+        type="text"
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+        placeholder={placeholder}
+        className="p-1 border rounded text-gray-700"
+      />
+      {results.length > 0 && (
+        <ul className="absolute z-10 bg-white border rounded shadow w-full">
+          {results.map((user) => (
+            <li key={user.id}>
+              <button
+                type="button"
+                onClick={() => handleSelect(user)}
+                className="w-full text-left px-2 py-1 text-sm text-gray-700 hover:bg-gray-100"
+              >
+                {user.email}
+              </button>
+            </li>
+          ))}
+        </ul>
+      )}
+    </div>
+  );
+};
+
+export default UserTypeahead;
@@ -1,10 +1,11 @@
 import { useEffect, useState } from "react";
-import { fetchTasks, createTask, updateTasks, deleteTask, fetchComments, addTaskComment, deleteTaskComment } from "../services/taskService";
+import { fetchTasks, createTask, updateTasks, deleteTask, fetchComments, addTaskComment, deleteTaskComment, subscribeToTaskEvents } from "../services/taskService";
 import { fetchFilteredTasks } from "../services/taskFilterService"
 
 import TaskFilter from "../components/TaskFilter";
 import TaskForm from "../components/TaskForm";
-import {fetchUsers, assignTask} from "../services/authService" ;
+import UserTypeahead, { User } from "../components/UserTypeahead";
+import {assignTask} from "../services/authService" ;
 
 interface Task {
   id: number;
@@ -13,15 +14,10 @@ interface Task {
   status: string;
   due_date: string;
   category: { [key: string]: any };
-  assigned_to: { [key: string]: any },
+  assigned_to: number | null;
 
 }
 
-interface Users {
-  id: string;
-  email: string;
-}
-
 const TaskList = () => {
   const [sortBy, setSortBy] = useState<string>("due_date"); // Default sorting by due date
   const [tasks, setTasks] = useState<Task[]>([]);
@@ -32,10 +28,14 @@ const TaskList = () => {
   const [filters, setFilters] = useState<{ category_id?: string; status?: string; due_date?: string }>({});
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [editingTask, setEditingTask] = useState<Task | null>(null); // New state for editing task
-  const [users, setUsers] = useState<Users[]>([]);
+  const [assignees, setAssignees] = useState<Record<number, string>>({}); // Emails of users picked so far
   const [comments, setComments] = useState<Record<number, string[]>>({});
   const [newComment, setNewComment] = useState("");
   const [editingComment, setEditingComment] = useState(null);
+  const [changeCount, setChangeCount] = useState(0); // Bumped by the server's change feed
+
+  // Refetch when the server says something changed, instead of polling
+  useEffect(() => subscribeToTaskEvents(() => setChangeCount(count => count + 1)), []);
 
 
   useEffect(() => {
@@ -63,20 +63,7 @@ const TaskList = () => {
     };
 
     getTasks();
-  }, [filters]);
-
-  // Fetch users from API when the component mounts
-  useEffect(() => {
-    const getUsers = async () => {
-      try {
-        const data = await fetchUsers();
-        setUsers(data);
-      } catch (error) {
-        console.error("Failed to fetch users:", error);
-      }
-    };
-    getUsers();
-  }, []);
+  }, [filters, changeCount]);
 
   useEffect(() => {
     const getComments = async () => {
@@ -132,9 +119,10 @@ const TaskList = () => {
     }
   };
 
-  const handleAssignTask = async (taskId: number, selectedUser: Users) => {
+  const handleAssignTask = async (taskId: number, selectedUser: User) => {
     try {
       const updatedTask = await assignTask(taskId, selectedUser.id);
+      setAssignees(prev => ({ ...prev, [selectedUser.id]: selectedUser.email }));
       setTasks(tasks.map(t => (t.id === updatedTask.id ? updatedTask : t)));
     } catch (error) {
       alert("Failed to assign task.");
@@ -260,29 +248,15 @@ const TaskList = () => {
               {/* <p className="text-sm text-gray-500">
                 <strong>Assigned To:</strong> {task.assigned_to_id ? task.assigned_to_id.username : "Unassigned"}
               </p> */}
-              {/* Users Dropdown */}
+              {/* Assignee typeahead: searches users as you type instead of loading them all */}
               <div>
                 <label className="text-sm font-semibold block text-gray-500 font-medium">Assigned To</label>
-                <select value={task.assigned_to || ""}
-                      onChange={(e) => {
-                        const selectedUserId = e.target.value;
-                        if (selectedUserId === "") {
-                          // Optionally handle unassignment here if needed.
-                        } else {
-                          const selectedUser = users.find(user => String(user.id) === selectedUserId);
-                          if (selectedUser) {
-                            handleAssignTask(task.id, selectedUser);
-                          }
-                        }
-                      }}
-                    className="ml-2 p-1 border rounded text-gray-700">
-                    <option value="">Unassigned</option>
-                    {users.map((user) => (
-                      <option key={user.id} value={user.id}>
-                        {user.email}
-                      </option>
-                    ))}
-                 </select>
+                <UserTypeahead
+                  placeholder={task.assigned_to
+                    ? assignees[task.assigned_to] || `User #${task.assigned_to}`
+                    : "Unassigned"}
+                  onSelect={(user) => handleAssignTask(task.id, user)}
+                />
               </div>
 
               <div className="mt-3">
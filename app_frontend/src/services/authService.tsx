@@ -36,11 +36,13 @@ export const logoutUser = () => {
   localStorage.removeItem('authToken');
 };
 
-export const fetchUsers = async () => {
+// Typeahead search for users to assign tasks to (matches email or first/last name)
+export const searchUsers = async (query: string, limit: number = 10) => {
   const token = localStorage.getItem("authToken");
 
   try {
-      const response = await axios.get(`${API_URL}/user/profile/get/`, { 
+      const response = await axios.get(`${API_URL}/user/search/`, {
+          params: { q: query, limit },
           headers: {
               "Content-Type": "application/json",
               Authorization: `Bearer ${token}`,
@@ -48,7 +50,7 @@ export const fetchUsers = async () => {
       });
       return response.data;
   } catch (error) {
-      console.error("Error fetching task:", error);
+      console.error("Error searching users:", error);
       throw error;
   }
 };
@@ -20,6 +20,53 @@ export const fetchTasks = async () => {
     }
 };
 
+// A short-lived, single-use ticket for opening the event stream
+const fetchStreamTicket = async (): Promise<string> => {
+    const token = localStorage.getItem("authToken");
+    const response = await axios.post(`${API_URL}/task/events/ticket/`, null, {
+        headers: {
+            Authorization: `Bearer ${token}`,
+        },
+    });
+    return response.data.ticket;
+};
+
+// Server-Sent Events from the backend whenever the user's tasks or comments change.
+// EventSource cannot send headers, and the access token must not end up in URLs
+// (server logs, Referer), so each connection opens with a fresh ticket instead.
+export const subscribeToTaskEvents = (onChange: (event: any) => void) => {
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+    const reconnect = () => {
+        if (!closed) retry = setTimeout(connect, 3000);
+    };
+    const connect = async () => {
+        try {
+            const ticket = await fetchStreamTicket();
+            if (closed) return;
+            source = new EventSource(`${API_URL}/task/async/events/?ticket=${encodeURIComponent(ticket)}`);
+            ["task", "comment", "resync"].forEach(type =>
+                source?.addEventListener(type, (message: MessageEvent) => onChange(JSON.parse(message.data)))
+            );
+            // The ticket is spent: reconnect with a new one rather than let EventSource retry the same URL
+            source.onerror = () => {
+                source?.close();
+                reconnect();
+            };
+        } catch (error) {
+            console.error("Error opening the task event stream:", error);
+            reconnect();
+        }
+    };
+    connect();
+    return () => {
+        closed = true;
+        clearTimeout(retry);
+        source?.close();
+    };
+};
+
 export const createTask = async (taskData: any) => {
     const token = localStorage.getItem("authToken");
     console.log("Sending request with data:", JSON.stringify(taskData)); // Debug
@@ -83,7 +130,8 @@ export const fetchComments = async (taskId: number,) => {
 
         },
         });
-        return response.data;
+        // Comments are cursor-paginated, newest first; show the first page
+        return response.data.results;
     } catch (error) {
         console.error("Error fetching tasks:", error);
         throw error;
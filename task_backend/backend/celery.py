@@ -24,6 +24,26 @@ app.autodiscover_tasks()
 app.conf.beat_schedule = {
     'send-due-date-reminders': {
         'task': 'task.task_reminders.send_due_date_reminders',
-        'schedule': crontab(minute="*"),  # Run hourly
+        'schedule': crontab(minute="*"),  # Every minute; fires the reminder buckets that came due
+    },
+    'deliver-outbox': {
+        'task': 'task.outbox.deliver_outbox',
+        'schedule': crontab(minute="*"),  # Every minute; each run drains for up to TASK_OUTBOX_TIME_BUDGET seconds
+    },
+    'purge-outbox': {
+        'task': 'task.outbox.purge_outbox',
+        'schedule': crontab(hour=4, minute=0),  # Daily
+    },
+    'process-pending-avatars': {
+        'task': 'user.avatars.process_pending_avatars',
+        'schedule': crontab(minute="*/10"),  # Catches uploads whose processing job was never queued
+    },
+    'reconcile-task-counters': {
+        'task': 'task.task_counters.reconcile_task_counters',
+        'schedule': crontab(minute=15),  # Hourly; fixes any drift in the dashboard counters
+    },
+    'purge-tombstones': {
+        'task': 'task.sync.purge_tombstones',
+        'schedule': crontab(hour=3, minute=30),  # Daily
     },
 }
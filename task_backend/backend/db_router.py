@@ -0,0 +1,182 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Safe (GET/HEAD/OPTIONS) requests read from one of ``DATABASE_REPLICAS``,
+picked per request; everything else, and all code outside requests (Celery
+tasks, management commands), uses the primary. A request that writes reads
+from the primary for the rest of the request, and its user is pinned to the
+primary for ``DATABASE_PRIMARY_STICKY_SECONDS``, so a client never sees its
+own write go missing (e.g. create_task followed by list_tasks) while the
+replicas catch up. Pins live in the default cache, which must be shared
+between workers for them to hold across processes.
+
+Writes also change what other users see: assigning a task changes the
+assignee's lists, and renaming a category changes everyone's. The task-list
+cache pins the users whose list versions it bumps (``pin_users``,
+``pin_all_users``), so the first read after the bump, which caches its rows
+and ETag under the new version, comes from the primary rather than a replica
+that may not have the write yet.
+"""
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+PIN_KEY = "db-primary-pin:{}"
+ALL_USERS_PIN_KEY = PIN_KEY.format("*")
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+def sticky_seconds():
+    return getattr(settings, "DATABASE_PRIMARY_STICKY_SECONDS", 15)
+
+
+class RoutingState:
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self, replica):
+        self.replica, self.wrote = replica, False
+
+
+# The routing of the request being handled; propagates into sync_to_async threads
+current_routing = contextvars.ContextVar("db_routing", default=None)
+
+
+class ReplicaRouter:
+    """Sends reads of unpinned safe requests to their replica, everything else to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.wrote = True  # Later reads in this request must see the write
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Replicas hold the same rows as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None  # Replication copies the primary's schema; migrate only 'default'
+
+
+def _pin_keys(user_id):
+    return [ALL_USERS_PIN_KEY] if user_id is None else [ALL_USERS_PIN_KEY, PIN_KEY.format(user_id)]
+
+
+def is_pinned(user_id):
+    """Whether ``user_id`` (None for anonymous requests) must read from the primary."""
+    return bool(cache.get_many(_pin_keys(user_id)))
+
+
+async def ais_pinned(user_id):
+    return bool(await cache.aget_many(_pin_keys(user_id)))
+
+
+def pin_users(user_ids):
+    """Send the users' reads to the primary for the sticky window."""
+    if replicas() and user_ids:
+        cache.set_many({PIN_KEY.format(user_id): 1 for user_id in user_ids}, timeout=sticky_seconds())
+
+
+def pin_all_users():
+    """Send every user's reads to the primary for the sticky window."""
+    if replicas():
+        cache.set(ALL_USERS_PIN_KEY, 1, timeout=sticky_seconds())
+
+
+def recheck_pin(user_id):
+    """
+    Move the rest of a replica-routed request to the primary if ``user_id``
+    was pinned after the request started, e.g. by another request's write
+    committing while this one was in flight.
+    """
+    state = current_routing.get()
+    if state is not None and state.replica is not None and is_pinned(user_id):
+        state.replica = None
+
+
+async def arecheck_pin(user_id):
+    state = current_routing.get()
+    if state is not None and state.replica is not None and await ais_pinned(user_id):
+        state.replica = None
+
+
+def _token_user_id(request):
+    # The user a bearer token belongs to, without a database read;
+    # authentication proper happens in the view
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    raw = header[7:] if header.startswith("Bearer ") else None
+    if not raw:
+        return None
+    try:
+        return AccessToken(raw).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decides where each request reads from and pins users who wrote. Goes
+    after AuthenticationMiddleware, so session (admin) users are pinned too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replicas():
+            return self.get_response(request)
+        user_id = _token_user_id(request) or self._session_user_id(request)
+        state, token = self._start(request, is_pinned(user_id))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if state.wrote and user_id is not None:
+            pin_users([user_id])
+        return response
+
+    async def __acall__(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        user_id = _token_user_id(request)  # Async views authenticate by token only
+        state, token = self._start(request, await ais_pinned(user_id))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if state.wrote and user_id is not None:
+            await cache.aset(PIN_KEY.format(user_id), 1, timeout=sticky_seconds())
+        return response
+
+    def _session_user_id(self, request):
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return None  # Token clients; skip loading an empty session
+        user = getattr(request, "user", None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+    def _start(self, request, pinned):
+        replica = None if pinned or request.method not in SAFE_METHODS else random.choice(replicas())
+        state = RoutingState(replica)
+        return state, current_routing.set(state)
@@ -0,0 +1,279 @@
+"""
+Request instrumentation: per-endpoint latency, database and serializer
+metrics exposed for Prometheus at /metrics, plus sampled structured logging.
+
+Metrics live in process memory, so each worker exports its own numbers
+(scrape every worker, or sum them in Prometheus). /metrics answers only
+scrapers from METRICS_ALLOWED_IPS or with the METRICS_TOKEN bearer token.
+"""
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from ipaddress import ip_address, ip_network
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def metrics_enabled():
+    return getattr(settings, "METRICS_ENABLED", True)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name, self.help_text, self.buckets = name, help_text, buckets
+        self.series = {}  # label tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_names):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self.series.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                yield f"{self.name}_bucket{{{base},le=\"{bound}\"}} {cumulative}"
+            yield f"{self.name}_sum{{{base}}} {series[-1]}"
+            yield f"{self.name}_count{{{base}}} {cumulative}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name, self.help_text = name, help_text
+        self.series = {}
+
+    def inc(self, labels, value):
+        self.series[labels] = self.series.get(labels, 0) + value
+
+    def render(self, label_names):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.series.items()):
+            yield f"{self.name}{{{_labels(label_names, labels)}}} {value}"
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class Registry:
+    """The process's request metrics, labelled by URL name, method and status."""
+    LABELS = ("view", "method", "status")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.latency = Histogram("http_request_duration_seconds", "Request latency.", LATENCY_BUCKETS)
+        self.queries = Histogram("http_request_db_queries", "Database queries per request.", QUERY_COUNT_BUCKETS)
+        self.query_seconds = Counter("http_request_db_seconds_total", "Time spent in database queries.")
+        self.serializer_seconds = Counter("http_request_serializer_seconds_total",
+                                          "Time spent building response data in the views' serializer helpers.")
+        self.response_bytes = Histogram("http_response_size_bytes", "Response body size (streams excluded).",
+                                        SIZE_BUCKETS)
+
+    def record(self, labels, stats, duration, size):
+        with self._lock:
+            self.latency.observe(labels, duration)
+            self.queries.observe(labels, stats.queries)
+            self.query_seconds.inc(labels, stats.query_seconds)
+            self.serializer_seconds.inc(labels, stats.serializer_seconds)
+            if size is not None:
+                self.response_bytes.observe(labels, size)
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.latency, self.queries, self.query_seconds, self.serializer_seconds,
+                           self.response_bytes):
+                lines.extend(metric.render(self.LABELS))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+request_logger = logging.getLogger("backend.requests")
+_sampler = random.Random()  # Unaffected by anything seeding the global generator
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "serializer_seconds")
+
+    def __init__(self):
+        self.queries, self.query_seconds, self.serializer_seconds = 0, 0.0, 0.0
+
+
+# The stats of the request being handled; propagates into sync_to_async threads
+current_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Every connection, on every thread, so async views' ORM calls count too
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed_serialization():
+    """
+    Count the time spent in the block towards the request's serializer time.
+
+    Wrap the view helpers' serializing (``with timed_serialization(): ...``)
+    rather than DRF itself, so the metric covers exactly the code that builds
+    response data and serializers run untouched everywhere else.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_seconds += time.perf_counter() - started
+
+
+def _view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.route or "unnamed"
+
+
+def _response_size(response):
+    return None if response.streaming else len(response.content)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count and time, serializer time and response size
+    for every request, labelled by the URL name it resolved to. Goes first in
+    MIDDLEWARE so the timing covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = metrics_enabled()
+        if self.enabled:
+            connection_created.connect(install_query_recorder, dispatch_uid="metrics_query_recorder")
+            for connection in connections.all(initialized_only=True):  # Opened before we were loaded
+                install_query_recorder(None, connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    def _start(self):
+        stats = RequestStats()
+        return stats, current_stats.set(stats), time.perf_counter()
+
+    def _finish(self, request, response, stats, started):
+        duration = time.perf_counter() - started
+        labels = (_view_label(request), request.method, str(response.status_code))
+        if labels[0] == "metrics":
+            return  # Scrapes would otherwise dominate the numbers
+        registry.record(labels, stats, duration, _response_size(response))
+        log_sampled(request_logger, "request", view=labels[0], method=labels[1], status=labels[2],
+                    duration_ms=round(duration * 1000, 2), queries=stats.queries)
+
+
+def _allowed_networks():
+    return [ip_network(address, strict=False) for address in getattr(settings, "METRICS_ALLOWED_IPS", ())]
+
+
+def scrape_allowed(request):
+    """
+    Whether ``request`` may read /metrics: it comes from ``METRICS_ALLOWED_IPS``
+    or carries ``Authorization: Bearer <METRICS_TOKEN>`` (when one is set).
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if token and header.startswith("Bearer ") and constant_time_compare(header[7:], token):
+        return True
+    try:
+        address = ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in network for network in _allowed_networks())
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this process's request metrics, for allowed scrapers only."""
+    if not metrics_enabled():
+        raise Http404
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def log_sampled(logger, event, **fields):
+    """
+    Log ``event`` and ``fields`` as one JSON line at DEBUG, for a
+    ``REQUEST_LOG_SAMPLE_RATE`` fraction of calls.
+
+    Returns before building anything unless the logger is enabled for DEBUG,
+    so it is free to leave in hot paths.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    rate = getattr(settings, "REQUEST_LOG_SAMPLE_RATE", 0.01)
+    if rate < 1 and _sampler.random() >= rate:
+        return
+    logger.debug(json.dumps({"event": event, **fields}, default=str))
+
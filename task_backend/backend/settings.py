@@ -53,11 +53,13 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "user.CustomUser"
 
 MIDDLEWARE = [
+    "backend.metrics.MetricsMiddleware",  # First, so its timings cover the whole stack
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "backend.db_router.ReplicaRoutingMiddleware",  # After authentication, to pin session users too
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -65,6 +67,16 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "backend.urls"
 
+# Per-endpoint request metrics, served at /metrics (see backend/metrics.py)
+# to scrapers from METRICS_ALLOWED_IPS (addresses or networks), or to any
+# client sending "Authorization: Bearer <METRICS_TOKEN>" when a token is set
+METRICS_ENABLED = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+# Fraction of sampled debug log lines (logger "backend.requests" and view
+# loggers) that are written when DEBUG logging is on for them
+REQUEST_LOG_SAMPLE_RATE = 0.01
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -94,6 +106,16 @@ DATABASES = {
     }
 }
 
+# Read replicas of 'default' (backend/db_router.py). Add each as a database
+# that mirrors 'default' in tests, e.g.
+#   DATABASES['replica_1'] = {**DATABASES['default'], 'HOST': 'replica-1', 'TEST': {'MIRROR': 'default'}}
+# and list its alias below. Unpinned GET requests then read from a replica;
+# users who wrote stay on the primary for DATABASE_PRIMARY_STICKY_SECONDS,
+# which should exceed the replicas' usual lag.
+DATABASE_REPLICAS = []
+DATABASE_PRIMARY_STICKY_SECONDS = 15
+DATABASE_ROUTERS = ['backend.db_router.ReplicaRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -108,7 +130,8 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication with the user loaded through user.cache
+        'user.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -117,6 +140,66 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 5,  # Number of tasks per page
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared across workers in production:
+    # 'default': {
+    #     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+    #     'LOCATION': 'redis://localhost:6379/1',
+    # },
+}
+
+# Seconds a cached task list response lives (entries are also invalidated on writes)
+TASK_LIST_CACHE_TIMEOUT = 300
+
+# Seconds a worker trusts its in-process category table before re-checking
+# the shared invalidation counter
+TASK_CATEGORY_CACHE_TTL = 5
+
+# Seconds an authenticated user is served from the cache instead of the
+# database (0 disables); saves, password changes and logouts invalidate it
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# /user/search/ typeahead: seconds a result list is cached, and the largest ?limit
+USER_SEARCH_CACHE_TIMEOUT = 30
+USER_SEARCH_MAX_LIMIT = 50
+
+# /task/search/ results per page (?page_size=N is capped at the max)
+TASK_SEARCH_PAGE_SIZE = 20
+TASK_SEARCH_MAX_PAGE_SIZE = 100
+
+# Upper bound on create + update + delete items in one /task/bulk/ request
+TASK_BULK_MAX_OPERATIONS = 5000
+
+# Opt-in keyset pagination for task lists (?page_size=N / ?cursor=...)
+TASK_CURSOR_PAGE_SIZE = 50
+TASK_CURSOR_MAX_PAGE_SIZE = 500
+
+# Comments: task responses embed a count plus the latest few; the full thread
+# is paginated at /task/<id>/comments/
+TASK_COMMENT_PREVIEW = 3
+TASK_COMMENT_PREVIEW_MAX = 20
+TASK_COMMENT_PAGE_SIZE = 50
+TASK_COMMENT_MAX_PAGE_SIZE = 200
+
+# Task change feed (/task/async/events/). The in-process broker only reaches
+# clients connected to the same worker; use 'task.feed.RedisBroker' when
+# running several ASGI workers or nodes.
+TASK_FEED_BROKER = 'task.feed.InProcessBroker'
+TASK_FEED_REDIS_URL = 'redis://localhost:6379/2'
+TASK_FEED_HEARTBEAT = 15  # seconds
+TASK_FEED_MAX_AGE = 300  # seconds before a stream ends and the browser reconnects
+TASK_FEED_TICKET_TTL = 30  # seconds a single-use stream ticket (/task/events/ticket/) stays valid
+
+# Delta sync (/task/sync/): rows per stream and call, how far back a caught-up
+# cursor restarts to catch late commits, and how long deletions are reported
+TASK_SYNC_LIMIT = 500
+TASK_SYNC_MAX_LIMIT = 2000
+TASK_SYNC_LAG = 5  # seconds
+TASK_SYNC_TOMBSTONE_DAYS = 30
+
 AUTHENTICATION_BACKENDS = [
     'user.authentication.EmailBackend',  # Custom email backend
     'django.contrib.auth.backends.ModelBackend',  # Default backend
@@ -151,12 +234,45 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 
+# Due-date reminders: how far ahead to remind, how far back to still catch
+# tasks missed while the worker was down, and how many rows to stream per chunk
+TASK_REMINDER_LEAD_MINUTES = 60
+TASK_REMINDER_LOOKBACK_MINUTES = 24 * 60
+TASK_REMINDER_CHUNK_SIZE = 500
+# Width of the reminder schedule's time buckets; match the beat interval of
+# send_due_date_reminders (backend/celery.py)
+TASK_REMINDER_BUCKET_SECONDS = 60
+
+# Email outbox (task.outbox): emails per batch sent over one connection, how
+# long one delivery run may take, retry backoff (doubling from RETRY up to
+# MAX_RETRY seconds) and attempts before giving up, how long a worker holds
+# a claimed batch before another may retry it, and days to keep sent emails.
+# Set EMAIL_TIMEOUT too, so a hung mail server fails a batch instead of the run.
+TASK_OUTBOX_BATCH_SIZE = 100
+TASK_OUTBOX_TIME_BUDGET = 50
+TASK_OUTBOX_RETRY_SECONDS = 60
+TASK_OUTBOX_MAX_RETRY_SECONDS = 3600
+TASK_OUTBOX_MAX_ATTEMPTS = 8
+TASK_OUTBOX_LEASE_SECONDS = 300
+TASK_OUTBOX_KEEP_DAYS = 7
+
 # CELERY_TASK_ALWAYS_EAGER = True
 # CELERY_TASK_EAGER_PROPAGATES = True
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Avatars (user.avatars): square WebP thumbnails rendered in Celery, the size
+# served when a client does not ask (?avatar_size=), the largest upload
+# accepted, and the Cache-Control max-age of avatar files. Their paths are
+# content-addressed, so whatever serves MEDIA_ROOT in production can mark
+# /media/avatars/ immutable with the same max-age.
+AVATAR_SIZES = (32, 64, 128, 256)
+AVATAR_DEFAULT_SIZE = 64
+AVATAR_QUALITY = 85
+AVATAR_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+AVATAR_CACHE_MAX_AGE = 365 * 24 * 3600
+
 # DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 
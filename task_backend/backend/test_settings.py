@@ -0,0 +1,11 @@
+"""
+Settings for the test suite: the production settings plus what only tests
+use. ``manage.py test`` picks this module unless DJANGO_SETTINGS_MODULE or
+--settings says otherwise.
+"""
+from .settings import *
+
+# A second connection to the test database, for the replica routing tests
+# (task.tests.ReplicaRoutingTestCase). It is only read from when listed in
+# DATABASE_REPLICAS, which those tests do.
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
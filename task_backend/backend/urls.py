@@ -14,6 +14,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import os
+
 from django.contrib import admin
 from django.urls import path, include
 from drf_yasg.views import get_schema_view
@@ -23,6 +25,8 @@ from django.conf.urls.static import static
 
 from rest_framework import permissions
 
+from backend.metrics import metrics_view
+from user.avatars import serve_avatar
 from user.views import user_register
 
 # Configure Swagger schema view
@@ -48,8 +52,13 @@ urlpatterns = [
 
     path("user/", include("user.urls")),  # Include the user URLs
     path("task/", include("task.urls")),  # Include the user URLs
+
+    path("metrics", metrics_view, name="metrics"),  # Prometheus scrape endpoint (allowlisted, see settings)
 ]
 
 # Ensure Django serves media files in development
 if settings.DEBUG:
+    # Avatar files are content-addressed and never change; serve them cacheable for good
+    urlpatterns += static(settings.MEDIA_URL + 'avatars/', view=serve_avatar,
+                          document_root=os.path.join(settings.MEDIA_ROOT, 'avatars'))
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TaskConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "task"
+
+    def ready(self):
+        import task.signals  # Ensure signals are loaded
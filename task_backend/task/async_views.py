@@ -0,0 +1,258 @@
+import functools
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from backend.metrics import timed_serialization
+from user import cache as user_cache
+from user.authentication import AsyncJWTAuthentication
+
+from .cache import cached_task_list
+from .conditional import (alist_validators, atask_comment_validators, atask_list_validators, atask_validators,
+                          conditional_get)
+from .fast_serializers import fast_task_list
+from .feed import aredeem_ticket, get_broker
+from .models import Task, TaskComment
+from .pagination import TaskCursorPagination
+from .renderers import FastJSONRenderer
+from .serializers import TaskSerializer
+from .views import (apply_task_filters, paginated_comment_response, paginated_task_response, task_list_data,
+                    task_queryset)
+
+# Async twins of the read endpoints in views.py, for ASGI deployments
+# (backend/asgi.py). DRF's @api_view cannot wrap a coroutine, so these are
+# plain Django async views that authenticate and render the way DRF would;
+# the cache and conditional GET decorators wrap both kinds of view. Writes
+# stay on the sync views.
+
+authenticator = AsyncJWTAuthentication()
+renderer = FastJSONRenderer()  # These views render no floats
+
+
+def _render(response, request):
+    # What APIView.finalize_response does, minus content negotiation
+    if isinstance(response, Response):
+        response.accepted_renderer = renderer
+        response.accepted_media_type = renderer.media_type
+        response.renderer_context = {'request': request, 'response': response, 'view': None}
+    return response
+
+
+def _unauthorized(request, detail):
+    response = Response(detail, status=status.HTTP_401_UNAUTHORIZED)
+    response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+    return response
+
+
+async def _ticket_user(ticket):
+    user_id = await aredeem_ticket(ticket)
+    if user_id is None:
+        raise exceptions.AuthenticationFailed(_("Invalid or expired ticket."), code="invalid_ticket")
+    try:
+        user = await user_cache.aget_user(user_id)
+    except get_user_model().DoesNotExist as e:
+        raise exceptions.AuthenticationFailed(_("User not found"), code="user_not_found") from e
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return user, None
+
+
+def async_api_view(http_method_names, ticket_param=None):
+    """
+    ``@api_view`` + ``IsAuthenticated`` for ``async def`` views.
+
+    The view gets a DRF ``Request`` (so ``query_params`` and the paginator
+    work as usual) whose user was resolved by ``AsyncJWTAuthentication``.
+    With ``ticket_param``, clients that cannot set headers (``EventSource``)
+    may instead pass a ticket from ``feed.issue_ticket`` in that query
+    parameter; access tokens are never accepted in the query string.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            drf_request = Request(request)
+            if request.method not in http_method_names:
+                detail = exceptions.MethodNotAllowed(request.method).detail
+                response = Response({'detail': detail}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+                response['Allow'] = ', '.join(http_method_names)
+                return _render(response, drf_request)
+
+            try:
+                authenticated = await authenticator.aauthenticate(request)
+                if authenticated is None and ticket_param and request.GET.get(ticket_param):
+                    authenticated = await _ticket_user(request.GET[ticket_param])
+            except exceptions.AuthenticationFailed as exc:
+                detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+                return _render(_unauthorized(request, detail), drf_request)
+            if authenticated is None:
+                detail = {'detail': exceptions.NotAuthenticated.default_detail}
+                return _render(_unauthorized(request, detail), drf_request)
+
+            drf_request.user, drf_request.auth = authenticated
+            response = await view(drf_request, *args, **kwargs)
+            return _render(response, drf_request)
+
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+# Serializing queries the comment previews and touches the category cache,
+# which may reload from the database, so it runs in a worker thread rather
+# than on the event loop.
+@sync_to_async
+def serialize_tasks(request, rows):
+    return task_list_data(request, rows)
+
+
+@sync_to_async
+def serialize_task(task):
+    with timed_serialization():
+        return TaskSerializer(task).data
+
+
+async def apaginated_task_response(request, tasks):
+    """
+    Async ``paginated_task_response``; a page is one query plus serializing.
+    """
+    if not TaskCursorPagination().is_requested(request):
+        return None
+    return await sync_to_async(paginated_task_response)(request, tasks)
+
+
+async def afiltered_task_list_validators(request):
+    _, error = apply_task_filters(request, Task.objects.filter(user=request.user))
+    if error is not None:
+        return None
+    return await alist_validators(request, 'filter_tasks')
+
+
+@async_api_view(['GET'])
+@cached_task_list
+@conditional_get(atask_list_validators)
+async def list_tasks(request):
+    """
+    Retrieve all tasks for the authenticated user.
+    """
+    tasks = task_queryset(request).filter(user=request.user)
+
+    paginated = await apaginated_task_response(request, tasks)
+    if paginated is not None:
+        return paginated
+
+    rows = [row async for row in fast_task_list.values(tasks)]
+    if not rows:
+        return Response({"message": "No tasks found"}, status=status.HTTP_200_OK)
+    return Response(await serialize_tasks(request, rows), status=status.HTTP_200_OK)
+
+
+@async_api_view(['GET'])
+@conditional_get(atask_validators)
+async def retrieve_task(request, task_id):
+    """
+    Retrieve a specific task by ID.
+    """
+    try:
+        task = await task_queryset(request).aget(id=task_id, user=request.user)
+    except Task.DoesNotExist:
+        return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(await serialize_task(task), status=status.HTTP_200_OK)
+
+
+@async_api_view(['GET'])
+@cached_task_list
+@conditional_get(afiltered_task_list_validators)
+async def filter_tasks(request):
+    """
+    Retrieve tasks, optionally filtering by category and/or status.
+    """
+    tasks, error = apply_task_filters(request, task_queryset(request).filter(user=request.user))
+    if error is not None:
+        return error
+
+    paginated = await apaginated_task_response(request, tasks)
+    if paginated is not None:
+        return paginated
+
+    rows = [row async for row in fast_task_list.values(tasks)]
+    return Response(await serialize_tasks(request, rows), status=status.HTTP_200_OK)
+
+
+@async_api_view(['GET'])
+@cached_task_list
+async def get_assigned_tasks(request):
+    """
+    Get the list of tasks assigned to the currently authenticated user.
+    """
+    tasks = task_queryset(request).filter(assigned_to=request.user)
+
+    paginated = await apaginated_task_response(request, tasks)
+    if paginated is not None:
+        return paginated
+
+    rows = [row async for row in fast_task_list.values(tasks)]
+    return Response(await serialize_tasks(request, rows))
+
+
+@async_api_view(['GET'])
+@conditional_get(atask_comment_validators)
+async def task_comments(request, task_id):
+    """
+    Retrieve a task's comments, one cursor page at a time (adding one stays on the sync view).
+    """
+    if not await Task.objects.filter(id=task_id).aexists():
+        return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    comments = TaskComment.objects.filter(task_id=task_id).select_related('user')
+    return await sync_to_async(paginated_comment_response)(request, comments)
+
+
+def sse_message(data, event=None):
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def event_stream(user_id):
+    """
+    Relay the user's feed as Server-Sent Events until ``TASK_FEED_MAX_AGE``.
+
+    Waiting for events touches neither the database nor (with the
+    in-process broker) anything else; a comment line every
+    ``TASK_FEED_HEARTBEAT`` seconds keeps proxies from closing the stream.
+    Streams end after a while so abandoned ones are reclaimed; browsers
+    reconnect on their own after ``retry`` milliseconds.
+    """
+    heartbeat = getattr(settings, 'TASK_FEED_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings, 'TASK_FEED_MAX_AGE', 300)
+    async with get_broker().subscribe(user_id) as subscription:
+        yield b"retry: 3000\n\n" + sse_message({"type": "ready"}, event="ready")
+        while (remaining := deadline - time.monotonic()) > 0:
+            event = await subscription.get(timeout=min(heartbeat, remaining))
+            yield b": keepalive\n\n" if event is None else sse_message(event, event=event["type"])
+
+
+@async_api_view(['GET'], ticket_param='ticket')
+async def task_events(request):
+    """
+    Push notifications for the user's tasks and comments, as Server-Sent Events.
+    Browsers open it with a ticket from /task/events/ticket/.
+
+    Each event names what changed (``task``/``comment`` + action + ids, or
+    ``resync`` after bulk writes) so the client refetches only that instead
+    of polling the lists. ASGI only: a WSGI worker would be held for the
+    whole stream.
+    """
+    response = StreamingHttpResponse(event_stream(request.user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
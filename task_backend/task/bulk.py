@@ -0,0 +1,183 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_user_task_lists
+from .feed import resync_event
+from .models import Task
+from .search import forget_search, refresh_search
+from .sync import record_deletions
+from .task_counters import reconcile_counters
+from .serializers import BulkTaskSerializer
+from .task_reminders import schedule_reminders
+
+BATCH_SIZE = 500
+
+
+class BulkPayloadError(ValueError):
+    """The batch as a whole is malformed (as opposed to a single bad item)."""
+
+
+def max_operations():
+    return getattr(settings, 'TASK_BULK_MAX_OPERATIONS', 5000)
+
+
+def _parse_payload(payload):
+    if not isinstance(payload, dict):
+        raise BulkPayloadError("Expected an object with 'create', 'update' and/or 'delete' lists.")
+    sections = {}
+    for key in ('create', 'update', 'delete'):
+        items = payload.get(key, [])
+        if not isinstance(items, list):
+            raise BulkPayloadError(f"'{key}' must be a list.")
+        sections[key] = items
+    total = sum(len(items) for items in sections.values())
+    if total == 0:
+        raise BulkPayloadError("No operations given.")
+    if total > max_operations():
+        raise BulkPayloadError(f"Too many operations ({total}); the limit is {max_operations()}.")
+    return sections['create'], sections['update'], sections['delete']
+
+
+def _as_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _error(message, field='id'):
+    return {'status': 'error', 'errors': {field: [message]}}
+
+
+def _validate(items, context, partial=False):
+    serializer = BulkTaskSerializer(data=items, many=True, partial=partial, context=context)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data, serializer.item_errors
+
+
+def apply_bulk_operations(user, payload):
+    """
+    Create, update and delete many of ``user``'s tasks in one transaction.
+
+    Items are validated in one pass per section with ``BulkTaskSerializer``
+    (related ids are checked against preloaded sets, not per-item queries),
+    then written with ``bulk_create``, ``bulk_update`` and ``QuerySet.delete()``
+    (one ``DELETE ... WHERE id IN (...)`` per related table). Invalid items are reported and skipped;
+    the valid ones are applied together. Returns per-item results in input
+    order for each section.
+    """
+    creates, updates, deletes = _parse_payload(payload)
+    results = {'create': [None] * len(creates), 'update': [None] * len(updates), 'delete': [None] * len(deletes)}
+
+    update_ids, update_data = [], []
+    for index, item in enumerate(updates):
+        task_id = _as_id(item.get('id')) if isinstance(item, dict) else None
+        if task_id is None:
+            results['update'][index] = _error('A valid task id is required.')
+        else:
+            update_ids.append((index, task_id))
+            update_data.append({key: value for key, value in item.items() if key != 'id'})
+
+    # One query for every user referenced by assigned_to in the batch
+    referenced = {
+        _as_id(item.get('assigned_to'))
+        for item in creates + update_data
+        if isinstance(item, dict) and item.get('assigned_to') is not None
+    }
+    known_user_ids = set(
+        get_user_model().objects.filter(id__in=referenced - {None}).values_list('id', flat=True)
+    ) if referenced else set()
+    context = {'known_user_ids': known_user_ids}
+
+    create_validated, create_errors = _validate(creates, context)
+    update_validated, update_errors = _validate(update_data, context, partial=True)
+
+    touched_user_ids = {user.id}
+    with transaction.atomic():
+        # Creates
+        new_tasks, new_indexes = [], []
+        for index, (data, errors) in enumerate(zip(create_validated, create_errors)):
+            if errors:
+                results['create'][index] = {'status': 'error', 'errors': errors}
+                continue
+            new_tasks.append(Task(user=user, **data))
+            new_indexes.append(index)
+        Task.objects.bulk_create(new_tasks, batch_size=BATCH_SIZE)
+        for index, task in zip(new_indexes, new_tasks):
+            results['create'][index] = {'status': 'created', 'id': task.id}
+            touched_user_ids.add(task.assigned_to_id)
+
+        # Updates
+        existing = Task.objects.filter(user=user).select_for_update().in_bulk(
+            [task_id for _, task_id in update_ids]
+        ) if update_ids else {}
+        changed, fields = {}, {'updated_at'}
+        now = timezone.now()
+        for (index, task_id), data, errors in zip(update_ids, update_validated, update_errors):
+            task = existing.get(task_id)
+            if task is None:
+                results['update'][index] = _error('Task not found.')
+                continue
+            if errors:
+                results['update'][index] = {'status': 'error', 'errors': errors}
+                continue
+            touched_user_ids.add(task.assigned_to_id)  # The previous assignee
+            if 'due_date' in data and data['due_date'] != task.due_date:
+                task.reminder_sent_at = None  # A new due date needs a new reminder
+                fields.add('reminder_sent_at')
+            for attr, value in data.items():
+                setattr(task, attr, value)
+                fields.add(attr)
+            task.updated_at = now  # bulk_update skips auto_now
+            changed[task.id] = task
+            touched_user_ids.add(task.assigned_to_id)
+            results['update'][index] = {'status': 'updated', 'id': task.id}
+        if changed:
+            Task.objects.bulk_update(list(changed.values()), sorted(fields), batch_size=BATCH_SIZE)
+
+        # bulk_create/bulk_update skip the signals that keep search data current
+        searchable_changed = changed if fields & {'title', 'description'} else {}
+        refresh_search([task.id for task in new_tasks] + list(searchable_changed))
+        # ... and the reminder schedule
+        schedule_reminders(new_tasks, created=True)
+        if fields & set(Task.REMINDER_FIELDS):
+            schedule_reminders(changed.values())
+
+        # Deletes
+        delete_ids = {}
+        for index, value in enumerate(deletes):
+            task_id = _as_id(value)
+            if task_id is None:
+                results['delete'][index] = _error('A valid task id is required.')
+            else:
+                delete_ids.setdefault(task_id, []).append(index)
+        owned = dict(
+            Task.objects.filter(user=user, id__in=delete_ids).values_list('id', 'assigned_to_id')
+        ) if delete_ids else {}
+        if owned:
+            # Django cascades to whatever references a task; the per-row
+            # delete handlers see the bulk origin and leave their upkeep to
+            # the set-wise calls here and below (see task.signals).
+            doomed = Task.objects.filter(id__in=owned)
+            doomed.bulk = True
+            doomed.delete()
+            touched_user_ids.update(owned.values())
+            forget_search(owned)
+            record_deletions('task', owned, user.id)
+        for task_id, indexes in delete_ids.items():
+            for index in indexes:
+                if task_id in owned:
+                    results['delete'][index] = {'status': 'deleted', 'id': task_id}
+                else:
+                    results['delete'][index] = _error('Task not found.')
+
+        # Dashboard counters are signal-maintained too; recount who was touched
+        reconcile_counters(touched_user_ids)
+        resync_event(touched_user_ids)
+
+    invalidate_user_task_lists(*touched_user_ids)
+    return results
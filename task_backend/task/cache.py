@@ -0,0 +1,245 @@
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from backend.db_router import arecheck_pin, pin_all_users, pin_users, recheck_pin
+
+# Every cached list lives under the owner's version counter (plus a global one
+# for things shared by all users, like category names). Writes never delete
+# entries; they bump the counter so old keys are simply never read again and
+# age out of the cache on their own.
+VERSION_KEY = "task-list-version:{}"
+GLOBAL_VERSION_KEY = "task-list-version:global"
+ENTRY_KEY = "task-list:{view}:{user_id}:{user_version}:{global_version}:{params}"
+
+
+def get_cache():
+    return caches[getattr(settings, "TASK_LIST_CACHE_ALIAS", "default")]
+
+
+class CacheStats:
+    """Process-local hit/miss counters for the task list cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+stats = CacheStats()
+
+
+def _fresh_version():
+    # A lost counter (eviction, restart) must never come back as a value that
+    # was already used, or stale entries would be served again.
+    return time.time_ns()
+
+
+def _current_versions(cache, user_id):
+    user_key = VERSION_KEY.format(user_id)
+    versions = cache.get_many([user_key, GLOBAL_VERSION_KEY])
+    for key in (user_key, GLOBAL_VERSION_KEY):
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions[user_key], versions[GLOBAL_VERSION_KEY]
+
+
+async def _acurrent_versions(cache, user_id):
+    user_key = VERSION_KEY.format(user_id)
+    versions = await cache.aget_many([user_key, GLOBAL_VERSION_KEY])
+    for key in (user_key, GLOBAL_VERSION_KEY):
+        if key not in versions:
+            await cache.aadd(key, _fresh_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return versions[user_key], versions[GLOBAL_VERSION_KEY]
+
+
+def list_versions(user_id):
+    """
+    ``(user_version, global_version)``: they key ``user_id``'s cached lists
+    and change with every write those lists show.
+    """
+    return _current_versions(get_cache(), user_id)
+
+
+async def alist_versions(user_id):
+    """Async ``list_versions``."""
+    return await _acurrent_versions(get_cache(), user_id)
+
+
+def _bump(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def _bump_on_commit(keys, pin):
+    # A reader that misses on the new version before the write commits would
+    # cache the old rows under it; bump once the rows are visible instead.
+    # A lagging replica would hand them the old rows too, so the affected
+    # users are first pinned to the primary (``pin``), before any reader can
+    # see the new version. Outside a transaction this runs right away.
+    def bump():
+        pin()
+        cache = get_cache()
+        for key in keys:
+            _bump(cache, key)
+
+    if keys:
+        transaction.on_commit(bump)
+
+
+def invalidate_user_task_lists(*user_ids):
+    """
+    Drop every cached task list of the given users (None ids are ignored)
+    once the current transaction commits.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    _bump_on_commit({VERSION_KEY.format(user_id) for user_id in user_ids}, lambda: pin_users(user_ids))
+
+
+def invalidate_task(task, *extra_user_ids):
+    """Drop the cached lists a task shows up in: its owner's and its assignee's."""
+    invalidate_user_task_lists(task.user_id, task.assigned_to_id, *extra_user_ids)
+
+
+def invalidate_all_task_lists():
+    """Drop every cached task list, e.g. after a category rename (on commit)."""
+    _bump_on_commit({GLOBAL_VERSION_KEY}, pin_all_users)
+
+
+def normalize_params(query_params):
+    items = sorted((key, sorted(values)) for key, values in query_params.lists())
+    return hashlib.sha1(repr(items).encode()).hexdigest()
+
+
+def _entry_key(view, request, user_version, global_version):
+    return ENTRY_KEY.format(
+        view=view.__name__,
+        user_id=request.user.id,
+        user_version=user_version,
+        global_version=global_version,
+        params=normalize_params(request.query_params),
+    )
+
+
+def _refresh_categories():
+    # Lists embed category names from the in-process category cache, which
+    # only rechecks its generation every few seconds. A category change bumps
+    # that generation before the global list version, so rechecking it here
+    # keeps a rebuild from storing old names under the new version.
+    from .category_cache import category_cache
+
+    category_cache.refresh()
+
+
+def _entry(response):
+    entry = {"data": response.data}
+    # Keep validators set by @conditional_get so cached polls can 304
+    for header in ("ETag", "Last-Modified"):
+        if response.has_header(header):
+            entry[header] = response[header]
+    return entry
+
+
+def _cached_response(request, entry):
+    etag = entry.get("ETag")
+    last_modified = entry.get("Last-Modified")
+    response = None
+    if etag or last_modified:
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified and parse_http_date_safe(last_modified),
+        )
+    if response is None:
+        response = Response(entry["data"], status=status.HTTP_200_OK)
+    for header in ("ETag", "Last-Modified"):
+        if header in entry:
+            response[header] = entry[header]
+    if etag or last_modified:
+        patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def cached_task_list(view):
+    """
+    Cache a GET task list view per user and normalized query string.
+
+    Goes under ``@api_view``/``@permission_classes`` so it only ever sees
+    authenticated DRF requests. A hit skips the database and the serializer,
+    and if the view sets validators (``@conditional_get`` below this
+    decorator) a hit whose ETag matches answers 304 without any query.
+    Async views are wrapped with the cache's async API; entries are keyed by
+    view name, so a sync view and its async twin share them.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return await view(request, *args, **kwargs)
+
+            cache = get_cache()
+            key = _entry_key(view, request, *await _acurrent_versions(cache, request.user.id))
+            cached = await cache.aget(key)
+            if cached is not None:
+                stats.record(hit=True)
+                return _cached_response(request, cached)
+
+            stats.record(hit=False)
+            await arecheck_pin(request.user.id)  # The rows cached under this version must be current
+            await sync_to_async(_refresh_categories)()
+            response = await view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                await cache.aset(key, _entry(response), timeout=getattr(settings, "TASK_LIST_CACHE_TIMEOUT", 300))
+            return response
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != "GET":
+            return view(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = _entry_key(view, request, *_current_versions(cache, request.user.id))
+        cached = cache.get(key)
+        if cached is not None:
+            stats.record(hit=True)
+            return _cached_response(request, cached)
+
+        stats.record(hit=False)
+        recheck_pin(request.user.id)  # The rows cached under this version must be current
+        _refresh_categories()
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, _entry(response), timeout=getattr(settings, "TASK_LIST_CACHE_TIMEOUT", 300))
+        return response
+
+    return wrapper
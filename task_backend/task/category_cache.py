@@ -0,0 +1,139 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .cache import get_cache
+
+# Bumped in the shared cache whenever a category changes, so every worker
+# notices within one TTL without talking to the database.
+GENERATION_KEY = "category-cache-generation"
+
+# Unknown ids remembered per generation; past this many the set starts over
+MAX_MISSING = 1024
+
+
+class CategoryCache:
+    """
+    In-process, read-through copy of the Category table (id -> row dict).
+
+    Categories are few and change rarely, so the whole table is loaded with a
+    single query and kept in memory. After ``ttl`` seconds a worker re-checks
+    the shared generation counter (one cache read) and reloads only if some
+    worker has saved or deleted a category since. Ids that are not in the
+    table are remembered until the generation changes, so lookups of bogus
+    ids cost nothing either.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._rows = None
+        self._missing = set()
+        self._generation = None
+        self._checked_at = 0.0
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "TASK_CATEGORY_CACHE_TTL", 5)
+
+    def get(self, category_id):
+        """Return ``{'id', 'name', 'description'}`` for a category, or None."""
+        if category_id is None:
+            return None
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            return None
+        rows = self._load()
+        row = rows.get(category_id)
+        if row is None and category_id not in self._missing:
+            # Possibly created on another worker within the last TTL, which
+            # bumped the generation; otherwise it does not exist
+            rows = self._load(recheck=True)
+            row = rows.get(category_id)
+            if row is None:
+                self._remember_missing(rows, category_id)
+        return dict(row) if row is not None else None
+
+    def all(self):
+        """Every category as a row dict, ordered by id."""
+        return [dict(row) for row in self._load().values()]
+
+    def generation(self):
+        """The shared generation counter; changes whenever any category does."""
+        return self._shared_generation()
+
+    async def ageneration(self):
+        """``generation()`` through the cache's async API."""
+        shared = get_cache()
+        generation = await shared.aget(GENERATION_KEY)
+        if generation is None:
+            await shared.aadd(GENERATION_KEY, time.time_ns(), timeout=None)
+            generation = await shared.aget(GENERATION_KEY)
+        return generation
+
+    def refresh(self):
+        """Reload now, rather than within the TTL, if the shared generation moved."""
+        self._load(recheck=True)
+
+    def invalidate(self):
+        """
+        Forget the local copy and tell the other workers to do the same, once
+        the current transaction commits (right away outside one).
+        """
+        # A worker reloading before the commit would keep the old rows under
+        # the new generation until the next change
+        transaction.on_commit(self._bump)
+
+    def _bump(self):
+        shared = get_cache()
+        try:
+            shared.incr(GENERATION_KEY)
+        except ValueError:
+            shared.set(GENERATION_KEY, time.time_ns(), timeout=None)
+        with self._lock:
+            self._rows = None
+
+    def _shared_generation(self):
+        shared = get_cache()
+        generation = shared.get(GENERATION_KEY)
+        if generation is None:
+            shared.add(GENERATION_KEY, time.time_ns(), timeout=None)
+            generation = shared.get(GENERATION_KEY)
+        return generation
+
+    def _remember_missing(self, rows, category_id):
+        with self._lock:
+            if self._rows is not rows:
+                return  # Reloaded in between; the id may exist now
+            if len(self._missing) >= MAX_MISSING:
+                self._missing.clear()
+            self._missing.add(category_id)
+
+    def _load(self, recheck=False):
+        """The rows, reloaded if the shared generation moved (checked every TTL, or now if ``recheck``)."""
+        rows = self._rows
+        if not recheck and rows is not None and time.monotonic() - self._checked_at < self.ttl:
+            return rows
+
+        with self._lock:
+            if not recheck and self._rows is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._rows
+            generation = self._shared_generation()
+            if self._rows is None or generation != self._generation:
+                from .models import Category
+
+                # From the primary: a lagging replica would pin stale rows to the new generation
+                categories = Category.objects.using(DEFAULT_DB_ALIAS).order_by("id")
+                self._rows = {row["id"]: row for row in categories.values("id", "name", "description")}
+                self._missing = set()
+                self._generation = generation
+            self._checked_at = time.monotonic()
+            return self._rows
+
+
+category_cache = CategoryCache()
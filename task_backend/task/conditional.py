@@ -0,0 +1,193 @@
+import asyncio
+import functools
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import alist_versions, list_versions, normalize_params
+from .category_cache import category_cache
+from .models import Task
+
+
+def _not_modified(request, validators):
+    etag, last_modified = validators
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp), etag, timestamp
+
+
+def _set_validators(response, etag, timestamp):
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def conditional_get(compute_validators):
+    """
+    Answer GETs with ``304 Not Modified`` when the client's copy is current.
+
+    ``compute_validators(request, *args, **kwargs)`` returns ``(etag,
+    last_modified)`` from cache reads or one cheap query, or None to skip the check
+    (e.g. the object does not exist and the view should answer 404). Goes
+    under ``@api_view``/``@permission_classes`` so the user is authenticated.
+    Async views take async validators (see ``alist_validators``).
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await view(request, *args, **kwargs)
+
+                validators = await compute_validators(request, *args, **kwargs)
+                if validators is None:
+                    return await view(request, *args, **kwargs)
+                response, etag, timestamp = _not_modified(request, validators)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                return _set_validators(response, etag, timestamp)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            validators = compute_validators(request, *args, **kwargs)
+            if validators is None:
+                return view(request, *args, **kwargs)
+            response, etag, timestamp = _not_modified(request, validators)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return _set_validators(response, etag, timestamp)
+
+        return wrapper
+
+    return decorator
+
+
+def _make_etag(request, *parts):
+    # Same rows but a different filter, page or user must not share a validator
+    raw = ':'.join(str(part) for part in (request.user.id, normalize_params(request.query_params)) + parts)
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+TASK_STATS = {
+    'task_count': Count('id', distinct=True),
+    'last_updated': Max('updated_at'),
+    'comment_count': Count('comments'),
+    'last_comment': Max('comments__timestamp'),
+}
+COMMENT_STATS = {
+    'task_count': Count('id', distinct=True),
+    'comment_count': Count('comments'),
+    'last_comment': Max('comments__timestamp'),
+}
+
+
+def _task_validators(request, stats, category_generation):
+    last_modified = _latest(stats['last_updated'], stats['last_comment'])
+    etag = _make_etag(
+        request,
+        stats['task_count'],
+        stats['last_updated'] and stats['last_updated'].isoformat(),
+        stats['comment_count'],
+        stats['last_comment'] and stats['last_comment'].isoformat(),
+        category_generation,
+    )
+    return etag, last_modified
+
+
+def _comment_validators(request, task_id, stats):
+    if not stats['task_count']:
+        return None
+    etag = _make_etag(
+        request,
+        task_id,
+        stats['comment_count'],
+        stats['last_comment'] and stats['last_comment'].isoformat(),
+    )
+    return etag, stats['last_comment']
+
+
+def validators_for_tasks(request, tasks):
+    """
+    Validators for a single rendered task (``tasks`` filtered to its id).
+
+    Row counts catch deletes, max(updated_at) catches edits and assignments,
+    comment count/max(timestamp) catch comment writes, and the category
+    generation catches renames of embedded categories. The aggregate joins
+    the task's comments, so lists use ``list_validators`` instead.
+    Last-Modified cannot see deletes, so clients should send the ETag too;
+    If-None-Match takes precedence over If-Modified-Since.
+    """
+    stats = tasks.order_by().aggregate(**TASK_STATS)
+    return _task_validators(request, stats, category_cache.generation())
+
+
+async def avalidators_for_tasks(request, tasks):
+    """Async twin of ``validators_for_tasks`` for the ASGI read path."""
+    stats = await tasks.order_by().aaggregate(**TASK_STATS)
+    return _task_validators(request, stats, await category_cache.ageneration())
+
+
+def list_validators(request, view_name):
+    """
+    Validators for one of the user's task lists, from the list cache's
+    version counters (task.cache): every write that shows up in the user's
+    lists bumps them, so an unchanged poll costs two cache reads and no
+    query however many tasks and comments the user has. Lists get no
+    Last-Modified; the versions are not timestamps.
+    """
+    return _make_etag(request, view_name, *list_versions(request.user.id)), None
+
+
+async def alist_validators(request, view_name):
+    return _make_etag(request, view_name, *await alist_versions(request.user.id)), None
+
+
+def task_list_validators(request):
+    return list_validators(request, 'list_tasks')
+
+
+async def atask_list_validators(request):
+    return await alist_validators(request, 'list_tasks')
+
+
+def task_validators(request, task_id):
+    tasks = Task.objects.filter(id=task_id, user=request.user)
+    etag, last_modified = validators_for_tasks(request, tasks)
+    if last_modified is None:
+        return None  # Not found; let the view answer 404
+    return etag, last_modified
+
+
+async def atask_validators(request, task_id):
+    tasks = Task.objects.filter(id=task_id, user=request.user)
+    etag, last_modified = await avalidators_for_tasks(request, tasks)
+    if last_modified is None:
+        return None
+    return etag, last_modified
+
+
+def task_comment_validators(request, task_id):
+    stats = Task.objects.filter(id=task_id).aggregate(**COMMENT_STATS)
+    return _comment_validators(request, task_id, stats)
+
+
+async def atask_comment_validators(request, task_id):
+    stats = await Task.objects.filter(id=task_id).aaggregate(**COMMENT_STATS)
+    return _comment_validators(request, task_id, stats)
@@ -0,0 +1,197 @@
+import asyncio
+import contextlib
+import json
+import logging
+import secrets
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Per-user change feed: signals publish small "what changed" events, the SSE
+# endpoint (async_views.task_events) relays them to the user's open tabs,
+# which then refetch only what they show. Events carry ids, never task data,
+# so a stale or dropped event costs a refetch, not a wrong screen.
+
+CHANNEL = "task-feed:{}"
+TICKET_KEY = "task-feed-ticket:{}"
+
+# Sent instead of the events a slow subscriber could not keep up with
+RESYNC = {"type": "resync"}
+
+
+def _queue_size():
+    return getattr(settings, "TASK_FEED_QUEUE_SIZE", 100)
+
+
+class InProcessSubscription:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=_queue_size())
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """The next event, or None if there was none within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """
+    Pub/sub inside one process: for tests, development and single-worker
+    deployments. Publishers may run on any thread (sync views, Celery
+    tasks); events are handed to each subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)  # user_id -> {InProcessSubscription}
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            subscriptions = [sub for user_id in set(user_ids) for sub in self._subscriptions.get(user_id, ())]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                pass  # Its loop is closed; the subscription is on its way out
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, user_id):
+        subscription = InProcessSubscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions[user_id].discard(subscription)
+                if not self._subscriptions[user_id]:
+                    del self._subscriptions[user_id]
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+
+class RedisBroker:
+    """
+    Pub/sub over Redis channels (one per user), so events published on any
+    web or Celery worker reach subscribers on every ASGI node. Needs the
+    ``redis`` package, which the Celery broker already pulls in.
+    """
+
+    def __init__(self, url=None):
+        self.url = url or getattr(settings, "TASK_FEED_REDIS_URL", "redis://localhost:6379/0")
+        self._client = None
+
+    def publish(self, user_ids, event):
+        import redis
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        payload = json.dumps(event)
+        pipeline = self._client.pipeline(transaction=False)
+        for user_id in set(user_ids):
+            pipeline.publish(CHANNEL.format(user_id), payload)
+        try:
+            pipeline.execute()
+        except redis.RedisError as e:
+            # Clients miss a nudge and catch up on their next fetch; the write stands
+            logging.warning(f"Could not publish task feed event: {e}")
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, user_id):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(CHANNEL.format(user_id))
+        try:
+            yield RedisSubscription(pubsub)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_brokers = {}
+
+
+def get_broker():
+    """The broker named by ``TASK_FEED_BROKER`` (one instance per process)."""
+    path = getattr(settings, "TASK_FEED_BROKER", "task.feed.InProcessBroker")
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
+
+
+def publish(user_ids, event):
+    """
+    Send ``event`` to these users' feeds once the current transaction
+    commits, so a client never refetches before the change is visible.
+    None ids are ignored.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: get_broker().publish(user_ids, event))
+
+
+def task_event(action, task, *extra_user_ids):
+    """Tell the task's owner and assignee (and e.g. a previous assignee) that it changed."""
+    publish({task.user_id, task.assigned_to_id, *extra_user_ids}, {"type": "task", "action": action, "id": task.id})
+
+
+def comment_event(action, comment, task):
+    publish({task.user_id, task.assigned_to_id},
+            {"type": "comment", "action": action, "id": comment.id, "task": task.id})
+
+
+def resync_event(user_ids):
+    """For bulk writes: tell these users to refetch rather than send one event per row."""
+    publish(user_ids, RESYNC)
+
+
+# EventSource cannot send an Authorization header, so the stream is opened
+# with a ticket in the query string instead of the access token: query
+# strings end up in access logs and Referer headers, and a ticket found there
+# is already spent or about to expire. Tickets live in the default cache,
+# which must be shared between workers.
+
+def ticket_ttl():
+    return getattr(settings, "TASK_FEED_TICKET_TTL", 30)
+
+
+def issue_ticket(user_id):
+    """A single-use ticket that opens ``user_id``'s stream within ``TASK_FEED_TICKET_TTL`` seconds."""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(TICKET_KEY.format(ticket), user_id, timeout=ticket_ttl())
+    return ticket
+
+
+async def aredeem_ticket(ticket):
+    """The user id ``ticket`` was issued to, or None if it is unknown, expired or already used."""
+    key = TICKET_KEY.format(ticket)
+    user_id = await cache.aget(key)
+    # Of two concurrent redeemers only one deletes the key
+    if user_id is None or not await cache.adelete(key):
+        return None
+    return user_id
@@ -0,0 +1,233 @@
+import csv
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from .cache import invalidate_user_task_lists
+from .feed import resync_event
+from .models import Category, Task, TaskComment
+from .search import refresh_search
+from .task_counters import reconcile_counters
+from .serializers import TaskSerializer
+from .task_reminders import schedule_reminders
+
+FORMATS = ('ndjson', 'csv')
+
+
+class RowRejected(ValueError):
+    pass
+
+
+def read_rows(stream, input_format):
+    """Yield ``(line_number, row_dict_or_None, raw)`` one record at a time."""
+    if input_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, line
+            continue
+        yield line_number, row if isinstance(row, dict) else None, line
+
+
+class TaskImporter:
+    """
+    Insert tasks (and their comments) from NDJSON/CSV in large batches.
+
+    Rows are validated with the same rules as ``TaskSerializer.validate_title``
+    and ``validate_status``. Owners, assignees and comment authors are
+    resolved by email (or id) through an in-memory map that is filled with
+    one query per chunk for the users it has not seen yet. Categories are resolved
+    by name from a map loaded once. Each chunk goes in with one
+    ``bulk_create`` for tasks and one for comments, inside its own
+    transaction. Rejected rows are written to ``rejects`` as NDJSON.
+    """
+
+    def __init__(self, default_owner=None, chunk_size=5000, create_categories=False, rejects=None):
+        self.default_owner = default_owner
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.rejects = rejects
+        self.validator = TaskSerializer()
+        self.user_ids = {}  # lowercased email -> id
+        self.known_ids = set()
+        if default_owner is not None:
+            self.user_ids[default_owner.email.lower()] = default_owner.id
+            self.known_ids.add(default_owner.id)
+        self.category_ids = {name: pk for pk, name in Category.objects.values_list('id', 'name')}
+        self.touched_user_ids = set()
+        self.read = self.imported = self.rejected = self.comments = 0
+        self.started = None
+
+    def run(self, rows):
+        self.started = time.monotonic()
+        chunk = []
+        for record in rows:
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        reconcile_counters(self.touched_user_ids)  # bulk_create skips the counter signals
+        invalidate_user_task_lists(*self.touched_user_ids)
+        resync_event(self.touched_user_ids)
+        return self.summary()
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9) if self.started else 0
+        return {
+            'read': self.read,
+            'imported': self.imported,
+            'rejected': self.rejected,
+            'comments': self.comments,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(self.read / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def _reject(self, line_number, raw, error):
+        self.rejected += 1
+        if self.rejects is not None:
+            self.rejects.write(json.dumps({'line': line_number, 'error': str(error), 'row': raw}, default=str) + '\n')
+
+    def _resolve_users(self, chunk):
+        wanted = set()
+        for _, row, _ in chunk:
+            if row is None:
+                continue
+            for key in ('user', 'assigned_to'):
+                if row.get(key):
+                    wanted.add(str(row[key]).strip())
+            for comment in self._comments_of(row):
+                if isinstance(comment, dict) and comment.get('user'):
+                    wanted.add(str(comment['user']).strip())
+        # Exports carry assignees as ids, other trackers as emails; take both
+        ids = {int(value) for value in wanted if value.isdigit()} - self.known_ids
+        emails = {value.lower() for value in wanted if not value.isdigit()} - set(self.user_ids)
+        if ids or emails:
+            users = get_user_model().objects.annotate(email_lower=Lower('email')).filter(
+                Q(email_lower__in=emails) | Q(id__in=ids)
+            )
+            for pk, email in users.values_list('id', 'email'):
+                self.user_ids[email.lower()] = pk
+                self.known_ids.add(pk)
+
+    def _comments_of(self, row):
+        comments = row.get('comments') or []
+        if isinstance(comments, str):
+            # CSV carries comments as a JSON array in one column
+            try:
+                comments = json.loads(comments)
+            except ValueError:
+                return []
+        return comments if isinstance(comments, list) else []
+
+    def _user_id(self, value, field):
+        value = str(value).strip()
+        if value.isdigit():
+            user_id = int(value) if int(value) in self.known_ids else None
+        else:
+            user_id = self.user_ids.get(value.lower())
+        if user_id is None:
+            raise RowRejected(f"{field}: unknown user {value!r}")
+        return user_id
+
+    def _category_id(self, name):
+        if name in self.category_ids:
+            return self.category_ids[name]
+        if not self.create_categories:
+            raise RowRejected(f"category: unknown category {name!r}")
+        if len(name) > Category._meta.get_field('name').max_length:
+            raise RowRejected(f"category: name too long {name!r}")
+        category, _ = Category.objects.get_or_create(name=name)
+        self.category_ids[name] = category.id
+        return category.id
+
+    def _build(self, row):
+        try:
+            title = self.validator.validate_title(str(row.get('title') or ''))
+            status = self.validator.validate_status(row.get('status') or 'pending')
+        except serializers.ValidationError as e:
+            raise RowRejected('; '.join(str(detail) for detail in e.detail))
+
+        if row.get('user'):
+            owner_id = self._user_id(row['user'], 'user')
+        elif self.default_owner is not None:
+            owner_id = self.default_owner.id
+        else:
+            raise RowRejected("user: no owner given and no default owner")
+
+        due_date = None
+        if row.get('due_date'):
+            try:
+                due_date = parse_datetime(str(row['due_date']))
+            except ValueError:
+                due_date = None
+            if due_date is None:
+                raise RowRejected(f"due_date: invalid datetime {row['due_date']!r}")
+            if timezone.is_naive(due_date):
+                due_date = timezone.make_aware(due_date)
+
+        task = Task(
+            user_id=owner_id,
+            title=title,
+            description=row.get('description') or None,
+            status=status,
+            due_date=due_date,
+            category_id=self._category_id(row['category']) if row.get('category') else None,
+            assigned_to_id=self._user_id(row['assigned_to'], 'assigned_to') if row.get('assigned_to') else None,
+        )
+        comments = []
+        for comment in self._comments_of(row):
+            if not isinstance(comment, dict) or not comment.get('text'):
+                raise RowRejected("comments: each comment needs a text")
+            author_id = self._user_id(comment['user'], 'comments.user') if comment.get('user') else owner_id
+            comments.append(TaskComment(user_id=author_id, text=comment['text']))
+        return task, comments
+
+    def _import_chunk(self, chunk):
+        self._resolve_users(chunk)
+        tasks, comments_per_task = [], []
+        for line_number, row, raw in chunk:
+            self.read += 1
+            if row is None:
+                self._reject(line_number, raw, "not a JSON object")
+                continue
+            try:
+                task, comments = self._build(row)
+            except RowRejected as e:
+                self._reject(line_number, raw, e)
+                continue
+            tasks.append(task)
+            comments_per_task.append(comments)
+
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks, batch_size=self.chunk_size)
+            comments = []
+            for task, task_comments in zip(tasks, comments_per_task):
+                for comment in task_comments:
+                    comment.task_id = task.id
+                    comments.append(comment)
+            TaskComment.objects.bulk_create(comments, batch_size=self.chunk_size)
+            refresh_search([task.id for task in tasks])  # bulk_create skips the signals
+            schedule_reminders(tasks, created=True)
+
+        self.imported += len(tasks)
+        self.comments += len(comments)
+        for task in tasks:
+            self.touched_user_ids.update((task.user_id, task.assigned_to_id))
+        self.touched_user_ids.discard(None)
@@ -0,0 +1,304 @@
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from task.category_cache import category_cache
+from task.models import Category, Task, TaskComment
+from task.search import refresh_search
+from task.task_counters import reconcile_counters
+from user.cache import invalidate_user
+
+PASSWORD = "bench-password-1"
+
+# (label, url name, method, url kwargs, query string, body); url kwargs and
+# bodies may name values of the seeded dataset ("{task_id}", ...)
+ENDPOINTS = [
+    ("list_tasks", "list-tasks", "GET", {}, "", None),
+    ("list_tasks_page", "list-tasks", "GET", {}, "page_size=50", None),
+    ("create_task", "create-task", "POST", {}, "", {"title": "Bench task", "category_id": "{category_id}"}),
+    ("retrieve_task", "retrieve-task", "GET", {"task_id": "{task_id}"}, "", None),
+    ("update_task", "update-task", "PATCH", {"task_id": "{task_id}"}, "", {"status": "in_progress"}),
+    ("delete_task", "delete-task", "DELETE", {"task_id": "{task_id}"}, "", None),
+    ("bulk_tasks", "bulk-tasks", "POST", {}, "",
+     {"create": [{"title": f"Bench bulk {i}", "category_id": "{category_id}"} for i in range(50)]}),
+    ("export_tasks", "export-tasks", "GET", {}, "", None),
+    ("search_tasks", "search-tasks", "GET", {}, "q=seeded", None),
+    ("task_stats", "task-stats", "GET", {}, "", None),
+    ("sync_tasks", "sync-tasks", "GET", {}, "", None),
+    ("list_categories", "list-categories", "GET", {}, "", None),
+    ("create_category", "create-category", "POST", {}, "", {"name": "Bench new"}),
+    ("update_category", "update-category", "PATCH", {"category_id": "{category_id}"}, "", {"description": "Bench"}),
+    ("delete_category", "delete-category", "DELETE", {"category_id": "{category_id}"}, "", None),
+    ("tasks_by_category", "tasks-by-category", "GET", {"category_id": "{category_id}"}, "", None),
+    ("filter_tasks", "filter-task", "GET", {}, "status=pending", None),
+    ("filter_tasks_category", "filter-task", "GET", {}, "category_id={category_id}", None),
+    ("due_soon", "tasks-due-soon", "GET", {}, "", None),
+    ("assign_task", "assign-unassign-task", "PATCH", {"task_id": "{task_id}"}, "", {"user_id": "{other_user_id}"}),
+    ("get_assigned_tasks", "get-assigned-tasks", "GET", {}, "", None),
+    ("task_comments", "task-comments", "GET", {"task_id": "{task_id}"}, "", None),
+    ("add_comment", "task-comments", "POST", {"task_id": "{task_id}"}, "", {"text": "Bench comment"}),
+    ("delete_comment", "task-comments-delete", "DELETE", {"task_id": "{task_id}", "comment_id": "{comment_id}"}, "",
+     None),
+    ("async_list_tasks", "async-list-tasks", "GET", {}, "", None),
+    ("async_retrieve_task", "async-retrieve-task", "GET", {"task_id": "{task_id}"}, "", None),
+    ("async_filter_tasks", "async-filter-task", "GET", {}, "status=pending", None),
+    ("async_get_assigned_tasks", "async-get-assigned-tasks", "GET", {}, "", None),
+    ("async_task_comments", "async-task-comments", "GET", {"task_id": "{task_id}"}, "", None),
+    ("user_register", "user_register", "POST", {}, "",
+     {"email": "bench-new@example.com", "password": PASSWORD, "password2": PASSWORD}),
+    ("user_login", "login", "POST", {}, "", {"email": "{email}", "password": PASSWORD}),
+    ("user_logout", "logout", "POST", {}, "", {"refresh": "{refresh}"}),
+    ("user_profile", "user-profile", "PATCH", {}, "", {"bio": "Bench"}),
+    ("search_users", "user-search", "GET", {}, "q=bench", None),
+]
+
+# URL names that are deliberately not driven, and why
+SKIPPED = {
+    "async-task-events": "a Server-Sent Events stream never finishes",
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def _fill(value, context):
+    if isinstance(value, str):
+        return value.format(**context) if value.startswith("{") or "={" in value else value
+    if isinstance(value, dict):
+        return {key: _fill(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, context) for item in value]
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a dataset of configurable size, drive every endpoint of task/urls.py and user/urls.py "
+        "through the DRF test client and report p50/p95/p99 latency, queries and bytes per request as "
+        "JSON. With --baseline, fail when an endpoint got slower or issues more queries than recorded."
+    )
+
+    batch_size = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--tasks", type=int, default=5000, help="Tasks, spread over the users.")
+        parser.add_argument("--comments-per-task", type=int, default=3)
+        parser.add_argument("--requests", type=int, default=30, help="Timed requests per endpoint.")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per endpoint first.")
+        parser.add_argument("--endpoint", action="append", choices=[row[0] for row in ENDPOINTS],
+                            help="Only benchmark these endpoints (repeatable).")
+        parser.add_argument("--with-cache", action="store_true",
+                            help="Leave the task list cache on; by default every request does the real work.")
+        parser.add_argument("--random-seed", type=int, default=0, help="Seed for the generated dataset.")
+        parser.add_argument("--keep-data", action="store_true",
+                            help="Commit the seeded rows; by default everything is rolled back at the end.")
+        parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+        parser.add_argument("--save-baseline", help="Also write the report here, as the baseline for later runs.")
+        parser.add_argument("--baseline", help="Compare with this earlier report and fail on regressions.")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Allowed relative p95 slowdown against the baseline (0.25 = 25%%).")
+        parser.add_argument("--min-slowdown-ms", type=float, default=1.0,
+                            help="Ignore p95 slowdowns smaller than this, whatever the ratio (timer noise).")
+
+    def handle(self, *args, **options):
+        self.warn_about_uncovered_urls()
+        # The test client's requests come from "testserver", as under the test runner
+        bench_settings = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+        if not options["with_cache"]:
+            bench_settings["TASK_LIST_CACHE_TIMEOUT"] = 0
+        with override_settings(**bench_settings):
+            if options["keep_data"]:
+                with transaction.atomic():
+                    context = self.seed(options)
+                report = self.run(context, options)
+            else:
+                with transaction.atomic():
+                    context = self.seed(options)
+                    report = self.run(context, options)
+                    transaction.set_rollback(True)
+                self.forget_cached(context)
+
+        text = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(text + "\n")
+        else:
+            self.stdout.write(text)
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as f:
+                f.write(text + "\n")
+        if options["baseline"]:
+            self.compare(report, options)
+
+    def warn_about_uncovered_urls(self):
+        covered = {row[1] for row in ENDPOINTS} | set(SKIPPED)
+        for module in ("task.urls", "user.urls"):
+            for pattern in get_resolver(module).url_patterns:
+                if isinstance(pattern, URLPattern) and pattern.name not in covered:
+                    self.stderr.write(f"Not benchmarked: {module} {pattern.name or pattern.pattern}")
+
+    def seed(self, options):
+        rng = random.Random(options["random_seed"])
+        User = get_user_model()
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        prefix = f"bench-{stamp}-"
+        User.objects.bulk_create(
+            [User(email=f"{prefix}{i}@example.com") for i in range(max(2, options["users"]))],
+            batch_size=self.batch_size,
+        )
+        users = list(User.objects.filter(email__startswith=prefix).order_by("id"))
+        user, other = users[0], users[1]
+        user.set_password(PASSWORD)
+        user.save(update_fields=["password"])
+        user_ids = [u.id for u in users]
+        Category.objects.bulk_create([Category(name=f"B{stamp[-10:]}{i}") for i in range(max(1, options["categories"]))])
+        category_ids = list(Category.objects.filter(name__startswith=f"B{stamp[-10:]}").values_list("id", flat=True))
+
+        now = timezone.now()
+        statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        created = 0
+        while created < options["tasks"]:
+            size = min(self.batch_size, options["tasks"] - created)
+            tasks = Task.objects.bulk_create([
+                Task(
+                    # The benchmarked user owns the first task of every batch at least
+                    user_id=user.id if i == 0 else rng.choice(user_ids),
+                    assigned_to_id=rng.choice(user_ids) if rng.random() < 0.3 else None,
+                    category_id=rng.choice(category_ids),
+                    title=f"Seeded task {created + i}",
+                    description="Seeded for the endpoint benchmark",
+                    status=rng.choice(statuses),
+                    due_date=now + timedelta(minutes=rng.randint(-60 * 24 * 30, 60 * 24 * 30)),
+                )
+                for i in range(size)
+            ], batch_size=self.batch_size)
+            TaskComment.objects.bulk_create([
+                TaskComment(task_id=task.id, user_id=rng.choice(user_ids), text="Seeded comment")
+                for task in tasks for _ in range(options["comments_per_task"])
+            ], batch_size=self.batch_size)
+            created += size
+        # bulk_create skips the signals that maintain these
+        reconcile_counters(user_ids)
+        refresh_search(Task.objects.filter(user=user).values_list("id", flat=True))
+
+        task = Task.objects.filter(user=user).order_by("id").first()
+        if task is None:
+            raise CommandError("Seed at least one task (--tasks).")
+        comment = TaskComment.objects.create(task=task, user=user, text="Bench comment to delete")
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("ANALYZE task_task; ANALYZE task_taskcomment;")
+            elif connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+
+        refresh = RefreshToken.for_user(user)
+        return {
+            "user": user,
+            "user_ids": user_ids,
+            "task_id": task.id,
+            "comment_id": comment.id,
+            "category_id": task.category_id,
+            "other_user_id": other.id,
+            "email": user.email,
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+        }
+
+    def forget_cached(self, context):
+        # Rolled-back rows may still sit in caches, and SQLite reuses their ids
+        category_cache.invalidate()
+        invalidate_user(*context["user_ids"])
+        cache.clear()
+
+    def run(self, context, options):
+        # Report a failing endpoint's status instead of aborting the run
+        client = APIClient(raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {context['access']}")
+        results = {}
+        for label, url_name, method, url_kwargs, query, body in ENDPOINTS:
+            if options["endpoint"] and label not in options["endpoint"]:
+                continue
+            path = reverse(url_name, kwargs=_fill(url_kwargs, context))
+            if query:
+                path = f"{path}?{_fill(query, context)}"
+            data = _fill(body, context)
+            for _ in range(options["warmup"]):
+                self.request(client, method, path, data)
+            samples = [self.request(client, method, path, data) for _ in range(options["requests"])]
+            results[label] = self.summarize(method, path, samples)
+        return {
+            "dataset": {
+                "vendor": connection.vendor,
+                "users": options["users"],
+                "categories": options["categories"],
+                "tasks": options["tasks"],
+                "comments_per_task": options["comments_per_task"],
+                "list_cache": options["with_cache"],
+            },
+            "requests": options["requests"],
+            "results": results,
+        }
+
+    def request(self, client, method, path, data):
+        """One request: (seconds, queries, bytes, status). Writes are rolled back so every run sees the same data."""
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method.lower())(path, data, format="json") if data is not None \
+                    else getattr(client, method.lower())(path)
+                body = b"".join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - started
+            query_count = len(queries)
+            transaction.set_rollback(True)
+        return elapsed, query_count, len(body), response.status_code
+
+    def summarize(self, method, path, samples):
+        latencies = sorted(sample[0] * 1000 for sample in samples)
+        return {
+            "method": method,
+            "path": path,
+            "status": sorted({sample[3] for sample in samples}),
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "queries": max(sample[1] for sample in samples),
+            "bytes": max(sample[2] for sample in samples),
+        }
+
+    def compare(self, report, options):
+        try:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        regressions = []
+        for label, result in report["results"].items():
+            before = baseline.get(label)
+            if before is None:
+                continue
+            slowdown = result["p95_ms"] - before["p95_ms"]
+            if slowdown > options["min_slowdown_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + options["threshold"]):
+                regressions.append(f"{label}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+            if result["queries"] > before["queries"]:
+                regressions.append(f"{label}: {before['queries']} -> {result['queries']} queries per request")
+        if regressions:
+            raise CommandError("Regressed against the baseline:\n  " + "\n  ".join(regressions))
+        self.stderr.write(f"No regressions against {options['baseline']}.")
@@ -0,0 +1,175 @@
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from task.models import Task
+
+# (label, sync path, async path); {task_id} is filled in with one of the user's tasks
+ENDPOINTS = [
+    ("list_tasks", "/task/", "/task/async/"),
+    ("retrieve_task", "/task/{task_id}/", "/task/async/{task_id}/"),
+    ("filter_tasks", "/task/filter_task/?status=pending", "/task/async/filter_task/?status=pending"),
+    ("get_assigned_tasks", "/task/assigned_task_list/", "/task/async/assigned_task_list/"),
+    ("task_comments", "/task/{task_id}/comments/", "/task/async/{task_id}/comments/"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec of the sync read endpoints served by backend.wsgi (threaded) "
+        "with their async versions served by backend.asgi (one event loop). Requests are "
+        "driven in-process, so this measures the app and database, not a web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="Send requests as this user (defaults to the user with the most tasks).")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint and server.")
+        parser.add_argument("--concurrency", type=int, default=20,
+                            help="Requests in flight: WSGI threads, or concurrent ASGI calls on one loop.")
+        parser.add_argument("--endpoint", action="append", choices=[label for label, _, _ in ENDPOINTS],
+                            help="Only benchmark these endpoints (repeatable).")
+        parser.add_argument("--with-cache", action="store_true",
+                            help="Leave the task list cache on; by default every request hits the database.")
+        parser.add_argument("--host", default="localhost", help="Host header to send (must be in ALLOWED_HOSTS).")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options["email"])
+        task_id = Task.objects.filter(user=user).values_list("id", flat=True).first()
+        if task_id is None:
+            raise CommandError(f"{user.email} has no tasks; seed some with explain_task_queries --seed-tasks.")
+        token = str(RefreshToken.for_user(user).access_token)
+
+        from backend.asgi import application as asgi_app
+        from backend.wsgi import application as wsgi_app
+
+        # A timeout of 0 makes every cache.set a no-op, so lists are rebuilt each time
+        cache_settings = {} if options["with_cache"] else {"TASK_LIST_CACHE_TIMEOUT": 0}
+        results = []
+        with override_settings(**cache_settings):
+            for label, sync_path, async_path in ENDPOINTS:
+                if options["endpoint"] and label not in options["endpoint"]:
+                    continue
+                wsgi = self.bench_wsgi(wsgi_app, sync_path.format(task_id=task_id), token, options)
+                asgi = self.bench_asgi(asgi_app, async_path.format(task_id=task_id), token, options)
+                results.append({
+                    "endpoint": label,
+                    "wsgi_rps": wsgi,
+                    "asgi_rps": asgi,
+                    "speedup": round(asgi / wsgi, 2) if wsgi else None,
+                })
+
+        if options["json"]:
+            self.stdout.write(json.dumps({
+                "requests": options["requests"], "concurrency": options["concurrency"], "results": results,
+            }, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<20} {'wsgi req/s':>12} {'asgi req/s':>12} {'speedup':>8}")
+        for row in results:
+            self.stdout.write(
+                f"{row['endpoint']:<20} {row['wsgi_rps']:>12} {row['asgi_rps']:>12} {row['speedup'] or '-':>8}"
+            )
+
+    def get_user(self, email):
+        User = get_user_model()
+        if email:
+            user = User.objects.filter(email=email).first()
+            if user is None:
+                raise CommandError(f"No user with email {email}.")
+            return user
+        owner_id = (
+            Task.objects.values("user").order_by().annotate(n=Count("id")).order_by("-n")
+            .values_list("user", flat=True).first()
+        )
+        if owner_id is None:
+            raise CommandError("No tasks to benchmark; seed some with explain_task_queries --seed-tasks.")
+        return User.objects.get(id=owner_id)
+
+    def check_status(self, path, code):
+        if code != 200:
+            raise CommandError(f"GET {path} answered {code}; fix that before benchmarking it.")
+
+    def bench_wsgi(self, app, path, token, options):
+        path, _, query = path.partition("?")
+
+        def call(_):
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": query,
+                "HTTP_HOST": options["host"],
+                "HTTP_AUTHORIZATION": f"Bearer {token}",
+                "wsgi.input": io.BytesIO(),
+            }
+            setup_testing_defaults(environ)
+            statuses = []
+            response = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            b"".join(response)
+            response.close()
+            return int(statuses[0].split()[0])
+
+        self.check_status(path, call(None))  # Warm up and make sure it works
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            started = time.perf_counter()
+            codes = list(pool.map(call, range(options["requests"])))
+            elapsed = time.perf_counter() - started
+        self.check_status(path, max(codes))
+        return round(len(codes) / elapsed, 1)
+
+    def bench_asgi(self, app, path, token, options):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", options["host"].encode()),
+                (b"authorization", f"Bearer {token}".encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": (options["host"], 80),
+        }
+
+        async def call():
+            sent = {}
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    sent["status"] = message["status"]
+
+            await app(dict(scope), receive, send)
+            return sent["status"]
+
+        async def run():
+            self.check_status(path, await call())
+            semaphore = asyncio.Semaphore(options["concurrency"])
+
+            async def limited():
+                async with semaphore:
+                    return await call()
+
+            started = time.perf_counter()
+            codes = await asyncio.gather(*(limited() for _ in range(options["requests"])))
+            return codes, time.perf_counter() - started
+
+        codes, elapsed = asyncio.run(run())
+        self.check_status(path, max(codes))
+        return round(len(codes) / elapsed, 1)
@@ -0,0 +1,96 @@
+import json
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from task.category_cache import category_cache
+from task.fast_serializers import fast_task_list
+from task.models import Category, Task, TaskComment
+from task.renderers import FastJSONRenderer, orjson
+from task.serializers import TaskSerializer
+from task.views import task_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering one user's task list of --tasks tasks through TaskSerializer + JSONRenderer "
+        "against the values() fast path + FastJSONRenderer, check both give the same bytes and report "
+        "the best of --repeat runs as JSON. Seeded rows are rolled back."
+    )
+
+    batch_size = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=10000)
+        parser.add_argument("--comments-per-task", type=int, default=3)
+        parser.add_argument("--comment-preview", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--min-speedup", type=float,
+                            help="Fail unless the fast path is at least this many times faster.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options)
+            preview = options["comment_preview"]
+            tasks = task_queryset(comment_preview=preview).filter(user=user).order_by("id")
+            serializer_ms, serialized = self.best_of(options["repeat"], lambda: JSONRenderer().render(
+                TaskSerializer(tasks.all(), many=True).data))
+            fast_ms, fast = self.best_of(options["repeat"], lambda: FastJSONRenderer().render(
+                fast_task_list.data(fast_task_list.values(tasks), preview)))
+            transaction.set_rollback(True)
+        category_cache.invalidate()  # Rolled-back categories may be cached
+
+        if fast != serialized:
+            raise CommandError("The fast path renders different bytes than TaskSerializer.")
+        report = {
+            "tasks": options["tasks"],
+            "comments_per_task": options["comments_per_task"],
+            "comment_preview": preview,
+            "orjson": orjson is not None,
+            "bytes": len(fast),
+            "serializer_ms": round(serializer_ms, 3),
+            "fast_ms": round(fast_ms, 3),
+            "speedup": round(serializer_ms / fast_ms, 2),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+        if options["min_speedup"] is not None and report["speedup"] < options["min_speedup"]:
+            raise CommandError(f"Speedup {report['speedup']}x is below {options['min_speedup']}x.")
+
+    def best_of(self, repeat, render):
+        """(milliseconds of the fastest of ``repeat`` calls, its output)."""
+        best, output = None, None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            output = render()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
+
+    def seed(self, options):
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+        user = get_user_model().objects.create_user(email=f"bench-{stamp}@example.com")
+        commenter = get_user_model().objects.create_user(email=f"bench-{stamp}-commenter@example.com")
+        # Category names are at most 20 characters; the stamp less its century fits
+        category = Category.objects.create(name=f"B{stamp[2:]}", description="Benchmark")
+        now = timezone.now()
+        tasks = Task.objects.bulk_create([
+            Task(
+                user=user,
+                category=category,
+                assigned_to=commenter if i % 3 == 0 else None,
+                title=f"Seeded task {i} é",
+                description="Seeded for the serializer benchmark" if i % 2 else None,
+                due_date=now + timedelta(minutes=i) if i % 4 else None,
+            )
+            for i in range(options["tasks"])
+        ], batch_size=self.batch_size)
+        TaskComment.objects.bulk_create([
+            TaskComment(task_id=task.id, user=commenter if n % 2 else user, text=f"Comment {n}")
+            for task in tasks for n in range(options["comments_per_task"])
+        ], batch_size=self.batch_size)
+        return user
@@ -0,0 +1,114 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from task.models import Category, Task, TaskComment, TaskReminder
+from user.search import search_queryset
+
+
+class Command(BaseCommand):
+    help = ("Print the EXPLAIN plan of every task view's query and of the user search behind the assign "
+            "dropdown, optionally seeding data first.")
+
+    batch_size = 10000
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed-tasks", type=int, default=0,
+                            help="Bulk-insert this many tasks (spread over --seed-users users) before explaining.")
+        parser.add_argument("--seed-users", type=int, default=100)
+        parser.add_argument("--comments-per-task", type=int, default=1)
+        parser.add_argument("--email", help="Explain queries as this user (defaults to the first user).")
+        parser.add_argument("--analyze", action="store_true",
+                            help="Run EXPLAIN ANALYZE (PostgreSQL only); the queries are actually executed.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user = None
+        if options["seed_tasks"]:
+            user = self.seed(options["seed_tasks"], options["seed_users"], options["comments_per_task"])
+        if options["email"]:
+            user = User.objects.filter(email=options["email"]).first()
+        elif user is None:
+            user = User.objects.order_by("id").first()
+        if user is None:
+            raise CommandError("No user to explain queries for; pass --seed-tasks or --email.")
+
+        explain_options = {}
+        if options["analyze"]:
+            if connection.vendor != "postgresql":
+                raise CommandError("--analyze is only supported on PostgreSQL.")
+            explain_options = {"analyze": True, "buffers": True}
+
+        for label, queryset in self.view_queries(user):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
+
+    def view_queries(self, user):
+        """The main query of each view, shaped the way the view issues it."""
+        now = timezone.now()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        page = 50
+        category_id = Task.objects.filter(user=user, category__isnull=False).values_list("category_id", flat=True).first()
+        task_id = Task.objects.filter(user=user).values_list("id", flat=True).first()
+        mine = Task.objects.filter(user=user)
+
+        yield "list_tasks (page by due_date)", mine.filter(due_date__isnull=False).order_by("due_date", "id")[:page]
+        yield "list_tasks (next page by due_date)", mine.filter(
+            Q(due_date__gte=now) & (Q(due_date__gt=now) | Q(id__gt=task_id or 0))).order_by("due_date", "id")[:page]
+        yield "list_tasks (page by updated_at)", mine.order_by("-updated_at", "-id")[:page]
+        yield "filter_tasks (status)", mine.filter(status="pending").order_by("due_date")[:page]
+        yield "filter_tasks (category)", mine.filter(category_id=category_id).order_by("due_date")[:page]
+        yield "filter_tasks (due_within_24h)", mine.filter(due_date__gte=now, due_date__lte=now + timedelta(days=1))
+        yield "tasks_by_category", mine.filter(category_id=category_id)
+        yield "get_assigned_tasks", Task.objects.filter(assigned_to=user).order_by("due_date", "id")[:page]
+        yield "get_due_soon_tasks", Task.objects.filter(
+            due_date__gte=today_start, due_date__lte=today_start + timedelta(days=2)).order_by("due_date")[:page]
+        yield "send_due_date_reminders", TaskReminder.objects.filter(bucket__lte=now).select_related("task__user")
+        yield "task_comments", TaskComment.objects.filter(task_id=task_id).order_by("-timestamp")[:page]
+        yield "search_users (assign typeahead)", search_queryset(user.email[:3], 10)
+
+    @transaction.atomic
+    def seed(self, task_count, user_count, comments_per_task):
+        User = get_user_model()
+        stamp = timezone.now().strftime("%Y%m%d%H%M%S")
+        User.objects.bulk_create(
+            [User(email=f"explain-{stamp}-{i}@example.com") for i in range(user_count)],
+            batch_size=self.batch_size,
+        )
+        user_ids = list(User.objects.filter(email__startswith=f"explain-{stamp}-").values_list("id", flat=True))
+        categories = [Category.objects.get_or_create(name=f"Explain {i}")[0].id for i in range(10)]
+
+        now = timezone.now()
+        statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        created = 0
+        while created < task_count:
+            size = min(self.batch_size, task_count - created)
+            tasks = Task.objects.bulk_create([
+                Task(
+                    user_id=random.choice(user_ids),
+                    assigned_to_id=random.choice(user_ids) if random.random() < 0.3 else None,
+                    category_id=random.choice(categories),
+                    title=f"Seeded task {created + i}",
+                    status=random.choice(statuses),
+                    due_date=now + timedelta(minutes=random.randint(-60 * 24 * 90, 60 * 24 * 90)),
+                )
+                for i in range(size)
+            ], batch_size=self.batch_size)
+            TaskComment.objects.bulk_create([
+                TaskComment(task_id=task.id, user_id=random.choice(user_ids), text="Seeded comment")
+                for task in tasks for _ in range(comments_per_task)
+            ], batch_size=self.batch_size)
+            created += size
+            self.stdout.write(f"Seeded {created}/{task_count} tasks")
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"ANALYZE task_task; ANALYZE task_taskcomment; ANALYZE {User._meta.db_table};")
+            elif connection.vendor == "sqlite":
+                cursor.execute("ANALYZE")
+        return User.objects.get(id=user_ids[0])
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from task.export import FORMATS, export_rows, render
+
+
+class Command(BaseCommand):
+    help = "Stream a user's tasks (with category name and comment count) as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Whose tasks to export.")
+        parser.add_argument("--format", choices=FORMATS, default="ndjson")
+        parser.add_argument("--output", help="File to write to (defaults to stdout).")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(email=options["email"]).first()
+        if user is None:
+            raise CommandError(f"No user with email {options['email']}.")
+
+        chunks = render(export_rows(user), options["format"])
+        if options["output"]:
+            with open(options["output"], "w", newline="") as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,52 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from task.importer import FORMATS, TaskImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk-import tasks (and their comments) from an NDJSON or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="Input format (defaults to the file extension, else ndjson).")
+        parser.add_argument("--owner", help="Email of the owner for rows without a 'user' column.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows per bulk_create batch.")
+        parser.add_argument("--create-categories", action="store_true",
+                            help="Create categories that do not exist yet instead of rejecting the row.")
+        parser.add_argument("--rejects", help="Where to write rejected rows (defaults to <path>.rejects.ndjson).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+
+        owner = None
+        if options["owner"]:
+            owner = get_user_model().objects.filter(email=options["owner"]).first()
+            if owner is None:
+                raise CommandError(f"No user with email {options['owner']}.")
+
+        rejects_path = options["rejects"] or ("import.rejects.ndjson" if path == "-" else f"{path}.rejects.ndjson")
+        source = sys.stdin if path == "-" else open(path, newline="")
+        try:
+            with open(rejects_path, "w") as rejects:
+                importer = TaskImporter(
+                    default_owner=owner,
+                    chunk_size=options["chunk_size"],
+                    create_categories=options["create_categories"],
+                    rejects=rejects,
+                )
+                summary = importer.run(read_rows(source, input_format))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            "Imported {imported} of {read} rows ({comments} comments) in {seconds}s "
+            "- {rows_per_second} rows/sec".format(**summary)
+        ))
+        if summary["rejected"]:
+            self.stdout.write(self.style.WARNING(f"Rejected {summary['rejected']} rows; see {rejects_path}"))
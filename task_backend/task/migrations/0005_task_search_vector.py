@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-18 20:28
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The GIN index and the backfill only make sense on PostgreSQL; other
+# databases use the in-process index in task.search instead.
+BACKFILL_SQL = """
+UPDATE task_task SET search_vector =
+    setweight(to_tsvector('english', title), 'A')
+    || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(
+        (SELECT string_agg(c.text, ' ') FROM task_taskcomment c WHERE c.task_id = task_task.id), ''
+    )), 'C')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS task_search_vector_idx ON task_task USING gin (search_vector)')
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS task_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0004_task_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
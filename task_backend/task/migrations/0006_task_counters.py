@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-18 20:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    # Same numbers as task.task_counters.compute_counters(), for existing rows
+    Task = apps.get_model('task', 'Task')
+    TaskComment = apps.get_model('task', 'TaskComment')
+    TaskCounter = apps.get_model('task', 'TaskCounter')
+    counters = {}
+    for row in Task.objects.order_by().values('user_id', 'status', 'category_id').annotate(n=Count('id')):
+        for key in (('status', row['status']), ('category', str(row['category_id'] or ''))):
+            counters[(row['user_id'],) + key] = counters.get((row['user_id'],) + key, 0) + row['n']
+    assigned = Task.objects.order_by().filter(assigned_to__isnull=False).values('assigned_to_id')
+    for row in assigned.annotate(n=Count('id')):
+        counters[(row['assigned_to_id'], 'assigned', '')] = row['n']
+    for row in TaskComment.objects.order_by().values('task__user_id').annotate(n=Count('id')):
+        counters[(row['task__user_id'], 'comments', '')] = row['n']
+    TaskCounter.objects.bulk_create([
+        TaskCounter(user_id=user_id, dimension=dimension, key=key, count=count)
+        for (user_id, dimension, key), count in counters.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('task', '0005_task_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('status', 'Tasks by status'), ('category', 'Tasks by category'), ('assigned', 'Tasks assigned to the user'), ('comments', "Comments on the user's tasks")], max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskcounter',
+            constraint=models.UniqueConstraint(fields=('user', 'dimension', 'key'), name='taskcounter_user_dimension_key_uniq'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
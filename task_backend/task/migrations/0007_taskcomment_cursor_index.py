@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0006_task_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='taskcomment',
+            name='taskcomment_task_ts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['task', '-timestamp', '-id'], name='taskcomment_task_ts_id_idx'),
+        ),
+    ]
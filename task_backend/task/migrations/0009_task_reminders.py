@@ -0,0 +1,50 @@
+# Generated by Django 4.2 on 2026-10-18 20:49
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def schedule_existing_reminders(apps, schema_editor):
+    # Same rows as task.task_reminders.schedule_reminders() would file, for existing tasks
+    Task = apps.get_model('task', 'Task')
+    TaskReminder = apps.get_model('task', 'TaskReminder')
+    lead = timedelta(minutes=getattr(settings, 'TASK_REMINDER_LEAD_MINUTES', 60))
+    lookback = timedelta(minutes=getattr(settings, 'TASK_REMINDER_LOOKBACK_MINUTES', 24 * 60))
+    width = getattr(settings, 'TASK_REMINDER_BUCKET_SECONDS', 60)
+    pending = Task.objects.filter(status='pending', reminder_sent_at__isnull=True,
+                                  due_date__gt=timezone.now() - lookback).values_list('id', 'due_date')
+    TaskReminder.objects.bulk_create([
+        TaskReminder(task_id=task_id, bucket=datetime.fromtimestamp(
+            int((due_date - lead).timestamp()) // width * width, tz=dt_timezone.utc))
+        for task_id, due_date in pending.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0008_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskReminder',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reminder', serialize=False, to='task.task')),
+                ('bucket', models.DateTimeField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_reminder_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='taskreminder',
+            index=models.Index(fields=['bucket'], name='taskreminder_bucket_idx'),
+        ),
+        migrations.RunPython(schedule_existing_reminders, migrations.RunPython.noop),
+    ]
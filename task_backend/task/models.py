@@ -1,5 +1,7 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Category(models.Model):
     name = models.CharField(max_length=20, unique=True)
@@ -25,6 +27,59 @@ class Task(models.Model):
     assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='assigned_tasks', null=True, blank=True, on_delete=models.SET_NULL)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True, editable=False)  # Set once the due-date reminder was queued
+    # Weighted title/description/comments tsvector, kept current by task.search (PostgreSQL only)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # list_tasks / filter_tasks keyset pages: user + (due_date, id) or (updated_at, id)
+            models.Index(fields=['user', 'due_date', 'id'], name='task_user_due_idx'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='task_user_updated_idx'),
+            # filter_tasks by status / category, tasks_by_category
+            models.Index(fields=['user', 'status', 'due_date'], name='task_user_status_due_idx'),
+            models.Index(fields=['user', 'category', 'due_date'], name='task_user_category_due_idx'),
+            # get_assigned_tasks
+            models.Index(fields=['assigned_to', 'due_date', 'id'], name='task_assignee_due_idx'),
+            # get_due_soon_tasks
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+        ]
+
+    # Fields the dashboard counters depend on (see task.task_counters)
+    COUNTED_FIELDS = ('user_id', 'status', 'category_id', 'assigned_to_id')
+    # Fields the scheduled due-date reminder depends on (see task.task_reminders)
+    REMINDER_FIELDS = ('status', 'due_date', 'reminder_sent_at')
+    # Task fields in search_vector (see task.search); comments are refreshed by their own signals
+    SEARCH_FIELDS = ('title', 'description')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the counted values as loaded, so a later save can be turned
+        # into counter deltas without re-reading the row
+        instance._counted_values = instance.counted_values()
+        # ... and whether it can leave the reminder schedule alone
+        instance._reminder_values = instance.reminder_values()
+        # ... and the search data
+        instance._search_values = instance.search_values()
+        return instance
+
+    def _loaded_values(self, attnames):
+        if any(attname not in self.__dict__ for attname in attnames):
+            return None
+        return tuple(self.__dict__[attname] for attname in attnames)
+
+    def counted_values(self):
+        """The current COUNTED_FIELDS, or None if any of them was deferred."""
+        return self._loaded_values(self.COUNTED_FIELDS)
+
+    def reminder_values(self):
+        """The current REMINDER_FIELDS, or None if any of them was deferred."""
+        return self._loaded_values(self.REMINDER_FIELDS)
+
+    def search_values(self):
+        """The current SEARCH_FIELDS, or None if any of them was deferred."""
+        return self._loaded_values(self.SEARCH_FIELDS)
 
     def __str__(self):
         return self.title
@@ -35,6 +90,126 @@ class TaskComment(models.Model):
     text = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # task_comments pages and the latest-comments preview: newest first per task
+            models.Index(fields=['task', '-timestamp', '-id'], name='taskcomment_task_ts_id_idx'),
+            # Delta sync: comments added since a watermark
+            models.Index(fields=['timestamp', 'id'], name='taskcomment_ts_id_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user.email} on {self.task.title}"
-    
\ No newline at end of file
+    
+class TaskReminder(models.Model):
+    """
+    A pending due-date reminder, filed under the time bucket it fires in.
+
+    Together the rows form a persistent timing wheel: task.task_reminders
+    files, refiles or drops a task's row when its due date or status changes,
+    and each run reads only the buckets that came due.
+    """
+    task = models.OneToOneField(Task, primary_key=True, on_delete=models.CASCADE, related_name='reminder')
+    bucket = models.DateTimeField()  # Start of the TASK_REMINDER_BUCKET_SECONDS slot it fires in
+
+    class Meta:
+        indexes = [
+            # send_due_date_reminders: every bucket up to the current one
+            models.Index(fields=['bucket'], name='taskreminder_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reminder for task {self.task_id} at {self.bucket}"
+
+
+class TaskCounter(models.Model):
+    """
+    One dashboard number for one user, e.g. (status, pending) or (category, 3).
+
+    Kept current incrementally by task.task_counters and recomputed
+    periodically, so the dashboard reads a handful of rows instead of every task.
+    """
+    DIMENSION_CHOICES = [
+        ('status', 'Tasks by status'),
+        ('category', 'Tasks by category'),  # key is the category id, '' for none
+        ('assigned', 'Tasks assigned to the user'),
+        ('comments', "Comments on the user's tasks"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='task_counters')
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=20, blank=True, default='')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'dimension', 'key'], name='taskcounter_user_dimension_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.dimension}:{self.key} = {self.count}"
+
+
+class Tombstone(models.Model):
+    """
+    A deleted task, comment or category, kept for a while so delta syncs
+    (task.sync) can tell clients to drop their copy.
+    """
+    KIND_CHOICES = [
+        ('task', 'Task'),
+        ('comment', 'Comment'),
+        ('category', 'Category'),
+    ]
+
+    # Whose sync reports it; None for everyone (categories are shared)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+                             related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Delta sync: (deleted_at, id) keyset per user, and the shared (NULL user) ones
+            models.Index(fields=['user', 'deleted_at', 'id'], name='tombstone_user_deleted_idx'),
+            # purge_tombstones
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent, written in the same transaction as the change
+    it is about and delivered later in batches by task.outbox.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),  # Gave up after TASK_OUTBOX_MAX_ATTEMPTS
+    ]
+
+    # Queuing the same key twice queues one email (e.g. one reminder per task and due date)
+    dedupe_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    subject = models.CharField(max_length=998)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # deliver_outbox: pending emails whose next attempt is due, oldest first
+            models.Index(fields=['next_attempt_at', 'id'], condition=models.Q(status='pending'),
+                         name='outbox_pending_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
@@ -0,0 +1,146 @@
+import logging
+import time
+
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# Transactional outbox: code that wants an email sent queues it with
+# enqueue_email() inside its own transaction, so the email exists exactly
+# when the change it is about committed. deliver_outbox() drains the queue in
+# batches over one reused mail connection, retrying failures with backoff,
+# so a slow or unreachable mail server delays emails but never the writers.
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(subject, body, recipients, from_email=None, dedupe_key=None):
+    """
+    Queue an email for deliver_outbox. Call it inside the transaction that
+    makes the change the email is about. With a ``dedupe_key`` that was
+    queued before, nothing new is queued.
+    """
+    OutboxEmail.objects.bulk_create([OutboxEmail(
+        dedupe_key=dedupe_key,
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+        next_attempt_at=timezone.now(),
+    )], ignore_conflicts=dedupe_key is not None)
+
+
+def retry_delay(attempts):
+    """Wait before the next try after ``attempts`` failed ones: doubling from TASK_OUTBOX_RETRY_SECONDS, capped."""
+    base, cap = _setting('TASK_OUTBOX_RETRY_SECONDS', 60), _setting('TASK_OUTBOX_MAX_RETRY_SECONDS', 3600)
+    return timezone.timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def _claim(batch_size):
+    """
+    Lease the next batch of due emails: push their next attempt a lease
+    ahead, so other workers skip them and a crashed worker's batch is retried
+    once the lease runs out.
+    """
+    now = timezone.now()
+    lease = timezone.timedelta(seconds=_setting('TASK_OUTBOX_LEASE_SECONDS', 300))
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = now + lease
+        OutboxEmail.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def _send_batch(connection, batch):
+    """Send each email over ``connection``; returns ``{email id: error or None}``."""
+    errors = {}
+    connected = False
+    for index, email in enumerate(batch):
+        if not connected:
+            try:
+                connection.open()
+                connected = True
+            except Exception as e:
+                # No server, no point trying the rest one by one
+                errors.update((rest.id, f"{type(e).__name__}: {e}") for rest in batch[index:])
+                break
+        message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+        try:
+            # One message per call so a failure is pinned on the right email
+            connection.send_messages([message])
+            errors[email.id] = None
+        except Exception as e:
+            errors[email.id] = f"{type(e).__name__}: {e}"
+            # The connection may be broken; reconnect for the next email
+            connection.close()
+            connected = False
+    if connected:
+        connection.close()
+    return errors
+
+
+@shared_task
+def deliver_outbox():
+    """
+    Send due outbox emails, ``TASK_OUTBOX_BATCH_SIZE`` at a time over one
+    mail connection per batch, until the queue is drained or
+    ``TASK_OUTBOX_TIME_BUDGET`` seconds have passed. Failed emails are tried
+    again after a growing delay and marked failed after
+    ``TASK_OUTBOX_MAX_ATTEMPTS``. Returns (and logs) throughput numbers.
+    """
+    batch_size = _setting('TASK_OUTBOX_BATCH_SIZE', 100)
+    max_attempts = _setting('TASK_OUTBOX_MAX_ATTEMPTS', 8)
+    started = time.monotonic()
+    deadline = started + _setting('TASK_OUTBOX_TIME_BUDGET', 50)
+    stats = {'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+    connection = get_connection()
+
+    while time.monotonic() < deadline:
+        batch = _claim(batch_size)
+        if not batch:
+            break
+        errors = _send_batch(connection, batch)
+        now = timezone.now()
+        for email in batch:
+            error = errors[email.id]
+            if error is None:
+                email.status, email.sent_at, email.last_error = 'sent', now, ''
+                stats['sent'] += 1
+            elif email.attempts >= max_attempts:
+                email.status, email.last_error = 'failed', error
+                stats['failed'] += 1
+                logging.error(f"Giving up on outbox email {email.id} after {email.attempts} attempts: {error}")
+            else:
+                email.next_attempt_at, email.last_error = now + retry_delay(email.attempts), error
+                stats['retried'] += 1
+        OutboxEmail.objects.bulk_update(batch, ['status', 'sent_at', 'next_attempt_at', 'last_error'])
+        stats['batches'] += 1
+
+    stats['seconds'] = round(time.monotonic() - started, 3)
+    stats['per_second'] = round(stats['sent'] / stats['seconds'], 1) if stats['seconds'] else 0.0
+    if stats['batches']:
+        logging.info(
+            f"Outbox: sent {stats['sent']}, retrying {stats['retried']}, failed {stats['failed']} "
+            f"in {stats['batches']} batches, {stats['seconds']}s ({stats['per_second']} emails/sec)."
+        )
+    return stats
+
+
+@shared_task
+def purge_outbox():
+    """Drop sent emails older than ``TASK_OUTBOX_KEEP_DAYS``; failed ones stay for inspection."""
+    cutoff = timezone.now() - timezone.timedelta(days=_setting('TASK_OUTBOX_KEEP_DAYS', 7))
+    count, _ = OutboxEmail.objects.filter(status='sent', sent_at__lt=cutoff).delete()
+    logging.info(f"Purged {count} sent outbox emails.")
@@ -0,0 +1,230 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TaskCursorPagination(BasePagination):
+    """
+    Keyset pagination for task lists.
+
+    Pages are ordered by ``(<ordering field>, id)`` and every page is fetched
+    with a ``WHERE (field, id) > (last_field, last_id) LIMIT n`` style query,
+    so page 1000 costs the same index range scan as page 1. Pagination is
+    opt-in: it only kicks in when the client sends ``cursor`` or ``page_size``,
+    otherwise the views keep returning a plain list.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+
+    page_size = getattr(settings, 'TASK_CURSOR_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'TASK_CURSOR_MAX_PAGE_SIZE', 500)
+
+    # Only nullable field here is due_date; nulls sort after every date.
+    ordering_fields = ('due_date', 'updated_at')
+    default_ordering = 'due_date'
+
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request)
+
+        cursor = self.decode_cursor(request)
+        # A "previous" cursor walks the list backwards: flip the order for the
+        # query and flip the fetched rows back before returning them.
+        self.reverse = bool(cursor and cursor['r'])
+        walk_descending = self.descending != self.reverse
+
+        rows = self._fetch(queryset, cursor, walk_descending, self.page_size + 1)
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        if self.reverse:
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        if ordering.lstrip('-') not in self.ordering_fields:
+            ordering = self.default_ordering
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        # Rows are model instances or, for values() querysets, dicts
+        value, pk = (row[self.field], row['id']) if isinstance(row, dict) else (getattr(row, self.field), row.pk)
+        payload = {
+            'o': ('-' if self.descending else '') + self.field,
+            'v': value.isoformat() if value is not None else None,
+            'i': pk,
+            'r': int(reverse),
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        url = replace_query_param(self.base_url, self.cursor_query_param, token)
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.ordering_query_param, payload['o'])
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            ordering = payload['o']
+            value = payload['v']
+            if value is not None:
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError
+            cursor = {'v': value, 'i': int(payload['i']), 'r': bool(payload['r'])}
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        # A cursor is only meaningful for the ordering it was issued for.
+        if ordering != ('-' if self.descending else '') + self.field:
+            raise NotFound(self.invalid_cursor_message)
+        if cursor['v'] is None and self.field != 'due_date':
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def _segments(self, queryset, descending):
+        """
+        Split the queryset into contiguous runs in walk order.
+
+        A nullable ordering field is walked as two separate runs (dated rows,
+        then undated rows by id) so each query stays a plain index range scan
+        instead of an ``OR ... IS NULL`` predicate.
+        """
+        field = self.field
+        prefix = '-' if descending else ''
+        if not queryset.model._meta.get_field(field).null:
+            return [(queryset, [prefix + field, prefix + 'id'], False)]
+        dated = (queryset.filter(**{f'{field}__isnull': False}), [prefix + field, prefix + 'id'], False)
+        undated = (queryset.filter(**{f'{field}__isnull': True}), [prefix + 'id'], True)
+        return [undated, dated] if descending else [dated, undated]
+
+    def _fetch(self, queryset, cursor, descending, limit):
+        segments = self._segments(queryset, descending)
+        if cursor is not None:
+            # Skip the runs that lie entirely before the cursor.
+            while segments[0][2] != (cursor['v'] is None):
+                segments.pop(0)
+
+        rows = []
+        for index, (segment, order, undated) in enumerate(segments):
+            if index == 0 and cursor is not None:
+                segment = segment.filter(self._after(cursor['v'], cursor['i'], descending, undated))
+            rows.extend(segment.order_by(*order)[:limit - len(rows)])
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def _after(self, value, pk, descending, undated):
+        """
+        Rows strictly after ``(value, pk)`` in walk order.
+
+        Written as ``field >= value AND (field > value OR id > pk)`` so the
+        first conjunct bounds the index range and the second only trims ties.
+        """
+        if undated:
+            return Q(id__lt=pk) if descending else Q(id__gt=pk)
+        field = self.field
+        if descending:
+            return Q(**{f'{field}__lte': value}) & (Q(**{f'{field}__lt': value}) | Q(id__lt=pk))
+        return Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(id__gt=pk))
+
+
+class CommentCursorPagination(TaskCursorPagination):
+    """
+    Keyset pagination for a task's comments, newest first by ``(timestamp, id)``.
+
+    Unlike task lists this is always on, so a task with thousands of comments
+    costs one bounded page per request.
+    """
+    page_size = getattr(settings, 'TASK_COMMENT_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'TASK_COMMENT_MAX_PAGE_SIZE', 200)
+
+    ordering_fields = ('timestamp',)
+    default_ordering = '-timestamp'
+
+    def is_requested(self, request):
+        return True
+
+
+def comment_preview_size(request=None):
+    """
+    How many of each task's latest comments task responses embed.
+
+    ``TASK_COMMENT_PREVIEW`` by default; clients can ask for fewer or more
+    (up to ``TASK_COMMENT_PREVIEW_MAX``) with ``?comment_preview=<n>``.
+    """
+    size = getattr(settings, 'TASK_COMMENT_PREVIEW', 3)
+    raw = request.query_params.get('comment_preview') if request is not None else None
+    if raw is None:
+        return size
+    try:
+        requested = int(raw)
+    except ValueError:
+        return size
+    if requested < 0:
+        return size
+    return min(requested, getattr(settings, 'TASK_COMMENT_PREVIEW_MAX', 20))
@@ -0,0 +1,178 @@
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+
+from .models import Task, TaskComment
+
+# Text search configuration for the PostgreSQL vector and queries
+SEARCH_CONFIG = 'english'
+
+# Relative weight of a match in each part of a task (ts_rank's A, B and C)
+FIELD_WEIGHTS = {'title': 1.0, 'description': 0.4, 'comments': 0.2}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def page_size_limits():
+    return getattr(settings, 'TASK_SEARCH_PAGE_SIZE', 20), getattr(settings, 'TASK_SEARCH_MAX_PAGE_SIZE', 100)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """
+    Pure-Python inverted index over task text, for databases without full-text
+    search (SQLite in development and tests).
+
+    Postings are keyed by ``(owner id, term)``, so a search only ever walks
+    the requesting user's postings for the query terms. Writes just mark task
+    ids dirty; they are re-read in one batch by the next search. The index
+    lives in process memory and only sees writes made by this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._postings = defaultdict(dict)  # (user_id, term) -> {task_id: score}
+        self._documents = {}  # task_id -> (user_id, terms)
+        self._dirty = set()
+        self._loaded = False
+
+    def mark_dirty(self, task_ids):
+        with self._lock:
+            if self._loaded:
+                self._dirty.update(task_ids)
+
+    def search(self, user_id, query):
+        """``[(task_id, score), ...]`` of the user's tasks matching every query term, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            self._sync()
+            postings = sorted((self._postings.get((user_id, term), {}) for term in terms), key=len)
+            matches = set(postings[0])
+            for posting in postings[1:]:
+                matches.intersection_update(posting)
+            scores = {task_id: sum(posting[task_id] for posting in postings) for task_id in matches}
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+    def _sync(self):
+        if self._loaded and not self._dirty:
+            return
+        tasks = Task.objects.order_by()
+        comments = TaskComment.objects.order_by()
+        if self._loaded:
+            task_ids = self._dirty
+            tasks = tasks.filter(id__in=task_ids)
+            comments = comments.filter(task_id__in=task_ids)
+        else:
+            self.reset()
+            task_ids = ()
+
+        texts = defaultdict(list)
+        for task_id, text in comments.values_list('task_id', 'text').iterator():
+            texts[task_id].append(text)
+        for task_id in task_ids:
+            self._remove(task_id)
+        for task_id, user_id, title, description in tasks.values_list(
+            'id', 'user_id', 'title', 'description'
+        ).iterator():
+            self._add(task_id, user_id, title, description, ' '.join(texts.get(task_id, ())))
+        self._dirty = set()
+        self._loaded = True
+
+    def _add(self, task_id, user_id, title, description, comments):
+        terms = defaultdict(float)
+        for field, text in (('title', title), ('description', description), ('comments', comments)):
+            for term in tokenize(text):
+                terms[term] += FIELD_WEIGHTS[field]
+        for term, score in terms.items():
+            self._postings[(user_id, term)][task_id] = score
+        self._documents[task_id] = (user_id, terms)
+
+    def _remove(self, task_id):
+        user_id, terms = self._documents.pop(task_id, (None, ()))
+        for term in terms:
+            posting = self._postings.get((user_id, term))
+            if posting is not None:
+                posting.pop(task_id, None)
+                if not posting:
+                    del self._postings[(user_id, term)]
+
+
+search_index = InvertedIndex()
+
+
+def search_vector():
+    """The expression ``Task.search_vector`` is kept equal to (PostgreSQL only)."""
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchVector
+
+    comments = Subquery(
+        TaskComment.objects.filter(task=OuterRef('pk')).order_by().values('task')
+        .annotate(document=StringAgg('text', ' ')).values('document')
+    )
+    # SearchVector coalesces NULLs (no description, no comments) to ''
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(comments, weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search(task_ids):
+    """
+    Bring the search data of these tasks up to date after they (or their
+    comments) changed. Called from signals and from bulk write paths, which
+    skip signals. Ids of deleted tasks are fine.
+    """
+    task_ids = {task_id for task_id in task_ids if task_id is not None}
+    if not task_ids:
+        return
+    if uses_postgres():
+        # update() leaves updated_at (and so ETags) alone
+        Task.objects.filter(id__in=task_ids).update(search_vector=search_vector())
+    else:
+        search_index.mark_dirty(task_ids)
+
+
+def forget_search(task_ids):
+    """Drop deleted tasks from the search data (their vector went with the row)."""
+    if not uses_postgres():
+        search_index.mark_dirty({task_id for task_id in task_ids if task_id is not None})
+
+
+def search_tasks(user, query, offset, limit):
+    """
+    ``[(task_id, rank), ...]`` for one page of the user's tasks matching
+    ``query``, best match first.
+
+    On PostgreSQL the query is a websearch-style ``tsquery`` answered from the
+    GIN index on ``Task.search_vector`` and ranked with ``ts_rank``. Elsewhere
+    the in-process ``search_index`` answers it.
+    """
+    if uses_postgres():
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        rows = (
+            Task.objects.filter(user=user, search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-id')
+            .values_list('id', 'rank')
+        )
+        return list(rows[offset:offset + limit])
+    return search_index.search(user.id, query)[offset:offset + limit]
@@ -1,5 +1,8 @@
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from .category_cache import category_cache
 from .models import Task, Category, TaskComment
+from .pagination import comment_preview_size
 
 class CategorySerializer(serializers.ModelSerializer):
     # convert Category model instances into JSON format
@@ -7,6 +10,47 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = '__all__'
 
+class CachedCategoryField(serializers.Field):
+    # Renders the same shape as CategorySerializer, straight from the
+    # in-process category cache instead of a join or a query per task
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance.category_id
+
+    def to_representation(self, value):
+        return category_cache.get(value)
+
+class CachedCategoryPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    # Validates category ids against the category cache instead of a query per value
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        row = category_cache.get(data)
+        if row is None:
+            try:
+                int(data)
+            except (TypeError, ValueError):
+                self.fail('incorrect_type', data_type=type(data).__name__)
+            self.fail('does_not_exist', pk_value=data)
+        return Category(**row)
+
+class PreloadedUserField(serializers.PrimaryKeyRelatedField):
+    # For bulk payloads: checks ids against ``context['known_user_ids']``,
+    # which the view loads with one query for the whole batch
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in self.context['known_user_ids']:
+            self.fail('does_not_exist', pk_value=data)
+        return get_user_model()(pk=pk)
+
 class TaskCommentSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField()  # Returns the username instead of just the user ID
 
@@ -15,16 +59,48 @@ class TaskCommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'task', 'user', 'text', 'timestamp']
         read_only_fields = ['id', 'task', 'user', 'timestamp']
 
+class CommentCountField(serializers.Field):
+    # Reads the ``comment_count`` annotation of views.task_queryset; tasks
+    # loaded without it (e.g. just created) cost one COUNT
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        count = getattr(instance, 'comment_count', None)
+        return instance.comments.count() if count is None else count
+
+    def to_representation(self, value):
+        return value
+
+class LatestCommentsField(serializers.Field):
+    # Only the newest few comments, from the ``latest_comments`` prefetch of
+    # views.task_queryset, so one busy thread cannot bloat every task list;
+    # the whole thread is paginated at /task/<id>/comments/
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        comments = getattr(instance, 'latest_comments', None)
+        if comments is None:
+            comments = instance.comments.select_related('user').order_by('-timestamp', '-id')[:comment_preview_size()]
+        return comments
+
+    def to_representation(self, value):
+        return TaskCommentSerializer(value, many=True).data
+
 class TaskSerializer(serializers.ModelSerializer):
-    category = CategorySerializer(read_only=True)  # Show category details
-    category_id = serializers.PrimaryKeyRelatedField(
+    category = CachedCategoryField()  # Show category details
+    category_id = CachedCategoryPrimaryKeyField(
         queryset=Category.objects.all(), source='category', write_only=True
     )
-    comments = TaskCommentSerializer(many=True, read_only=True)
+    comment_count = CommentCountField()
+    comments = LatestCommentsField()
 
     class Meta:
         model = Task
-        fields = ['id', 'user', 'title', 'description', 'status', 'due_date', 'assigned_to', 'created_at', 'updated_at', 'category', 'category_id', 'comments']
+        fields = ['id', 'user', 'title', 'description', 'status', 'due_date', 'assigned_to', 'created_at', 'updated_at', 'category', 'category_id', 'comment_count', 'comments']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']  # These fields shouldn't be modified by the user
 
     def validate_title(self, value):
@@ -39,4 +115,34 @@ class TaskSerializer(serializers.ModelSerializer):
         if value not in valid_statuses:
             raise serializers.ValidationError("Invalid status. Choose from: pending, in_progress, completed.")
         return value
-    
\ No newline at end of file
+
+    def update(self, instance, validated_data):
+        # A new due date needs a new reminder
+        if 'due_date' in validated_data and validated_data['due_date'] != instance.due_date:
+            instance.reminder_sent_at = None
+        return super().update(instance, validated_data)
+    
+class BulkTaskListSerializer(serializers.ListSerializer):
+    # Validates every item in one pass but, unlike ListSerializer, keeps the
+    # valid items when others fail: validated_data holds None for failed items
+    # and item_errors holds one error dict per item ({} when valid)
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        self.item_errors = []
+        validated = []
+        for item in data:
+            try:
+                validated.append(self.child.run_validation(item))
+                self.item_errors.append({})
+            except serializers.ValidationError as exc:
+                validated.append(None)
+                self.item_errors.append(exc.detail)
+        return validated
+
+class BulkTaskSerializer(TaskSerializer):
+    """TaskSerializer for batch payloads: validating N items costs no per-item queries."""
+    assigned_to = PreloadedUserField(queryset=get_user_model().objects.all(), allow_null=True, required=False)
+
+    class Meta(TaskSerializer.Meta):
+        list_serializer_class = BulkTaskListSerializer
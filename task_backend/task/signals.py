@@ -0,0 +1,179 @@
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_all_task_lists, invalidate_task
+from .category_cache import category_cache
+from .feed import comment_event, task_event
+from .models import Category, Task, TaskComment, TaskCounter
+from .search import forget_search, refresh_search
+from .sync import record_deletions
+from .task_counters import COMMENTS, apply_deltas, reconcile_counters, task_deltas
+from .task_reminders import schedule_reminders
+
+def bulk_delete(origin):
+    """
+    Whether a delete comes from a task.bulk batch, which applies cache, feed,
+    search, counter and tombstone upkeep set-wise instead of per row.
+    """
+    return isinstance(origin, QuerySet) and getattr(origin, 'bulk', False)
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_lists_on_task_change(sender, instance, origin=None, **kwargs):
+    if not bulk_delete(origin):
+        invalidate_task(instance)
+
+def comment_task(comment):
+    """The comment's task (owner and assignee loaded at least), or None if it is gone."""
+    if TaskComment.task.is_cached(comment):
+        return comment.task
+    task = Task.objects.filter(id=comment.task_id).only('user_id', 'assigned_to_id').first()
+    if task is not None:
+        comment.task = task  # Shared by the other comment handlers
+    return task
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def invalidate_task_lists_on_comment_change(sender, instance, origin=None, **kwargs):
+    # Comments are embedded in every task list the task shows up in
+    if isinstance(origin, Task) or bulk_delete(origin):
+        return  # Cascade from a task delete; the task's own signal covers it
+    task = comment_task(instance)
+    if task is not None:
+        invalidate_task(task)
+
+# Registered before the counter handlers, which replace the loaded snapshot
+@receiver(post_save, sender=Task)
+def publish_task_save(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_counted_values', None)
+    previous_assignee_id = loaded[3] if loaded and not created else None  # Sees the task leave their list
+    task_event('created' if created else 'updated', instance, previous_assignee_id)
+
+@receiver(post_delete, sender=Task)
+def publish_task_delete(sender, instance, origin=None, **kwargs):
+    if not bulk_delete(origin):
+        task_event('deleted', instance)
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def publish_comment_change(sender, instance, origin=None, created=False, **kwargs):
+    if isinstance(origin, Task) or bulk_delete(origin):
+        return  # Cascade from a task delete; subscribers get the task event
+    task = comment_task(instance)
+    if task is not None:
+        action = 'deleted' if kwargs['signal'] is post_delete else 'created' if created else 'updated'
+        comment_event(action, instance, task)
+
+@receiver(post_save, sender=Task)
+def refresh_search_on_task_save(sender, instance, created, update_fields=None, **kwargs):
+    # Status, assignment and due-date saves leave the indexed text alone
+    if update_fields is not None and not set(update_fields) & set(Task.SEARCH_FIELDS):
+        return
+    values = instance.search_values()
+    if created or values is None or values != getattr(instance, '_search_values', None):
+        refresh_search([instance.id])
+    instance._search_values = instance.search_values()
+
+@receiver(post_delete, sender=Task)
+def forget_search_on_task_delete(sender, instance, origin=None, **kwargs):
+    if not bulk_delete(origin):
+        forget_search([instance.id])
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def refresh_search_on_comment_change(sender, instance, origin=None, **kwargs):
+    # Comment text is part of the task's search document
+    if isinstance(origin, Task) or bulk_delete(origin):
+        return
+    refresh_search([instance.task_id])
+
+@receiver(post_save, sender=Task)
+def schedule_reminder_on_task_save(sender, instance, created, **kwargs):
+    # Most saves leave the status and due date alone; those cost nothing here
+    values = instance.reminder_values()
+    if created or values is None or values != getattr(instance, '_reminder_values', None):
+        schedule_reminders([instance], created=created)
+    instance._reminder_values = instance.reminder_values()
+
+def deleted_user_id(origin):
+    # Counters of a user that is being deleted go away with them
+    return origin.pk if isinstance(origin, get_user_model()) else None
+
+@receiver(post_save, sender=Task)
+def update_counters_on_task_save(sender, instance, created, **kwargs):
+    old_values = None if created else getattr(instance, '_counted_values', None)
+    new_values = instance.counted_values()
+    if new_values is None or (old_values is None and not created):
+        # Saved without a snapshot of the counted fields (e.g. loaded with
+        # only()); recount instead of guessing the deltas
+        reconcile_counters([instance.user_id, instance.assigned_to_id])
+    else:
+        apply_deltas(task_deltas(old_values, new_values))
+    instance._counted_values = new_values
+
+@receiver(post_delete, sender=Task)
+def update_counters_on_task_delete(sender, instance, origin=None, **kwargs):
+    if bulk_delete(origin):
+        return  # Recounted by the batch
+    skip_user_id = deleted_user_id(origin)
+    values = getattr(instance, '_counted_values', None) or instance.counted_values()
+    deltas = task_deltas(values, None, skip_user_id=skip_user_id) if values else {}
+    # Its comments were deleted first and counted on the task (see below)
+    deleted_comments = getattr(instance, '_deleted_comments', 0)
+    if deleted_comments and instance.user_id != skip_user_id:
+        deltas[(instance.user_id, COMMENTS, '')] = -deleted_comments
+    apply_deltas(deltas)
+
+@receiver(post_save, sender=TaskComment)
+def update_counters_on_comment_create(sender, instance, created, **kwargs):
+    if not created:
+        return
+    task = comment_task(instance)
+    if task is not None:
+        apply_deltas({(task.user_id, COMMENTS, ''): 1})
+
+@receiver(post_delete, sender=TaskComment)
+def update_counters_on_comment_delete(sender, instance, origin=None, **kwargs):
+    if bulk_delete(origin):
+        return
+    if isinstance(origin, Task):
+        # Cascade from a task delete: the task's handler applies them in one go
+        origin._deleted_comments = getattr(origin, '_deleted_comments', 0) + 1
+        return
+    task = comment_task(instance)
+    if task is not None and task.user_id != deleted_user_id(origin):
+        apply_deltas({(task.user_id, COMMENTS, ''): -1})
+
+@receiver(post_delete, sender=Category)
+def update_counters_on_category_delete(sender, instance, **kwargs):
+    # Its tasks were moved to "no category" with a plain UPDATE; recount their owners
+    owners = TaskCounter.objects.filter(dimension='category', key=str(instance.pk)).values_list('user_id', flat=True)
+    reconcile_counters(list(owners))
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_task_lists_on_category_change(sender, instance, **kwargs):
+    # Category details are embedded in every task list. Both bumps run on
+    # commit, the category generation first (see cached_task_list).
+    category_cache.invalidate()
+    invalidate_all_task_lists()
+
+@receiver(post_delete, sender=Task)
+def record_task_tombstone(sender, instance, origin=None, **kwargs):
+    # Delta syncs report the deletion; nothing to report to a deleted owner
+    if instance.user_id != deleted_user_id(origin) and not bulk_delete(origin):
+        record_deletions('task', [instance.pk], instance.user_id)
+
+@receiver(post_delete, sender=TaskComment)
+def record_comment_tombstone(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Task) or bulk_delete(origin):
+        return  # Cascade from a task delete; clients drop a deleted task's comments
+    task = comment_task(instance)
+    if task is not None and task.user_id != deleted_user_id(origin):
+        record_deletions('comment', [instance.pk], task.user_id)
+
+@receiver(post_delete, sender=Category)
+def record_category_tombstone(sender, instance, **kwargs):
+    record_deletions('category', [instance.pk])  # Categories are shared: everyone's sync reports it
@@ -0,0 +1,141 @@
+import base64
+import json
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import TaskComment, Tombstone
+
+# A delta sync walks three streams, each in (timestamp, id) order over an
+# index: the user's tasks by updated_at, comments on them by timestamp, and
+# tombstones by deleted_at. The cursor records how far each stream got.
+STREAMS = {
+    'tasks': 'updated_at',
+    'comments': 'timestamp',
+    'deleted': 'deleted_at',
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class ExpiredCursor(ValueError):
+    """The cursor predates the oldest tombstone still kept; the client must sync from scratch."""
+
+
+def sync_limit(request_limit=None):
+    default, maximum = getattr(settings, 'TASK_SYNC_LIMIT', 500), getattr(settings, 'TASK_SYNC_MAX_LIMIT', 2000)
+    if request_limit is None:
+        return default
+    try:
+        limit = int(request_limit)
+    except ValueError:
+        return default
+    return min(limit, maximum) if limit > 0 else default
+
+
+def _lag():
+    # Rows are stamped when saved but become visible at commit. A caught-up
+    # stream restarts this far back next time, so a transaction that
+    # committed late is not skipped (clients upsert, repeats are harmless).
+    return timedelta(seconds=getattr(settings, 'TASK_SYNC_LAG', 5))
+
+
+def _retention():
+    return timedelta(days=getattr(settings, 'TASK_SYNC_TOMBSTONE_DAYS', 30))
+
+
+def encode_cursor(positions):
+    payload = {stream: [value.isoformat(), pk] for stream, (value, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        positions = {}
+        for stream in STREAMS:
+            value = parse_datetime(payload[stream][0])
+            if value is None:
+                raise ValueError
+            positions[stream] = (value, int(payload[stream][1]))
+    except (TypeError, ValueError, KeyError, IndexError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor.')
+    return positions
+
+
+def _page(queryset, field, position, limit):
+    value, pk = position
+    if value is not None:
+        # (field, id) > (value, pk), written so the first conjunct bounds the index range
+        queryset = queryset.filter(Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(id__gt=pk)))
+    rows = list(queryset.order_by(field, 'id')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def changes_since(user, tasks, token=None, limit=None):
+    """
+    One batch of changes to ``user``'s tasks since the sync ``token``
+    (everything, when there is none): ``(tasks, comments, tombstones,
+    next_token, has_more)``. ``tasks`` is the queryset to read tasks from
+    (e.g. with what the serializer needs preloaded).
+
+    Each stream is one keyset query over its index, so a sync costs time
+    proportional to what changed. Raises ``InvalidCursor`` for a garbled
+    token and ``ExpiredCursor`` once tombstones it would need were purged.
+    """
+    limit = limit or sync_limit()
+    now = timezone.now()
+    caught_up = (now - _lag(), 0)
+    if token:
+        positions = decode_cursor(token)
+        if positions['deleted'][0] < now - _retention():
+            raise ExpiredCursor('Cursor expired; sync from scratch.')
+    else:
+        # A fresh client has nothing to delete; only later deletions matter
+        positions = {'tasks': (None, None), 'comments': (None, None), 'deleted': caught_up}
+
+    querysets = {
+        'tasks': tasks.filter(user=user),
+        'comments': TaskComment.objects.filter(task__user=user).select_related('user'),
+        'deleted': Tombstone.objects.filter(Q(user=user) | Q(user__isnull=True)),
+    }
+    results, next_positions, has_more = {}, {}, False
+    for stream, field in STREAMS.items():
+        rows, more = _page(querysets[stream], field, positions[stream], limit)
+        results[stream] = rows
+        if more:
+            next_positions[stream] = (getattr(rows[-1], field), rows[-1].pk)
+            has_more = True
+        else:
+            next_positions[stream] = caught_up
+    return results['tasks'], results['comments'], results['deleted'], encode_cursor(next_positions), has_more
+
+
+def group_tombstones(tombstones):
+    """Deleted ids by list: ``{'tasks': [...], 'comments': [...], 'categories': [...]}``."""
+    deleted = {'tasks': [], 'comments': [], 'categories': []}
+    for tombstone in tombstones:
+        deleted[{'task': 'tasks', 'comment': 'comments', 'category': 'categories'}[tombstone.kind]].append(
+            tombstone.object_id)
+    return deleted
+
+
+def record_deletions(kind, object_ids, user_id=None):
+    """Tombstones for deleted rows that delta syncs must report (bulk paths skip the signals that add them)."""
+    Tombstone.objects.bulk_create(
+        [Tombstone(user_id=user_id, kind=kind, object_id=object_id) for object_id in object_ids]
+    )
+
+
+@shared_task
+def purge_tombstones():
+    """Drop tombstones older than ``TASK_SYNC_TOMBSTONE_DAYS``; older cursors get a full resync."""
+    count, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - _retention()).delete()
+    logging.info(f"Purged {count} tombstones.")
@@ -0,0 +1,170 @@
+from collections import Counter
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+import logging
+
+from .models import Task, TaskComment, TaskCounter
+
+STATUS = 'status'
+CATEGORY = 'category'
+ASSIGNED = 'assigned'
+COMMENTS = 'comments'
+
+
+def task_counter_keys(user_id, status, category_id, assigned_to_id):
+    """The ``(user_id, dimension, key)`` counters one task counts towards."""
+    keys = [(user_id, STATUS, status), (user_id, CATEGORY, str(category_id) if category_id else '')]
+    if assigned_to_id is not None:
+        keys.append((assigned_to_id, ASSIGNED, ''))
+    return keys
+
+
+def task_deltas(old_values, new_values, skip_user_id=None):
+    """
+    Counter deltas for a task going from ``old_values`` to ``new_values``
+    (``Task.counted_values()`` tuples; None for created/deleted).
+    """
+    deltas = Counter()
+    if old_values is not None:
+        deltas.subtract(task_counter_keys(*old_values))
+    if new_values is not None:
+        deltas.update(task_counter_keys(*new_values))
+    return {key: delta for key, delta in deltas.items() if delta and key[0] != skip_user_id}
+
+
+def _bump(user_id, dimension, key, delta):
+    counters = TaskCounter.objects.filter(user_id=user_id, dimension=dimension, key=key)
+    if counters.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            TaskCounter.objects.create(user_id=user_id, dimension=dimension, key=key, count=delta)
+    except IntegrityError:
+        # Someone created the row in between
+        counters.update(count=F('count') + delta)
+
+
+def apply_deltas(deltas):
+    """Apply ``{(user_id, dimension, key): delta}`` with one UPDATE per counter."""
+    for (user_id, dimension, key), delta in deltas.items():
+        if delta:
+            _bump(user_id, dimension, key, delta)
+
+
+def compute_counters(user_ids=None):
+    """
+    Counters recomputed from the task tables: ``{(user_id, dimension, key): count}``.
+
+    One GROUP BY per source: tasks by (owner, status, category), tasks by
+    assignee, and comments by task owner.
+    """
+    tasks = Task.objects.order_by()
+    assigned = Task.objects.order_by().filter(assigned_to__isnull=False)
+    comments = TaskComment.objects.order_by()
+    if user_ids is not None:
+        tasks = tasks.filter(user_id__in=user_ids)
+        assigned = assigned.filter(assigned_to_id__in=user_ids)
+        comments = comments.filter(task__user_id__in=user_ids)
+
+    counters = Counter()
+    for row in tasks.values('user_id', 'status', 'category_id').annotate(n=Count('id')):
+        counters[(row['user_id'], STATUS, row['status'])] += row['n']
+        counters[(row['user_id'], CATEGORY, str(row['category_id'] or ''))] += row['n']
+    for row in assigned.values('assigned_to_id').annotate(n=Count('id')):
+        counters[(row['assigned_to_id'], ASSIGNED, '')] += row['n']
+    for row in comments.values('task__user_id').annotate(n=Count('id')):
+        counters[(row['task__user_id'], COMMENTS, '')] += row['n']
+    return counters
+
+
+# Users reconciled per transaction when rebuilding everyone's counters
+RECONCILE_BATCH_SIZE = 500
+
+
+def reconcile_counters(user_ids=None):
+    """
+    Bring the counters of ``user_ids`` (everyone if None) in line with a
+    fresh recount. Bulk write paths call this for the users they touched,
+    since they skip the signals that maintain counters incrementally.
+
+    Everyone is reconciled a batch of users at a time; each batch is one
+    transaction, so no batch holds many locks for long.
+    """
+    if user_ids is None:
+        everyone = list(get_user_model().objects.order_by('id').values_list('id', flat=True))
+        return sum(
+            reconcile_counters(everyone[start:start + RECONCILE_BATCH_SIZE])
+            for start in range(0, len(everyone), RECONCILE_BATCH_SIZE)
+        )
+
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return 0
+    with transaction.atomic():
+        # Lock the stored rows before counting: a concurrent write's delta
+        # either committed before the recount (which then includes it) or
+        # waits for this transaction and applies on top of its numbers.
+        stored = {
+            (user_id, dimension, key): (counter_id, count)
+            for counter_id, user_id, dimension, key, count in TaskCounter.objects.select_for_update()
+            .filter(user_id__in=user_ids).values_list('id', 'user_id', 'dimension', 'key', 'count')
+        }
+        counters = compute_counters(user_ids)
+        # Keys no longer counted drop to zero, like the incremental updates
+        # leave them; only users left with nothing lose their rows.
+        counted_users = {user_id for user_id, _, _ in counters}
+        gone = [counter_id for (user_id, _, _), (counter_id, _) in stored.items() if user_id not in counted_users]
+        for key in stored.keys() - counters.keys():
+            if key[0] in counted_users:
+                counters[key] = 0
+        changed = [
+            TaskCounter(user_id=user_id, dimension=dimension, key=key, count=count)
+            for (user_id, dimension, key), count in counters.items()
+            if stored.get((user_id, dimension, key), (None, None))[1] != count
+        ]
+        TaskCounter.objects.filter(id__in=gone).delete()
+        TaskCounter.objects.bulk_create(
+            changed, update_conflicts=True, unique_fields=['user', 'dimension', 'key'], update_fields=['count'],
+            batch_size=1000,
+        )
+    return len(counters)
+
+
+def dashboard_stats(user):
+    """
+    The dashboard numbers for ``user``: one read of their counter rows plus
+    an indexed count of overdue tasks (overdue-ness changes with the clock,
+    not with writes, so it cannot be a maintained counter).
+    """
+    stats = {
+        'total': 0,
+        'by_status': {status: 0 for status, _ in Task.STATUS_CHOICES},
+        'by_category': {},
+        'assigned_to_me': 0,
+        'comments': 0,
+    }
+    for dimension, key, count in TaskCounter.objects.filter(user=user).values_list('dimension', 'key', 'count'):
+        if dimension == STATUS:
+            stats['by_status'][key] = count
+            stats['total'] += count
+        elif dimension == CATEGORY and count:
+            stats['by_category'][key] = count
+        elif dimension == ASSIGNED:
+            stats['assigned_to_me'] = count
+        elif dimension == COMMENTS:
+            stats['comments'] = count
+    stats['overdue'] = Task.objects.filter(
+        user=user, status__in=['pending', 'in_progress'], due_date__lt=timezone.now()
+    ).count()
+    return stats
+
+
+@shared_task
+def reconcile_task_counters():
+    """Periodically rebuild every user's dashboard counters from scratch."""
+    count = reconcile_counters()
+    logging.info(f"Reconciled {count} task counters.")
@@ -1,23 +1,102 @@
 # tasks/tasks.py
 
+from datetime import datetime, timezone as dt_timezone
+
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
-from .models import Task
-from django.core.mail import send_mail
+from .models import Task, TaskReminder
+from .outbox import enqueue_email
 from django.conf import settings
 import logging
 
+# Reminders are scheduled per task rather than found by scanning: a task that
+# needs one has a TaskReminder row filed under the time bucket its reminder
+# is due in (due date minus the lead), kept current when the task is saved.
+# Each run fires the buckets up to the current one and nothing else, so its
+# cost follows the number of reminders due, not the number of pending tasks.
+
+
+def _lead():
+    return timezone.timedelta(minutes=getattr(settings, 'TASK_REMINDER_LEAD_MINUTES', 60))
+
+
+def _lookback():
+    return timezone.timedelta(minutes=getattr(settings, 'TASK_REMINDER_LOOKBACK_MINUTES', 24 * 60))
+
+
+def bucket_of(moment):
+    """Start of the ``TASK_REMINDER_BUCKET_SECONDS`` bucket ``moment`` falls in."""
+    width = getattr(settings, 'TASK_REMINDER_BUCKET_SECONDS', 60)
+    return datetime.fromtimestamp(int(moment.timestamp()) // width * width, tz=dt_timezone.utc)
+
+
+def _due_date(task):
+    # As saved: a just-assigned value may still be a date or a naive datetime
+    return Task._meta.get_field('due_date').get_prep_value(task.due_date)
+
+
+def needs_reminder(task, now):
+    # Pending, not reminded yet, and not so long overdue that a reminder is pointless
+    return (task.status == 'pending' and task.reminder_sent_at is None and task.due_date is not None
+            and _due_date(task) > now - _lookback())
+
+
+def schedule_reminders(tasks, created=False):
+    """
+    File, refile or drop the reminders of these tasks to match their status,
+    due date and ``reminder_sent_at``: one upsert and one delete at most,
+    whatever was scheduled before, so calling it again is harmless. Called
+    from signals and from bulk write paths, which skip them. ``created``
+    says the tasks are new, so there is nothing to drop.
+    """
+    now = timezone.now()
+    filed, dropped = [], []
+    for task in tasks:
+        if needs_reminder(task, now):
+            filed.append(TaskReminder(task_id=task.id, bucket=bucket_of(_due_date(task) - _lead())))
+        else:
+            dropped.append(task.id)
+    if filed:
+        TaskReminder.objects.bulk_create(filed, update_conflicts=True, unique_fields=['task'],
+                                         update_fields=['bucket'])
+    if dropped and not created:
+        TaskReminder.objects.filter(task_id__in=dropped).delete()
+
+
 @shared_task
 def send_due_date_reminders():
-    """Send reminder emails for tasks that are due soon."""
+    """
+    Queue the reminders whose bucket came due in the email outbox
+    (task.outbox delivers them).
+
+    Each task is reminded at most once per due date: a reminder is claimed
+    by deleting its row, for the bucket it was read in, in the transaction
+    that queues its email, so overlapping runs never queue it twice and one
+    rescheduled meanwhile is left for its new bucket.
+    """
     now = timezone.now()
-    upcoming_tasks = Task.objects.filter(due_date__lte=now + timezone.timedelta(hours=1), status='pending')
-    logging.info(f"Found {len(upcoming_tasks)} upcoming tasks for reminders.")
-    for task in upcoming_tasks:
-        # Send reminder email
-        send_mail(
-            subject=f"Reminder: Task '{task.title}' is due soon",
-            message=f"Your task '{task.title}' is due on {task.due_date}. Please complete it on time.",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[task.user.email],
-        )
+    chunk_size = getattr(settings, 'TASK_REMINDER_CHUNK_SIZE', 500)
+
+    due_reminders = (
+        TaskReminder.objects.filter(bucket__lte=bucket_of(now))
+        .select_related('task__user')
+        .only('bucket', 'task__id', 'task__title', 'task__status', 'task__due_date', 'task__reminder_sent_at',
+              'task__user__email')
+    )
+    queued = 0
+    for reminder in due_reminders.iterator(chunk_size=chunk_size):
+        task = reminder.task
+        with transaction.atomic():
+            claimed, _ = TaskReminder.objects.filter(task_id=task.id, bucket=reminder.bucket).delete()
+            if not claimed or not needs_reminder(task, now):
+                continue
+            Task.objects.filter(id=task.id).update(reminder_sent_at=now)
+            enqueue_email(
+                subject=f"Reminder: Task '{task.title}' is due soon",
+                body=f"Your task '{task.title}' is due on {task.due_date}. Please complete it on time.",
+                recipients=[task.user.email],
+                dedupe_key=f"task-reminder:{task.id}:{task.due_date.isoformat()}",
+            )
+        queued += 1
+    logging.info(f"Queued {queued} due date reminders.")
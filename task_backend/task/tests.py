@@ -1,13 +1,45 @@
-from django.core.mail import send_mail
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.core.mail import get_connection, send_mail
 from django.conf import settings
-from rest_framework.test import APITestCase
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 from unittest.mock import patch
 from rest_framework import status
 from django.utils import timezone
 from django.utils.timezone import make_aware
+from django.utils.translation import gettext_lazy
 from datetime import timedelta
-from task.models import Category, Task
-from .task_reminders import send_due_date_reminders
+from task.models import Category, OutboxEmail, Task, TaskComment, TaskCounter, TaskReminder, Tombstone
+from task import signals
+from .cache import invalidate_all_task_lists, invalidate_user_task_lists, stats as cache_stats
+from backend.db_router import PIN_KEY
+from backend.metrics import registry as metrics_registry
+from .category_cache import GENERATION_KEY, CategoryCache, category_cache
+from .fast_serializers import compile_plan, fast_task_list
+from .feed import InProcessBroker, get_broker, issue_ticket
+from .search import search_index
+from .renderers import FastJSONRenderer
+from .serializers import CategorySerializer, TaskSerializer
+from .views import task_queryset
+from .task_counters import compute_counters, reconcile_counters, reconcile_task_counters
+from .outbox import deliver_outbox, enqueue_email
+from .task_reminders import bucket_of, send_due_date_reminders
 from django.conf import settings
 
 
@@ -15,9 +47,11 @@ class TaskCategoryAPITestCase(APITestCase):
     
     def setUp(self):
         """Set up test data for each test"""
-        self.user = settings.AUTH_USER_MODEL.objects.create_user(email="testuser@gmail.com", password="password123")
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="testuser@gmail.com", password="password123")
         self.client.force_authenticate(user=self.user)  # Authenticate user
-        self.category = Category.objects.create(name="Work")
+        with self.captureOnCommitCallbacks(execute=True):  # The category cache is invalidated on commit
+            self.category = Category.objects.create(name="Work")
         self.task = Task.objects.create(
             user=self.user,
             title="Finish API",
@@ -195,14 +229,13 @@ class TaskCategoryAPITestCase(APITestCase):
         self.assertIn(task_tomorrow.id, [task['id'] for task in response.data])
         self.assertNotIn(task_later.id, [task['id'] for task in response.data])
     
-    @patch('task.task_reminders.send_mail')
     @patch('django.utils.timezone.now')
-    def test_send_due_soon_email_reminder(self, mock_now, mock_send_mail):
+    def test_send_due_soon_email_reminder(self, mock_now):
         """Test sending email reminders for tasks with due dates within 24 hours."""
         mock_now.return_value = timezone.make_aware(timezone.datetime(2025, 2, 12, 18, 50, 32))
         
         # Create a test user
-        test_user = settings.AUTH_USER_MODEL.objects.create_user( 
+        test_user = get_user_model().objects.create_user( 
             email='sakshiwadhwabuffer@gmail.com', 
             password='password'
         )
@@ -217,20 +250,21 @@ class TaskCategoryAPITestCase(APITestCase):
             user=test_user
         )
         
-        # Manually trigger the Celery task
+        # Manually trigger the Celery tasks: queue the reminder, then deliver the outbox
         send_due_date_reminders()
+        deliver_outbox()
 
-        # Assert that send_mail was called with the expected arguments
-        mock_send_mail.assert_called_with(
-            subject = "Reminder: Task 'Test Task Due Soon' is due soon",
-            message = f"Your task 'Test Task Due Soon' is due on {due_date}. Please complete it on time.",
-            from_email = settings.DEFAULT_FROM_EMAIL,
-            recipient_list = [test_user.email],
-        )
+        # Assert that the email went out with the expected contents
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Reminder: Task 'Test Task Due Soon' is due soon")
+        self.assertEqual(mail.outbox[0].body,
+                         f"Your task 'Test Task Due Soon' is due on {due_date}. Please complete it on time.")
+        self.assertEqual(mail.outbox[0].from_email, settings.DEFAULT_FROM_EMAIL)
+        self.assertEqual(mail.outbox[0].to, [test_user.email])
 
     def test_assign_task_to_user(self):
         """Test assigning a task to another user"""
-        response = self.client.patch(f"/task/{self.task.id}/assign/", {"user_id": self.user.id})
+        response = self.client.patch(reverse("assign-unassign-task", args=[self.task.id]), {"user_id": self.user.id})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.task.refresh_from_db()
@@ -240,9 +274,1436 @@ class TaskCategoryAPITestCase(APITestCase):
         """Test unassigning a task (removing assigned user)"""
         self.task.assigned_to = self.user
         self.task.save()
-        response = self.client.patch(f"/task/{self.task.id}/assign/", {})
+        response = self.client.patch(reverse("assign-unassign-task", args=[self.task.id]), {})
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.task.refresh_from_db()
         self.assertIsNone(self.task.assigned_to)
     
+
+class TaskCursorPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        """Create a user with enough tasks to span several pages"""
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="pager@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        now = timezone.now()
+        self.tasks = [
+            Task.objects.create(user=self.user, title=f"Task {i}", due_date=now + timedelta(days=i % 3))
+            for i in range(7)
+        ]
+        # Tasks without a due date sort after every dated task
+        self.tasks.append(Task.objects.create(user=self.user, title="No due date"))
+
+    def expected_ids(self):
+        dated = sorted((t for t in self.tasks if t.due_date), key=lambda t: (t.due_date, t.id))
+        return [t.id for t in dated] + [t.id for t in self.tasks if t.due_date is None]
+
+    def walk(self, url):
+        ids = []
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            ids.extend(task["id"] for task in response.data["results"])
+            url = response.data["next"]
+        return ids, pages
+
+    def test_list_tasks_without_cursor_params_is_not_paginated(self):
+        """Test that pagination is opt-in"""
+        response = self.client.get("/task/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), len(self.tasks))
+
+    def test_walk_forward_by_due_date(self):
+        """Test following next links visits every task once in (due_date, id) order"""
+        ids, pages = self.walk("/task/?page_size=3")
+
+        self.assertEqual(ids, self.expected_ids())
+        self.assertEqual([len(page["results"]) for page in pages], [3, 3, 2])
+        self.assertIsNone(pages[0]["previous"])
+
+    def test_walk_backward_with_previous_link(self):
+        """Test following a previous link returns the page before"""
+        first = self.client.get("/task/?page_size=3").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+
+        self.assertEqual(back["results"], first["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_descending_updated_at_ordering(self):
+        """Test paging by -updated_at on the filter endpoint"""
+        ids, _ = self.walk("/task/filter_task/?status=pending&ordering=-updated_at&page_size=2")
+
+        expected = [t.id for t in sorted(self.tasks, key=lambda t: (t.updated_at, t.id), reverse=True)]
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        """Test that a garbage cursor is rejected"""
+        response = self.client.get("/task/?cursor=not-a-cursor")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class TaskListQueryCountTestCase(APITestCase):
+
+    def setUp(self):
+        """Seed tasks with categories and comments from several authors"""
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(email="owner@gmail.com", password="password123")
+        self.commenters = [
+            User.objects.create_user(email=f"commenter{i}@gmail.com", password="password123") for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):  # The category cache is invalidated on commit
+            self.categories = [Category.objects.create(name=f"Cat {i}") for i in range(3)]
+        category_cache.all()  # Warm the in-process category cache
+
+    def seed(self, count):
+        with self.captureOnCommitCallbacks(execute=True):  # Cache versions are bumped on commit
+            for i in range(count):
+                task = Task.objects.create(
+                    user=self.user,
+                    title=f"Seeded {i}",
+                    category=self.categories[i % 3],
+                    assigned_to=self.user,
+                    due_date=timezone.now(),
+                )
+                for author in self.commenters:
+                    TaskComment.objects.create(task=task, user=author, text="hello")
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_list_endpoints_use_constant_queries(self):
+        """Test that list endpoints cost the same number of queries for 2 and 20 tasks"""
+        urls = ["/task/", "/task/filter_task/?status=pending", "/task/assigned_task_list/",
+                f"/task/categories/task_by_category/{self.categories[0].id}/", "/task/due_soon/",
+                "/task/?page_size=50"]
+        self.seed(2)
+        small = {url: self.count_queries(url) for url in urls}
+        self.seed(18)
+        large = {url: self.count_queries(url) for url in urls}
+
+        self.assertEqual(small, large)
+
+    def test_list_tasks_query_count(self):
+        """Test the exact query budget of list_tasks on a seeded dataset"""
+        self.seed(10)
+        # Task rows with comment counts + latest comments joined with authors; the ETag and
+        # categories come from the cache
+        with self.assertNumQueries(2):
+            response = self.client.get("/task/")
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0]["comment_count"], 3)
+        self.assertEqual(response.data[0]["comments"][0]["user"], "commenter2@gmail.com")  # Newest first
+
+class TaskCommentPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="talker@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Busy")
+        self.task = Task.objects.create(user=self.user, title="Busy thread", category=category)
+        self.comments = [TaskComment.objects.create(task=self.task, user=self.user, text=f"Comment {i}")
+                         for i in range(7)]
+
+    def test_task_lists_embed_count_and_preview(self):
+        """Test that task lists carry the comment count and only the latest comments"""
+        with self.settings(TASK_COMMENT_PREVIEW=2):
+            task = self.client.get("/task/").data[0]
+            none = self.client.get("/task/?comment_preview=0").data[0]
+
+        self.assertEqual(task["comment_count"], 7)
+        self.assertEqual([c["text"] for c in task["comments"]], ["Comment 6", "Comment 5"])
+        self.assertEqual(none["comment_count"], 7)
+        self.assertEqual(none["comments"], [])
+
+    def test_comments_are_cursor_paginated(self):
+        """Test walking a thread page by page, newest first, in a fixed number of queries"""
+        url, texts, page_queries = f"/task/{self.task.id}/comments/?page_size=3", [], set()
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page_queries.add(len(ctx.captured_queries))
+            texts += [comment["text"] for comment in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(texts, [f"Comment {i}" for i in reversed(range(7))])
+        self.assertEqual(len(page_queries), 1)
+
+    def test_invalid_comment_cursor(self):
+        """Test that a garbage cursor is rejected"""
+        response = self.client.get(f"/task/{self.task.id}/comments/?cursor=nope")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class DueDateReminderTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="reminded@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+
+    def remind(self):
+        send_due_date_reminders()
+        deliver_outbox()
+
+    def test_reminder_is_sent_once(self):
+        """Test that repeated sweeps do not re-send the same reminder"""
+        task = Task.objects.create(user=self.user, title="Due soon", due_date=timezone.now() + timedelta(minutes=30))
+
+        self.remind()
+        self.remind()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        task.refresh_from_db()
+        self.assertIsNotNone(task.reminder_sent_at)
+
+    def test_long_overdue_and_completed_tasks_are_skipped(self):
+        """Test that the sweep only looks at pending tasks inside the reminder window"""
+        Task.objects.create(user=self.user, title="Ancient", due_date=timezone.now() - timedelta(days=30))
+        Task.objects.create(user=self.user, title="Done", status="completed", due_date=timezone.now())
+        Task.objects.create(user=self.user, title="Far away", due_date=timezone.now() + timedelta(days=3))
+
+        self.remind()
+
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_changing_due_date_rearms_reminder(self):
+        """Test that moving the due date through update_task allows a new reminder"""
+        task = Task.objects.create(user=self.user, title="Moved", due_date=timezone.now() + timedelta(minutes=30))
+        self.remind()
+
+        new_due_date = timezone.now() + timedelta(minutes=45)
+        response = self.client.patch(f"/task/{task.id}/update/", {"due_date": new_due_date.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.remind()
+
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_sweep_query_count_does_not_grow_with_backlog(self):
+        """Test that already-reminded tasks cost nothing on later sweeps"""
+        for i in range(10):
+            Task.objects.create(user=self.user, title=f"Batch {i}", due_date=timezone.now() + timedelta(minutes=10))
+        send_due_date_reminders()
+
+        with self.assertNumQueries(1):
+            send_due_date_reminders()
+
+    def test_schedule_follows_status_and_due_date(self):
+        """Test that saving a task files, moves and drops its reminder"""
+        due_date = timezone.now() + timedelta(days=3)
+        task = Task.objects.create(user=self.user, title="Scheduled", due_date=due_date)
+        self.assertEqual(TaskReminder.objects.get(task=task).bucket, bucket_of(due_date - timedelta(hours=1)))
+
+        self.client.patch(f"/task/{task.id}/update/", {"status": "completed"})
+        self.assertFalse(TaskReminder.objects.filter(task=task).exists())
+        self.client.patch(f"/task/{task.id}/update/", {"status": "pending", "due_date": timezone.now().isoformat()})
+        self.assertEqual(TaskReminder.objects.get(task=task).bucket, bucket_of(timezone.now() - timedelta(hours=1)))
+
+        task = Task.objects.get(id=task.id)
+        task.title = "Renamed"
+        with self.assertNumQueries(0):
+            # Saves that leave status and due date alone do not touch the schedule
+            signals.schedule_reminder_on_task_save(Task, task, created=False)
+
+    def test_run_only_reads_due_buckets(self):
+        """Test that reminders filed for later are neither sent nor loaded"""
+        for i in range(5):
+            Task.objects.create(user=self.user, title=f"Later {i}", due_date=timezone.now() + timedelta(days=2))
+
+        with CaptureQueriesContext(connection) as ctx:
+            send_due_date_reminders()
+
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(TaskReminder.objects.count(), 5)
+
+class EmailOutboxTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="outbox@gmail.com", password="password123")
+
+    def test_batch_is_sent_over_one_connection(self):
+        """Test that a delivery run opens one mail connection for a whole batch"""
+        for i in range(5):
+            enqueue_email(f"Hello {i}", "Body", [self.user.email])
+        connection = get_connection()
+
+        with patch("task.outbox.get_connection", return_value=connection) as get_connection_mock, \
+                patch.object(connection, "open", wraps=connection.open) as open_mock:
+            stats = deliver_outbox()
+
+        get_connection_mock.assert_called_once()
+        open_mock.assert_called_once()
+        self.assertEqual((stats["sent"], stats["batches"]), (5, 1))
+        self.assertEqual([message.subject for message in mail.outbox], [f"Hello {i}" for i in range(5)])
+        self.assertFalse(OutboxEmail.objects.filter(status="pending").exists())
+
+    def test_dedupe_key_queues_once(self):
+        """Test that queuing the same dedupe key twice sends one email"""
+        enqueue_email("Once", "Body", [self.user.email], dedupe_key="welcome:1")
+        enqueue_email("Once", "Body", [self.user.email], dedupe_key="welcome:1")
+        deliver_outbox()
+
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failures_back_off_then_give_up(self):
+        """Test that a failed email is retried later with a growing delay, and marked failed in the end"""
+        enqueue_email("Flaky", "Body", [self.user.email])
+        email = OutboxEmail.objects.get()
+
+        with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=ConnectionError("down")):
+            self.assertEqual(deliver_outbox()["retried"], 1)
+            email.refresh_from_db()
+            delay = email.next_attempt_at - timezone.now()
+            self.assertGreater(delay, timedelta(seconds=55))
+            self.assertEqual(deliver_outbox()["batches"], 0)  # Not due yet
+
+            with self.settings(TASK_OUTBOX_MAX_ATTEMPTS=2):
+                OutboxEmail.objects.update(next_attempt_at=timezone.now())
+                self.assertEqual(deliver_outbox()["failed"], 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ("failed", 2))
+        self.assertIn("down", email.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_email_is_only_queued_with_its_transaction(self):
+        """Test that an email queued in a rolled-back transaction is never sent"""
+        with transaction.atomic():
+            enqueue_email("Rolled back", "Body", [self.user.email])
+            transaction.set_rollback(True)
+        deliver_outbox()
+
+        self.assertEqual(len(mail.outbox), 0)
+
+class TaskListCacheTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+        User = get_user_model()
+        self.user = User.objects.create_user(email="cached@gmail.com", password="password123")
+        self.other = User.objects.create_user(email="assignee@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="Home")
+        self.task = Task.objects.create(user=self.user, title="Cached task", category=self.category)
+
+    def test_repeat_read_is_served_from_cache(self):
+        """Test that a repeated list call skips the database"""
+        first = self.client.get("/task/filter_task/?status=pending")
+        with self.assertNumQueries(0):
+            second = self.client.get("/task/filter_task/?status=pending")
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(cache_stats.snapshot(), {"hits": 1, "misses": 1})
+
+    def test_query_parameter_order_is_normalized(self):
+        """Test that the same filters in a different order share an entry"""
+        self.client.get(f"/task/filter_task/?status=pending&category_id={self.category.id}")
+        self.client.get(f"/task/filter_task/?category_id={self.category.id}&status=pending")
+
+        self.assertEqual(cache_stats.snapshot(), {"hits": 1, "misses": 1})
+
+    def test_create_task_invalidates_list(self):
+        """Test that creating a task bumps the owner's cache version"""
+        self.client.get("/task/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/task/create/", {"title": "Fresh task", "category_id": self.category.id})
+        response = self.client.get("/task/")
+
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(cache_stats.snapshot()["hits"], 0)
+
+    def test_comment_invalidates_list(self):
+        """Test that comment writes show up in cached task lists"""
+        self.client.get("/task/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/task/{self.task.id}/comments/", {"text": "New comment"})
+        response = self.client.get("/task/")
+
+        self.assertEqual(len(response.data[0]["comments"]), 1)
+
+    def test_reassignment_invalidates_previous_assignee(self):
+        """Test that the previous assignee's assigned list is refreshed"""
+        self.task.assigned_to = self.other
+        self.task.save()
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(len(self.client.get("/task/assigned_task_list/").data), 1)
+
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/task/{self.task.id}/assign_unassign_task/", {}, format="json")
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(len(self.client.get("/task/assigned_task_list/").data), 0)
+
+    def test_category_rename_invalidates_every_user(self):
+        """Test that renaming a category refreshes embedded category details"""
+        self.client.get("/task/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f"/task/categories/{self.category.id}/update/", {"name": "House"})
+        response = self.client.get("/task/")
+
+        self.assertEqual(response.data[0]["category"]["name"], "House")
+
+    def test_invalidation_waits_for_commit(self):
+        """Test that readers keep the old entry until the write commits, then see the new rows"""
+        self.client.get("/task/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.title = "Renamed task"
+            self.task.save()
+            self.assertEqual(self.client.get("/task/").data[0]["title"], "Cached task")
+
+        self.assertEqual(self.client.get("/task/").data[0]["title"], "Renamed task")
+
+class CategoryCacheTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="categories@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):  # The category cache is invalidated on commit
+            self.category = Category.objects.create(name="Errands", description="Outside")
+        Task.objects.create(user=self.user, title="Groceries", category=self.category)
+        category_cache.all()  # Warm the cache
+
+    def test_category_reads_need_no_queries(self):
+        """Test that listing categories is served from the in-process cache"""
+        with self.assertNumQueries(0):
+            response = self.client.get("/task/categories/")
+
+        self.assertEqual(response.data, [{"id": self.category.id, "name": "Errands", "description": "Outside"}])
+
+    def test_nested_category_matches_category_serializer(self):
+        """Test that task lists render the same category payload as CategorySerializer"""
+        response = self.client.get(f"/task/categories/task_by_category/{self.category.id}/")
+
+        self.assertEqual(response.data[0]["category"], CategorySerializer(self.category).data)
+
+    def test_unknown_category_is_not_found(self):
+        """Test that a missing category still returns 404"""
+        response = self.client.get("/task/categories/task_by_category/999999/")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_save_signal_refreshes_cache(self):
+        """Test that renaming a category is visible immediately"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Chores"
+            self.category.save()
+
+        self.assertEqual(category_cache.get(self.category.id)["name"], "Chores")
+
+    def test_other_worker_invalidation_is_picked_up(self):
+        """Test that a bump of the shared generation reloads a stale local copy"""
+        worker = CategoryCache(ttl=0)
+        worker.all()
+        Category.objects.filter(id=self.category.id).update(name="Renamed")  # No signal, like another worker's stale view
+        self.assertEqual(worker.get(self.category.id)["name"], "Errands")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            category_cache.invalidate()
+
+        self.assertEqual(worker.get(self.category.id)["name"], "Renamed")
+
+    def test_invalidation_waits_for_commit(self):
+        """Test that other workers are told about a category change only once it commits"""
+        generation = category_cache.generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Chores"
+            self.category.save()
+            self.assertEqual(category_cache.generation(), generation)
+        self.assertNotEqual(category_cache.generation(), generation)
+
+    def test_list_rebuilds_pick_up_category_changes_within_the_ttl(self):
+        """Test that a list rebuilt after another worker's rename does not cache the old name"""
+        self.assertEqual(self.client.get("/task/").data[0]["category"]["name"], "Errands")
+
+        # Another worker renamed it: only the shared counters tell this one
+        Category.objects.filter(id=self.category.id).update(name="Chores")
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.incr(GENERATION_KEY)
+            invalidate_all_task_lists()
+
+        self.assertEqual(self.client.get("/task/").data[0]["category"]["name"], "Chores")
+
+    def test_unknown_ids_are_remembered_until_the_generation_changes(self):
+        """Test that bogus category ids do not reload the table, but new categories still show up"""
+        worker = CategoryCache(ttl=60)
+        worker.all()
+        with self.assertNumQueries(0):
+            self.assertIsNone(worker.get(999999))
+            self.assertIsNone(worker.get(999999))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            created = Category.objects.create(name="Later")  # Bumps the shared generation on commit
+
+        self.assertEqual(worker.get(created.id)["name"], "Later")
+
+class ConditionalGetTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="poller@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(user=self.user, title="Polled task")
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        """Test that a poll with a matching ETag costs no query and no body, however many comments there are"""
+        TaskComment.objects.bulk_create([TaskComment(task=self.task, user=self.user, text="Chatter") for _ in range(50)])
+        with self.settings(TASK_LIST_CACHE_TIMEOUT=0):  # Take the validator path rather than the cached entry
+            first = self.client.get("/task/")
+            self.assertIn("ETag", first)
+
+            with self.assertNumQueries(0):
+                second = self.client.get("/task/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second.content, b"")
+
+    def test_cached_list_returns_304_without_queries(self):
+        """Test that a cached list answers a matching ETag without touching the database"""
+        first = self.client.get("/task/")
+
+        with self.assertNumQueries(0):
+            second = self.client.get("/task/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_if_modified_since_returns_304(self):
+        """Test Last-Modified based revalidation of a single task"""
+        first = self.client.get(f"/task/{self.task.id}/")
+        second = self.client.get(f"/task/{self.task.id}/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_changes_produce_new_etag(self):
+        """Test that edits, comments and deletes all change the validator"""
+        etags = [self.client.get("/task/filter_task/?status=pending")["ETag"]]
+        for write in (lambda: self.client.patch(f"/task/{self.task.id}/update/", {"title": "Edited"}),
+                      lambda: self.client.post(f"/task/{self.task.id}/comments/", {"text": "Hi"}),
+                      lambda: self.client.delete(f"/task/{self.task.id}/delete/")):
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            etags.append(self.client.get("/task/filter_task/?status=pending")["ETag"])
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_comments_conditional_get(self):
+        """Test that comment polling revalidates until a new comment arrives"""
+        first = self.client.get(f"/task/{self.task.id}/comments/")
+        unchanged = self.client.get(f"/task/{self.task.id}/comments/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.client.post(f"/task/{self.task.id}/comments/", {"text": "New"})
+        changed = self.client.get(f"/task/{self.task.id}/comments/", HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(unchanged.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(changed.data["results"]), 1)
+
+    def test_missing_task_is_still_404(self):
+        """Test that validators do not mask a missing task"""
+        response = self.client.get("/task/999999/", HTTP_IF_NONE_MATCH='"anything"')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class BulkTaskTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(email="bulk@gmail.com", password="password123")
+        self.other = User.objects.create_user(email="someone@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="Bulk")
+        category_cache.all()  # Warm the cache
+        self.existing = [
+            Task.objects.create(user=self.user, title=f"Existing {i}", category=self.category) for i in range(3)
+        ]
+
+    def test_mixed_batch(self):
+        """Test creating, updating and deleting in one request with per-item results"""
+        payload = {
+            "create": [
+                {"title": "Bulk one", "category_id": self.category.id, "assigned_to": self.other.id},
+                {"title": "no", "category_id": self.category.id},  # Too short
+            ],
+            "update": [
+                {"id": self.existing[0].id, "status": "completed"},
+                {"id": 999999, "title": "Missing"},
+            ],
+            "delete": [self.existing[1].id, 999999],
+        }
+        response = self.client.post("/task/bulk/", payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data
+        self.assertEqual(results["create"][0]["status"], "created")
+        self.assertIn("title", results["create"][1]["errors"])
+        self.assertEqual(results["update"][0], {"status": "updated", "id": self.existing[0].id})
+        self.assertEqual(results["update"][1]["status"], "error")
+        self.assertEqual(results["delete"][0], {"status": "deleted", "id": self.existing[1].id})
+        self.assertEqual(results["delete"][1]["status"], "error")
+
+        created = Task.objects.get(id=results["create"][0]["id"])
+        self.assertEqual((created.user, created.assigned_to), (self.user, self.other))
+        self.existing[0].refresh_from_db()
+        self.assertEqual(self.existing[0].status, "completed")
+        self.assertFalse(Task.objects.filter(id=self.existing[1].id).exists())
+
+    def test_statement_count_does_not_grow_with_batch_size(self):
+        """Test that a large batch costs a handful of statements"""
+        TaskComment.objects.create(task=self.existing[2], user=self.user, text="Goes with the task")
+        payload = {
+            "create": [{"title": f"Created {i}", "category_id": self.category.id, "assigned_to": self.other.id}
+                       for i in range(200)],
+            "update": [{"id": task.id, "title": "Renamed"} for task in self.existing[:2]],
+            "delete": [self.existing[2].id],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/task/bulk/", payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # 12 for the writes, plus fixed-cost upkeep: a recount of the touched users' dashboard
+        # counters, one insert of deletion tombstones and one delete of scheduled reminders, and
+        # the delete collector's reads of the doomed tasks and their comments
+        self.assertLessEqual(len(ctx.captured_queries), 12 + 6 + 2 + 2)
+        self.assertEqual(Task.objects.filter(title__startswith="Created").count(), 200)
+        self.assertFalse(TaskComment.objects.filter(task_id=self.existing[2].id).exists())
+
+    def test_delete_cascades_and_does_upkeep_once(self):
+        """Test that bulk deletes remove related rows and leave one tombstone and correct counters"""
+        task = self.existing[0]
+        task.due_date = timezone.now() + timedelta(days=1)
+        task.save()  # Files a reminder
+        TaskComment.objects.create(task=task, user=self.user, text="Goes with the task")
+        self.assertTrue(TaskReminder.objects.filter(task_id=task.id).exists())
+
+        self.client.post("/task/bulk/", {"delete": [task.id]}, format="json")
+
+        self.assertFalse(TaskReminder.objects.filter(task_id=task.id).exists())
+        self.assertFalse(TaskComment.objects.filter(task_id=task.id).exists())
+        self.assertEqual(list(Tombstone.objects.values_list("kind", "object_id")), [("task", task.id)])
+        self.assertEqual(self.client.get("/task/stats/").data["total"], 2)
+
+    def test_bulk_write_invalidates_cached_lists(self):
+        """Test that bulk writes are visible in cached task lists"""
+        self.assertEqual(len(self.client.get("/task/").data), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/task/bulk/", {"delete": [self.existing[0].id]}, format="json")
+
+        self.assertEqual(len(self.client.get("/task/").data), 2)
+
+    def test_rejects_oversized_batch(self):
+        """Test that the operation limit is enforced"""
+        with self.settings(TASK_BULK_MAX_OPERATIONS=2):
+            response = self.client.post("/task/bulk/", {"delete": [1, 2, 3]}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cannot_touch_other_users_tasks(self):
+        """Test that updates and deletes are scoped to the requesting user"""
+        foreign = Task.objects.create(user=self.other, title="Not yours")
+        response = self.client.post(
+            "/task/bulk/", {"update": [{"id": foreign.id, "title": "Mine now"}], "delete": [foreign.id]}, format="json"
+        )
+
+        self.assertEqual(response.data["update"][0]["status"], "error")
+        self.assertEqual(response.data["delete"][0]["status"], "error")
+        self.assertTrue(Task.objects.filter(id=foreign.id, title="Not yours").exists())
+
+class TaskExportTestCase(APITestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email="exporter@gmail.com", password="password123")
+        other = User.objects.create_user(email="bystander@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Export")
+        self.task = Task.objects.create(user=self.user, title="Exported", category=category)
+        Task.objects.create(user=self.user, title="No category")
+        Task.objects.create(user=other, title="Someone else's")
+        TaskComment.objects.create(task=self.task, user=self.user, text="One")
+        TaskComment.objects.create(task=self.task, user=other, text="Two")
+
+    def test_ndjson_export(self):
+        """Test streaming the user's tasks as NDJSON"""
+        response = self.client.get("/task/export/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["title"] for row in rows], ["Exported", "No category"])
+        self.assertEqual(rows[0]["category"], "Export")
+        self.assertEqual(rows[0]["comment_count"], 2)
+        self.assertEqual((rows[1]["category"], rows[1]["comment_count"]), (None, 0))
+
+    def test_csv_export(self):
+        """Test streaming the user's tasks as CSV"""
+        response = self.client.get("/task/export/?output=csv")
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["comment_count"], "2")
+
+    def test_export_command(self):
+        """Test the export_tasks management command"""
+        out = io.StringIO()
+        call_command("export_tasks", self.user.email, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+class TaskImportTestCase(APITestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user(email="importer@gmail.com", password="password123")
+        self.teammate = User.objects.create_user(email="Teammate@gmail.com", password="password123")
+        Category.objects.create(name="Imported")
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_import_ndjson_with_comments_and_rejects(self):
+        """Test importing NDJSON rows, resolving users/categories and writing rejects"""
+        lines = [
+            {"title": "Imported one", "category": "Imported", "assigned_to": "teammate@gmail.com",
+             "due_date": "2030-01-01T09:00:00Z",
+             "comments": [{"user": "teammate@gmail.com", "text": "First"}, {"text": "Second"}]},
+            {"title": "Imported two", "status": "completed"},
+            {"title": "no"},
+            {"title": "Bad status", "status": "done"},
+            {"title": "Unknown assignee", "assigned_to": "ghost@gmail.com"},
+        ]
+        path = self.write("tasks.ndjson", "\n".join(json.dumps(line) for line in lines) + "\nnot json\n")
+        out = io.StringIO()
+
+        call_command("import_tasks", path, owner=self.owner.email, chunk_size=2, stdout=out)
+
+        self.assertIn("Imported 2 of 6 rows (2 comments)", out.getvalue())
+        self.assertIn("rows/sec", out.getvalue())
+        task = Task.objects.get(title="Imported one")
+        self.assertEqual((task.user, task.assigned_to, task.category.name), (self.owner, self.teammate, "Imported"))
+        self.assertEqual(sorted(task.comments.values_list("user__email", flat=True)),
+                         ["Teammate@gmail.com", "importer@gmail.com"])
+        with open(path + ".rejects.ndjson") as f:
+            rejects = [json.loads(line) for line in f]
+        self.assertEqual([reject["line"] for reject in rejects], [3, 4, 5, 6])
+
+    def test_import_csv_export_round_trip(self):
+        """Test that an exported CSV can be imported for another user"""
+        source = Task.objects.create(user=self.teammate, title="Round trip", assigned_to=self.owner)
+        TaskComment.objects.create(task=source, user=self.owner, text="Kept as a count only")
+        exported = io.StringIO()
+        call_command("export_tasks", self.teammate.email, format="csv", stdout=exported)
+        path = self.write("tasks.csv", exported.getvalue())
+
+        call_command("import_tasks", path, owner=self.owner.email, stdout=io.StringIO())
+
+        copy = Task.objects.get(user=self.owner, title="Round trip")
+        self.assertEqual(copy.assigned_to, self.owner)
+
+class AsyncReadEndpointTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(email="async@gmail.com", password="password123")
+        self.other = User.objects.create_user(email="async-other@gmail.com", password="password123")
+        self.category = Category.objects.create(name="Async")
+        self.task = Task.objects.create(user=self.user, title="Async task", category=self.category,
+                                        assigned_to=self.other, status="pending")
+        Task.objects.create(user=self.user, title="Done task", status="completed")
+        TaskComment.objects.create(task=self.task, user=self.other, text="Looks good")
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def assertSameAsSync(self, path):
+        with self.settings(TASK_LIST_CACHE_TIMEOUT=0):  # Make the async view do its own queries
+            sync_response = self.client.get(f"/task/{path}")
+            async_response = self.client.get(f"/task/async/{path}")
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        # Cursor links point back at whichever endpoint served the page
+        self.assertEqual(json.loads(async_response.content.replace(b"/task/async/", b"/task/")),
+                         json.loads(sync_response.content))
+        self.assertEqual(async_response["ETag"] if async_response.has_header("ETag") else None,
+                         sync_response["ETag"] if sync_response.has_header("ETag") else None)
+        return async_response
+
+    def test_async_endpoints_match_sync_ones(self):
+        """Test that every async read endpoint returns what its sync twin does"""
+        self.assertSameAsSync("")
+        self.assertSameAsSync(f"{self.task.id}/")
+        self.assertSameAsSync("filter_task/?status=completed")
+        self.assertSameAsSync("filter_task/?status=bogus")
+        self.assertSameAsSync("?page_size=1")
+        self.assertSameAsSync(f"{self.task.id}/comments/")
+        self.assertSameAsSync("999999/")
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.other).access_token}")
+        response = self.assertSameAsSync("assigned_task_list/")
+        self.assertEqual([task["id"] for task in response.json()], [self.task.id])
+
+    def test_async_conditional_get_and_cache(self):
+        """Test that async lists answer 304 and share cache entries with the sync views"""
+        etag = self.client.get("/task/")["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/task/async/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)  # Cached user, and the list came from the sync view's entry
+
+        response = self.client.get(f"/task/async/{self.task.id}/", HTTP_IF_NONE_MATCH=self.client.get(
+            f"/task/{self.task.id}/")["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_async_endpoints_require_a_valid_token(self):
+        """Test that async endpoints reject missing/bad tokens and writes like the DRF views"""
+        response = self.client.post(f"/task/async/{self.task.id}/comments/", {"text": "Nope"})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        response = self.client.get("/task/async/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+        self.client.credentials()
+        response = self.client.get("/task/async/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+
+
+class TaskSearchTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        search_index.reset()
+        User = get_user_model()
+        self.user = User.objects.create_user(email="search@gmail.com", password="password123")
+        self.other = User.objects.create_user(email="search-other@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.in_title = Task.objects.create(user=self.user, title="Quarterly report", description="Numbers")
+        self.in_description = Task.objects.create(user=self.user, title="Write", description="The quarterly report")
+        self.in_comment = Task.objects.create(user=self.user, title="Misc")
+        TaskComment.objects.create(task=self.in_comment, user=self.user, text="Attach this to the quarterly report")
+        Task.objects.create(user=self.other, title="Quarterly report of someone else")
+
+    def search(self, **params):
+        response = self.client.get("/task/search/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_results_are_ranked_and_scoped_to_the_user(self):
+        """Test that title matches outrank description and comment matches, and other users' tasks are hidden"""
+        response = self.search(q="quarterly REPORT")
+
+        self.assertEqual([task["id"] for task in response.data["results"]],
+                         [self.in_title.id, self.in_description.id, self.in_comment.id])
+        self.assertGreater(response.data["results"][0]["rank"], response.data["results"][1]["rank"])
+        self.assertEqual(self.search(q="numbers quarterly").data["results"][0]["id"], self.in_title.id)
+        self.assertEqual(self.search(q="nothing like this").data["results"], [])
+
+    def test_index_follows_writes(self):
+        """Test that edits, new comments and deletes (including bulk ones) show up in search"""
+        self.search(q="report")  # Load the index before writing
+
+        self.client.patch(f"/task/{self.in_title.id}/update/", {"title": "Renamed"}, format="json")
+        TaskComment.objects.create(task=self.in_title, user=self.user, text="Budget")
+        self.in_description.delete()
+        category = Category.objects.create(name="Finance")
+        response = self.client.post("/task/bulk/", {"create": [{"title": "Budget plan", "category_id": category.id}]},
+                                    format="json")
+        self.assertEqual(response.data["create"][0]["status"], "created")
+
+        titles = [task["title"] for task in self.search(q="budget").data["results"]]
+        self.assertEqual(titles, ["Budget plan", "Renamed"])
+        self.assertEqual([task["id"] for task in self.search(q="report").data["results"]], [self.in_comment.id])
+
+    def test_only_text_changes_refresh_search(self):
+        """Test that status, assignment and due-date saves skip the search refresh"""
+        task = Task.objects.get(id=self.in_title.id)
+        with patch.object(signals, "refresh_search") as refresh:
+            task.status = "completed"
+            task.assigned_to = self.other
+            task.due_date = timezone.now()
+            task.save()
+            refresh.assert_not_called()
+
+            task.description = "Other numbers"
+            task.save()
+        refresh.assert_called_once_with([task.id])
+
+    def test_task_loads_skip_the_search_vector(self):
+        """Test that views do not load the tsvector with their tasks"""
+        self.assertNotIn("search_vector", str(task_queryset().query))
+
+    def test_pagination(self):
+        """Test page/page_size paging and parameter validation"""
+        first = self.search(q="report", page_size=2)
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertIsNone(first.data["previous"])
+
+        second = self.client.get(first.data["next"])
+        self.assertEqual([task["id"] for task in second.data["results"]], [self.in_comment.id])
+        self.assertIsNone(second.data["next"])
+        self.assertIsNotNone(second.data["previous"])
+
+        self.assertEqual(self.client.get("/task/search/").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/task/search/", {"q": "x", "page": 0}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class TaskStatsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(email="stats@gmail.com", password="password123")
+        self.other = User.objects.create_user(email="stats-other@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.work = Category.objects.create(name="Work")
+        self.home = Category.objects.create(name="Home")
+        past = timezone.now() - timedelta(days=1)
+        self.task = Task.objects.create(user=self.user, title="Overdue", category=self.work, due_date=past)
+        Task.objects.create(user=self.user, title="Done", status="completed", category=self.work, due_date=past)
+        Task.objects.create(user=self.user, title="Loose", status="in_progress")
+        Task.objects.create(user=self.other, title="Theirs", assigned_to=self.user, category=self.home)
+        TaskComment.objects.create(task=self.task, user=self.other, text="Hurry")
+
+    def stats(self):
+        response = self.client.get("/task/stats/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def assertCountersMatchRecount(self):
+        stored = {(c.user_id, c.dimension, c.key): c.count for c in TaskCounter.objects.exclude(count=0)}
+        self.assertEqual(stored, {key: count for key, count in compute_counters().items() if count})
+
+    def test_stats(self):
+        """Test the dashboard numbers and that they come from counter rows"""
+        self.stats()  # Warm the category cache
+        with CaptureQueriesContext(connection) as queries:
+            stats = self.stats()
+
+        self.assertEqual(len(queries), 2)  # Counter rows + overdue count
+        self.assertEqual(stats["total"], 3)
+        self.assertEqual(stats["by_status"], {"pending": 1, "in_progress": 1, "completed": 1})
+        self.assertEqual(stats["by_category"], [{"id": self.work.id, "name": "Work", "count": 2}])
+        self.assertEqual(stats["uncategorized"], 1)
+        self.assertEqual(stats["assigned_to_me"], 1)
+        self.assertEqual(stats["overdue"], 1)
+        self.assertEqual(stats["comments"], 1)
+
+    def test_counters_follow_writes(self):
+        """Test that counters stay equal to a full recount across every kind of write"""
+        self.client.patch(f"/task/{self.task.id}/update/", {"status": "completed", "category_id": self.home.id},
+                          format="json")
+        self.assertCountersMatchRecount()
+        self.client.patch(f"/task/{self.task.id}/assign_unassign_task/", {"user_id": self.other.id}, format="json")
+        Task.objects.get(id=self.task.id).save()
+        self.assertCountersMatchRecount()
+        self.client.post("/task/bulk/", {"create": [{"title": "Bulk", "category_id": self.work.id}]}, format="json")
+        self.assertCountersMatchRecount()
+        self.home.delete()
+        self.assertCountersMatchRecount()
+        Task.objects.get(id=self.task.id).delete()
+        self.assertCountersMatchRecount()
+        self.other.delete()
+        self.assertCountersMatchRecount()
+        self.assertEqual(self.stats()["comments"], 0)
+
+    def test_reconcile_fixes_drift(self):
+        """Test that the periodic job rebuilds counters from scratch"""
+        TaskCounter.objects.update(count=42)
+        reconcile_task_counters()
+        self.assertCountersMatchRecount()
+        self.assertEqual(self.stats()["total"], 3)
+
+    def test_reconcile_writes_only_what_drifted(self):
+        """Test that reconciling keeps correct rows in place and drops those of users left without tasks"""
+        pending = TaskCounter.objects.get(user=self.user, dimension="status", key="pending")
+        TaskCounter.objects.filter(user=self.user, dimension="status", key="completed").update(count=42)
+        loner = get_user_model().objects.create_user(email="stats-loner@gmail.com", password="password123")
+        TaskCounter.objects.create(user=loner, dimension="status", key="pending", count=3)
+
+        with CaptureQueriesContext(connection) as queries:
+            reconcile_counters([self.user.id, loner.id])
+
+        self.assertCountersMatchRecount()
+        self.assertEqual(TaskCounter.objects.get(id=pending.id).count, 1)  # Untouched, not recreated
+        self.assertFalse(TaskCounter.objects.filter(user=loner).exists())
+        writes = [q["sql"] for q in queries.captured_queries if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertEqual(len(writes), 2)  # One upsert of the drifted row, one delete
+
+
+class RecordingBroker:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, user_ids, event):
+        self.published.append((set(user_ids), event))
+
+
+class TaskFeedTestCase(APITestCase):
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email="feed@gmail.com", password="password123")
+        self.first = User.objects.create_user(email="feed-first@gmail.com", password="password123")
+        self.second = User.objects.create_user(email="feed-second@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="Feed")
+        self.task = Task.objects.create(user=self.user, title="Watched", category=self.category,
+                                        assigned_to=self.first)
+        self.token = RefreshToken.for_user(self.user).access_token
+
+    def published(self, write):
+        broker = RecordingBroker()
+        with patch("task.feed.get_broker", return_value=broker), \
+                self.captureOnCommitCallbacks(execute=True):
+            write()
+        return broker.published
+
+    def test_writes_publish_to_everyone_who_sees_the_task(self):
+        """Test that task and comment writes reach the owner and old and new assignees after commit"""
+        task = Task.objects.get(id=self.task.id)
+        task.assigned_to = self.second
+
+        published = self.published(task.save)
+        self.assertEqual(published, [({self.user.id, self.first.id, self.second.id},
+                                      {"type": "task", "action": "updated", "id": task.id})])
+
+        published = self.published(lambda: TaskComment.objects.create(task=task, user=self.user, text="Hi"))
+        self.assertEqual(published[0][0], {self.user.id, self.second.id})
+        self.assertEqual(published[0][1]["type"], "comment")
+
+        published = self.published(task.delete)
+        self.assertEqual(published, [({self.user.id, self.second.id},
+                                      {"type": "task", "action": "deleted", "id": self.task.id})])
+
+    def test_bulk_writes_publish_one_resync(self):
+        """Test that a bulk request sends one resync event instead of one per task"""
+        payload = {"create": [{"title": f"Bulk {i}", "category_id": self.category.id} for i in range(5)]}
+        published = self.published(lambda: self.client.post("/task/bulk/", payload, format="json"))
+
+        self.assertEqual(published, [({self.user.id}, {"type": "resync"})])
+
+    def test_in_process_broker(self):
+        """Test delivery from another thread, per-user routing and overflow into a resync"""
+        async def scenario():
+            broker = InProcessBroker()
+            async with broker.subscribe(1) as mine, broker.subscribe(2) as theirs:
+                await asyncio.to_thread(broker.publish, [1], {"type": "task", "id": 7})
+                received = await mine.get(timeout=1), await theirs.get(timeout=0.01)
+                with self.settings(TASK_FEED_QUEUE_SIZE=2):
+                    async with broker.subscribe(1) as slow:
+                        for i in range(3):
+                            broker.publish([1], {"type": "task", "id": i})
+                        await asyncio.sleep(0)
+                        overflowed = await slow.get(timeout=1)
+            return received, overflowed, broker._subscriptions
+
+        (event, nothing), overflowed, subscriptions = asyncio.run(scenario())
+        self.assertEqual(event, {"type": "task", "id": 7})
+        self.assertIsNone(nothing)
+        self.assertEqual(overflowed, {"type": "resync"})
+        self.assertEqual(dict(subscriptions), {})
+
+    async def test_event_stream(self):
+        """Test the SSE endpoint: ticket in the query string, ready event, then pushed changes without queries"""
+        ticket = await sync_to_async(issue_ticket)(self.user.id)
+        with self.settings(TASK_FEED_HEARTBEAT=0.05, TASK_FEED_MAX_AGE=0.3):
+            response = await self.async_client.get(f"/task/async/events/?ticket={ticket}")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            chunks = response.streaming_content
+            self.assertIn(b"event: ready", await anext(chunks))
+
+            get_broker().publish([self.user.id], {"type": "task", "action": "updated", "id": 1})
+            # The ORM runs on the test's sync thread, so capture queries there
+            queries = CaptureQueriesContext(connection)
+            await sync_to_async(queries.__enter__)()
+            rest = [chunk async for chunk in chunks]
+            await sync_to_async(queries.__exit__)(None, None, None)
+
+        self.assertEqual(rest[0], b'event: task\ndata: {"type":"task","action":"updated","id":1}\n\n')
+        self.assertIn(b": keepalive\n\n", rest)
+        self.assertEqual(await sync_to_async(lambda: len(queries.captured_queries))(), 0)
+
+    def test_event_stream_requires_authentication(self):
+        """Test that the stream rejects anonymous and bad-token clients"""
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get("/task/async/events/").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get("/task/async/events/?ticket=nope").status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_event_stream_takes_single_use_tickets_not_tokens(self):
+        """Test that the stream opens once per ticket and never with an access token in the URL"""
+        response = self.client.post("/task/events/ticket/")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ticket = response.data["ticket"]
+        self.assertNotIn(str(self.token), ticket)
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(f"/task/async/events/?access_token={self.token}").status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(f"/task/async/events/?ticket={ticket}").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(f"/task/async/events/?ticket={ticket}").status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.post("/task/events/ticket/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TaskSyncTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email="sync@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="Synced")
+        self.tasks = [Task.objects.create(user=self.user, title=f"Synced {i}", category=self.category)
+                      for i in range(5)]
+        self.comment = TaskComment.objects.create(task=self.tasks[0], user=self.user, text="First")
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get("/task/sync/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_full_then_incremental_sync(self):
+        """Test that a second sync returns only what changed, including deletions"""
+        with self.settings(TASK_SYNC_LAG=0):
+            first = self.sync()
+            self.client.patch(f"/task/{self.tasks[1].id}/update/", {"status": "completed"}, format="json")
+            new = self.client.post(f"/task/{self.tasks[2].id}/comments/", {"text": "Second"}).data
+            self.client.delete(f"/task/{self.tasks[0].id}/comments/{self.comment.id}/delete/")
+            self.client.delete(f"/task/{self.tasks[3].id}/delete/")
+            self.client.post("/task/bulk/", {"delete": [self.tasks[4].id]}, format="json")
+            self.client.delete(f"/task/categories/{self.category.id}/delete/")
+            with CaptureQueriesContext(connection) as ctx:
+                second = self.sync(first["cursor"])
+
+        self.assertEqual(len(first["tasks"]), 5)
+        self.assertEqual([c["text"] for c in first["comments"]], ["First"])
+        self.assertEqual(first["deleted"], {"tasks": [], "comments": [], "categories": []})
+        self.assertFalse(first["has_more"])
+
+        # Deleting the category nulled the other tasks' category without touching updated_at;
+        # clients apply the category tombstone to their copies instead
+        self.assertEqual([task["id"] for task in second["tasks"]], [self.tasks[1].id])
+        self.assertEqual([comment["id"] for comment in second["comments"]], [new["id"]])
+        self.assertEqual(second["deleted"], {"tasks": [self.tasks[3].id, self.tasks[4].id],
+                                             "comments": [self.comment.id], "categories": [self.category.id]})
+        self.assertEqual(len(ctx.captured_queries), 3)  # Tasks with comment counts, comments, tombstones
+
+    def test_sync_pages_through_large_backlogs(self):
+        """Test that has_more batches cover every row exactly once"""
+        seen, cursor = [], None
+        while True:
+            page = self.sync(cursor, limit=2)
+            seen += [task["id"] for task in page["tasks"]]
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+
+        self.assertEqual(sorted(seen), [task.id for task in self.tasks])
+
+    def test_bad_and_expired_cursors(self):
+        """Test that garbage cursors are rejected and purged history forces a full resync"""
+        self.assertEqual(self.client.get("/task/sync/?cursor=nope").status_code, status.HTTP_400_BAD_REQUEST)
+
+        cursor = self.sync()["cursor"]
+        with self.settings(TASK_SYNC_TOMBSTONE_DAYS=0):
+            response = self.client.get("/task/sync/", {"cursor": cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class RequestMetricsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        metrics_registry.reset()
+        self.user = get_user_model().objects.create_user(email="measured@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Measured")
+        Task.objects.create(user=self.user, title="Measured task", category=category)
+
+    def test_metrics_per_url_name(self):
+        """Test that requests are recorded under their URL name and exported for Prometheus"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/task/")
+        uncached_queries = len(ctx)
+        for _ in range(2):
+            self.client.get("/task/")  # From the list cache: no queries
+        self.client.get("/task/999999/")
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = response.content.decode()
+        labels = 'view="list-tasks",method="GET",status="200"'
+        self.assertIn(f"http_request_duration_seconds_count{{{labels}}} 3", text)
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="+Inf"}} 3', text)
+        self.assertIn(f"http_request_serializer_seconds_total{{{labels}}}", text)
+        self.assertIn(f"http_response_size_bytes_count{{{labels}}} 3", text)
+        self.assertIn('view="retrieve-task",method="GET",status="404"', text)
+        self.assertNotIn('view="metrics"', text)
+        # Every query is attributed to the request that ran it
+        self.assertEqual(metrics_registry.queries.series[("list-tasks", "GET", "200")][-1], uncached_queries)
+        # Only the uncached request built its data
+        self.assertGreater(metrics_registry.serializer_seconds.series[("list-tasks", "GET", "200")], 0)
+
+    def test_metrics_are_only_served_to_allowed_scrapers(self):
+        """Test that /metrics needs an allowed address or the metrics token, and is gone when disabled"""
+        self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_200_OK)  # From 127.0.0.1
+        outside = {"REMOTE_ADDR": "203.0.113.9"}
+        self.assertEqual(self.client.get("/metrics", **outside).status_code, status.HTTP_403_FORBIDDEN)
+
+        with self.settings(METRICS_ALLOWED_IPS=["203.0.113.0/24"]):
+            self.assertEqual(self.client.get("/metrics", **outside).status_code, status.HTTP_200_OK)
+        with self.settings(METRICS_TOKEN="scrape-secret"):
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret",
+                                             **outside).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong",
+                                             **outside).status_code, status.HTTP_403_FORBIDDEN)
+        with self.settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get("/metrics").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_sampled_logging(self):
+        """Test that view logging is silent by default and structured when sampled in"""
+        with self.assertNoLogs("task.views", level="DEBUG"):
+            self.client.get("/task/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_user_task_lists(self.user.id)  # Run the view again rather than serve the cached list
+        with self.settings(REQUEST_LOG_SAMPLE_RATE=1), self.assertLogs("task.views", level="DEBUG") as logs:
+            self.client.get("/task/")
+
+        self.assertEqual(json.loads(logs.records[0].getMessage()), {"event": "list_tasks", "user_id": self.user.id})
+
+
+class BenchCommandTestCase(APITestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.baseline = os.path.join(self.tmpdir.name, "baseline.json")
+
+    def bench(self, **options):
+        call_command("bench", users=3, categories=2, tasks=20, comments_per_task=1, requests=2, warmup=0,
+                     endpoint=["list_tasks", "retrieve_task", "update_task"], stdout=io.StringIO(),
+                     stderr=io.StringIO(), **options)
+
+    def test_bench_reports_and_rolls_back(self):
+        """Test that the bench command reports every endpoint and leaves no seeded rows behind"""
+        self.bench(save_baseline=self.baseline)
+
+        with open(self.baseline) as f:
+            report = json.load(f)
+        self.assertEqual(set(report["results"]), {"list_tasks", "retrieve_task", "update_task"})
+        self.assertEqual(report["results"]["update_task"]["status"], [200])
+        for result in report["results"].values():
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["queries"], 0)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_bench_fails_on_baseline_regression(self):
+        """Test that more queries per request than the baseline fail the run"""
+        self.bench(save_baseline=self.baseline)
+        with open(self.baseline) as f:
+            report = json.load(f)
+        report["results"]["retrieve_task"]["queries"] -= 1
+        with open(self.baseline, "w") as f:
+            json.dump(report, f)
+
+        with self.assertRaisesMessage(CommandError, "retrieve_task"):
+            self.bench(baseline=self.baseline, output=os.path.join(self.tmpdir.name, "run.json"))
+
+
+class FastTaskListTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="fast@gmail.com", password="password123")
+        self.other = get_user_model().objects.create_user(email="ünïcode@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Fast", description="Catégorie")
+        Task.objects.create(user=self.user, title="Bare task")
+        dated = Task.objects.create(user=self.user, title="Line\u2028separator \"quoted\" ✓", category=category,
+                                    description="Two\nlines", assigned_to=self.other, status="in_progress",
+                                    due_date=make_aware(timezone.datetime(2030, 1, 2, 3, 4, 5, 678)))
+        for i in range(4):
+            TaskComment.objects.create(task=dated, user=self.other if i % 2 else self.user, text=f"Comment {i}")
+
+    def render_both(self, preview):
+        tasks = task_queryset(comment_preview=preview).filter(user=self.user).order_by("id")
+        serialized = JSONRenderer().render(TaskSerializer(tasks.all(), many=True).data)
+        fast = FastJSONRenderer().render(fast_task_list.data(fast_task_list.values(tasks), preview))
+        return serialized, fast
+
+    def test_fast_path_renders_the_same_bytes(self):
+        """Test that the values() fast path renders exactly what TaskSerializer does"""
+        for preview in (0, 2, 10):
+            serialized, fast = self.render_both(preview)
+            self.assertEqual(fast, serialized)
+        with timezone.override("America/New_York"):
+            serialized, fast = self.render_both(2)
+        self.assertEqual(fast, serialized)
+        self.assertIn(b"-05:00", fast)
+
+    def test_list_endpoints_match_serializer(self):
+        """Test that task list endpoints render the serializer's output"""
+        serialized, _ = self.render_both(3)
+        response = self.client.get("/task/")
+        self.assertEqual(response.content, serialized)
+
+        page = self.client.get("/task/?page_size=1")
+        self.assertEqual(len(page.data["results"]), 1)
+        self.assertEqual(len(self.client.get(page.data["next"]).data["results"]), 1)
+
+    def test_plan_rejects_unknown_fields(self):
+        """Test that a TaskSerializer field without a values() plan fails loudly"""
+        class ExtendedTaskSerializer(TaskSerializer):
+            shout = serializers.SerializerMethodField()
+
+            class Meta(TaskSerializer.Meta):
+                fields = TaskSerializer.Meta.fields + ['shout']
+
+            def get_shout(self, task):
+                return task.title.upper()
+
+        with self.assertRaises(ImproperlyConfigured):
+            compile_plan(ExtendedTaskSerializer)
+
+    def test_renderer_falls_back_to_json_renderer(self):
+        """Test that FastJSONRenderer matches JSONRenderer for data orjson would render differently"""
+        data = {"when": make_aware(timezone.datetime(2030, 1, 2)), 1: "integer key", "lazy": gettext_lazy("Yes")}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, "application/json; indent=2"),
+                         JSONRenderer().render(data, "application/json; indent=2"))
+
+    def test_bench_serializers_command(self):
+        """Test that the serializer benchmark checks both paths agree and rolls back"""
+        out = io.StringIO()
+        call_command("bench_serializers", tasks=20, repeat=1, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["tasks"], 20)
+        self.assertGreater(report["speedup"], 0)
+        self.assertEqual(Task.objects.count(), 2)
+
+
+class ReplicaRoutingTestCase(APITransactionTestCase):
+    """
+    The 'replica' alias (backend/test_settings.py) is a test mirror of the primary:
+    it holds the same rows, so these tests check which connection each read
+    went to rather than what it found.
+    """
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="replicated@gmail.com", password="password123")
+        self.category = Category.objects.create(name="Replicated")
+        self.task = Task.objects.create(user=self.user, title="Replicated task", category=self.category)
+        self.login(self.user)
+        routing = self.settings(DATABASE_REPLICAS=["replica"], TASK_LIST_CACHE_TIMEOUT=0)
+        routing.enable()
+        self.addCleanup(routing.disable)
+
+    def login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+    def replica_reads(self, path="/task/"):
+        """The number of queries a GET of ``path`` ran on the replica."""
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(replica_queries)
+
+    def test_reads_use_the_replica_until_the_user_writes(self):
+        """Test that reads go to the replica, and to the primary for a while after the user wrote"""
+        self.assertGreater(self.replica_reads(), 0)
+        self.assertGreater(self.replica_reads("/task/async/"), 0)
+
+        response = self.client.post("/task/create/", {"title": "Just written", "category_id": self.category.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.replica_reads(), 0)
+        self.assertEqual(self.replica_reads("/task/async/"), 0)
+        cache.delete(PIN_KEY.format(self.user.id))  # The sticky window ran out
+        self.assertGreater(self.replica_reads(), 0)
+
+    def test_other_users_are_not_pinned(self):
+        """Test that one user's write leaves another user's reads on the replica"""
+        self.client.post("/task/create/", {"title": "Just written", "category_id": self.category.id})
+        self.login(get_user_model().objects.create_user(email="bystander@gmail.com", password="password123"))
+        self.assertGreater(self.replica_reads("/task/assigned_task_list/"), 0)
+
+    def test_assignee_reads_the_assignment_from_the_primary(self):
+        """Test that the first list an assignee caches after an assignment is read on the primary"""
+        assignee = get_user_model().objects.create_user(email="assignee@gmail.com", password="password123")
+        self.login(assignee)
+        with self.settings(TASK_LIST_CACHE_TIMEOUT=300):
+            self.assertGreater(self.replica_reads("/task/assigned_task_list/"), 0)
+
+            self.login(self.user)
+            response = self.client.patch(f"/task/{self.task.id}/assign_unassign_task/", {"user_id": assignee.id})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            # The assignment bumped the assignee's list version; a replica that
+            # had not caught up would have its old list cached under the new one
+            self.login(assignee)
+            self.assertEqual(self.replica_reads("/task/assigned_task_list/"), 0)
+            response = self.client.get("/task/assigned_task_list/")
+        self.assertEqual([task["title"] for task in response.data], ["Replicated task"])
+
+    def test_in_flight_reads_move_to_the_primary_when_pinned(self):
+        """Test that a list read that started on the replica switches over if the user is pinned meanwhile"""
+        pin = PIN_KEY.format(self.user.id)
+        real_get = cache.get_many
+
+        def pinned_after_routing(keys):
+            values = real_get(keys)
+            if pin in keys and not values:
+                cache.set(pin, 1)  # Another request's write commits right after routing
+            return values
+
+        self.assertGreater(self.replica_reads(), 0)  # Also caches the user, whom auth reads before the list
+        with patch.object(cache, "get_many", pinned_after_routing):
+            self.assertEqual(self.replica_reads(), 0)
+
+    def test_category_renames_pin_everyone(self):
+        """Test that a change to every user's lists sends every user to the primary"""
+        other = get_user_model().objects.create_user(email="bystander@gmail.com", password="password123")
+        response = self.client.patch(f"/task/categories/{self.category.id}/update/", {"name": "Renamed"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.login(other)
+        self.assertEqual(self.replica_reads("/task/assigned_task_list/"), 0)
+
+    def test_code_outside_requests_uses_the_primary(self):
+        """Test that Celery tasks and commands are not routed to replicas"""
+        with CaptureQueriesContext(connections["replica"]) as replica_queries:
+            self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(len(replica_queries), 0)
@@ -1,8 +1,10 @@
 from django.urls import path
 
+from . import async_views
 from .views import (create_category, create_task, delete_task, list_category, delete_category, get_due_soon_tasks,
                     list_tasks, retrieve_task, update_category, update_task, tasks_by_category, filter_tasks,
-                    get_assigned_tasks, assign_unassign_task, task_comments, delete_comment
+                    get_assigned_tasks, assign_unassign_task, task_comments, delete_comment, bulk_tasks,
+                    export_tasks, search_tasks, task_stats, sync_tasks, task_events_ticket
                     )
 
 urlpatterns = [
@@ -11,8 +13,14 @@ urlpatterns = [
     path('<int:task_id>/', retrieve_task, name='retrieve-task'),  # GET: Get a single task
     path('<int:task_id>/update/', update_task, name='update-task'),  # PUT/PATCH: Update a task
     path('<int:task_id>/delete/', delete_task, name='delete-task'),  # DELETE: Delete a task
+    path('bulk/', bulk_tasks, name='bulk-tasks'),  # POST: Create/update/delete many tasks at once
+    path('export/', export_tasks, name='export-tasks'),  # GET: Stream all tasks as NDJSON/CSV
+    path('search/', search_tasks, name='search-tasks'),  # GET: Full-text search, ?q=<words>
+    path('stats/', task_stats, name='task-stats'),  # GET: Dashboard counts
+    path('sync/', sync_tasks, name='sync-tasks'),  # GET: Changes and deletions since ?cursor=
+    path('events/ticket/', task_events_ticket, name='task-events-ticket'),  # POST: Ticket for the event stream
 
-    path('categories/', list_category, name='list-tasks'),  # GET: List all categories
+    path('categories/', list_category, name='list-categories'),  # GET: List all categories
     path('categories/create/', create_category, name='create-category'),  # POST: Create a category
     path('categories/<int:category_id>/update/', update_category, name='update-category'),  # PUT/PATCH: Update a category
     path('categories/<int:category_id>/delete/', delete_category, name='delete-category'),  # DELETE: Delete a category
@@ -27,4 +35,12 @@ urlpatterns = [
     path("<int:task_id>/comments/", task_comments, name="task-comments"),
     path("<int:task_id>/comments/<int:comment_id>/delete/", delete_comment, name="task-comments-delete"),
 
+    # Async versions of the read endpoints, for ASGI workers (backend/asgi.py)
+    path('async/', async_views.list_tasks, name='async-list-tasks'),
+    path('async/<int:task_id>/', async_views.retrieve_task, name='async-retrieve-task'),
+    path('async/filter_task/', async_views.filter_tasks, name='async-filter-task'),
+    path('async/assigned_task_list/', async_views.get_assigned_tasks, name='async-get-assigned-tasks'),
+    path("async/<int:task_id>/comments/", async_views.task_comments, name="async-task-comments"),
+    path('async/events/', async_views.task_events, name='async-task-events'),  # GET: Server-Sent Events change feed
+
 ]
\ No newline at end of file
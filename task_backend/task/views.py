@@ -1,20 +1,86 @@
-from django.shortcuts import render
+import logging
+
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-
+from django.db.models import Count, Prefetch
+from django.http import StreamingHttpResponse
+
+from backend.metrics import log_sampled, timed_serialization
+
+from .bulk import BulkPayloadError, apply_bulk_operations
+from .cache import cached_task_list, invalidate_user_task_lists
+from .category_cache import category_cache
+from .conditional import (conditional_get, list_validators, task_comment_validators, task_list_validators,
+                          task_validators)
+from . import search as task_search
+from .export import CONTENT_TYPES, FORMATS, export_rows, render as render_export
+from .feed import issue_ticket, ticket_ttl
+from .fast_serializers import fast_task_list
 from .models import Task, Category, TaskComment
+from .pagination import CommentCursorPagination, TaskCursorPagination, comment_preview_size
+from .renderers import TASK_LIST_RENDERERS
 from .serializers import CategorySerializer, TaskSerializer, TaskCommentSerializer
+from .sync import ExpiredCursor, InvalidCursor, changes_since, group_tombstones, sync_limit
+from .task_counters import dashboard_stats
 
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
+def task_queryset(request=None, comment_preview=None):
+    """
+    Tasks with everything TaskSerializer renders loaded up front.
+
+    Categories are rendered from the in-process category cache, comments are
+    counted in the same query, and only the latest few comments per task (see
+    ``comment_preview_size``) come in via one windowed prefetch query, so
+    serializing N tasks costs a fixed number of queries and a bounded payload
+    however long their threads are.
+    """
+    if comment_preview is None:
+        comment_preview = comment_preview_size(request)
+    latest = TaskComment.objects.select_related('user').order_by('-timestamp', '-id')
+    # search_vector is only read by search queries; loading it would ship every tsvector
+    return Task.objects.defer('search_vector').annotate(comment_count=Count('comments')).prefetch_related(
+        Prefetch('comments', queryset=latest[:comment_preview], to_attr='latest_comments')
+    )
+
+def paginated_comment_response(request, comments):
+    """
+    One cursor page of comments, newest first.
+    """
+    paginator = CommentCursorPagination()
+    page = paginator.paginate_queryset(comments, request)
+    with timed_serialization():
+        data = TaskCommentSerializer(page, many=True).data
+    return paginator.get_paginated_response(data)
+
+def task_list_data(request, rows):
+    """
+    ``TaskSerializer(tasks, many=True).data`` for ``fast_task_list.values(tasks)``
+    rows, built without the serializer (see fast_serializers).
+    """
+    with timed_serialization():
+        return fast_task_list.data(rows, comment_preview_size(request))
+
+def paginated_task_response(request, tasks):
+    """
+    Return a cursor-paginated response when the client asked for one, else None.
+    """
+    paginator = TaskCursorPagination()
+    if not paginator.is_requested(request):
+        return None
+    page = paginator.paginate_queryset(fast_task_list.values(tasks), request)
+    return paginator.get_paginated_response(task_list_data(request, page))
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_task(request):
@@ -22,7 +88,7 @@ def create_task(request):
     Create a new task for the authenticated user.
     """
     serializer = TaskSerializer(data=request.data)
-    print("res: ", request)
+    log_sampled(logger, "create_task", user_id=request.user.id)
     if serializer.is_valid():
         serializer.save(user=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -30,29 +96,38 @@ def create_task(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])  # Ensure user is authenticated
+@renderer_classes(TASK_LIST_RENDERERS)
+@cached_task_list
+@conditional_get(task_list_validators)
 def list_tasks(request):
     """
     Retrieve all tasks for the authenticated user.
     """
-    print("User: ", request.user)  # Debugging
-    tasks = Task.objects.filter(user=request.user)  # Get tasks assigned to user
-    
-    if not tasks.exists():
+    log_sampled(logger, "list_tasks", user_id=request.user.id)
+    tasks = task_queryset(request).filter(user=request.user)  # Get tasks assigned to user
+
+    paginated = paginated_task_response(request, tasks)
+    if paginated is not None:
+        return paginated
+
+    rows = list(fast_task_list.values(tasks))
+    if not rows:
         return Response({"message": "No tasks found"}, status=status.HTTP_200_OK)
 
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(task_list_data(request, rows), status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get(task_validators)
 def retrieve_task(request, task_id):
     """
     Retrieve a specific task by ID.
     """
     try:
-        task = Task.objects.get(id=task_id, user=request.user)
-        serializer = TaskSerializer(task)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        task = task_queryset(request).get(id=task_id, user=request.user)
+        with timed_serialization():
+            data = TaskSerializer(task).data
+        return Response(data, status=status.HTTP_200_OK)
     except Task.DoesNotExist:
         return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -63,13 +138,15 @@ def update_task(request, task_id):
     Update a task.
     """
     try:
-        task = Task.objects.get(id=task_id, user=request.user)
+        task = task_queryset(request).get(id=task_id, user=request.user)
     except Task.DoesNotExist:
         return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
+    previous_assignee_id = task.assigned_to_id
     serializer = TaskSerializer(task, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        invalidate_user_task_lists(previous_assignee_id)  # The task left their assigned list
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -80,13 +157,145 @@ def delete_task(request, task_id):
     Delete a task.
     """
     try:
-        task = Task.objects.get(id=task_id, user=request.user)
+        task = Task.objects.defer('search_vector').get(id=task_id, user=request.user)
         task.delete()
         return Response({"message": "Task deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
     except Task.DoesNotExist:
         return Response({"detail": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
     
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_tasks(request):
+    """
+    Create, update and delete many tasks in one request.
+
+    Body: {"create": [task, ...], "update": [{"id": 1, ...}, ...], "delete": [id, ...]}.
+    Valid items are applied in one transaction; each section gets per-item results.
+    """
+    try:
+        results = apply_bulk_operations(request.user, request.data)
+    except BulkPayloadError as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(results, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def export_tasks(request):
+    """
+    Stream all of the user's tasks as NDJSON (default) or CSV (?output=csv).
+    """
+    export_format = request.query_params.get('output', 'ndjson')
+    if export_format not in FORMATS:
+        return Response({"detail": "Invalid output. Choose from: ndjson, csv."}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(render_export(export_rows(request.user), export_format),
+                                     content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="tasks.{export_format}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def search_tasks(request):
+    """
+    Full-text search over the user's task titles, descriptions and comments.
+
+    ?q=<words>&page=<n>&page_size=<n>; results are ranked best first and carry a ``rank``.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"detail": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+    default_size, max_size = task_search.page_size_limits()
+    try:
+        page = int(request.query_params.get('page', 1))
+        page_size = min(int(request.query_params.get('page_size', default_size)), max_size)
+    except ValueError:
+        return Response({"detail": "page and page_size must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+    if page < 1 or page_size < 1:
+        return Response({"detail": "page and page_size must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # One extra row tells whether there is a next page
+    hits = task_search.search_tasks(request.user, query, (page - 1) * page_size, page_size + 1)
+    has_next = len(hits) > page_size
+    ranks = dict(hits[:page_size])
+    tasks = task_queryset(request).filter(user=request.user).in_bulk(ranks)
+
+    results = []
+    for task_id, rank in ranks.items():
+        if task_id in tasks:
+            results.append(dict(TaskSerializer(tasks[task_id]).data, rank=round(rank, 4)))
+
+    url = request.build_absolute_uri()
+    return Response({
+        "next": replace_query_param(url, 'page', page + 1) if has_next else None,
+        "previous": replace_query_param(url, 'page', page - 1) if page > 1 else None,
+        "results": results,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def task_events_ticket(request):
+    """
+    Issue a short-lived, single-use ticket for opening the change feed
+    (/task/async/events/?ticket=...), which cannot take an Authorization header.
+    """
+    return Response({"ticket": issue_ticket(request.user.id), "expires_in": ticket_ttl()},
+                    status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def task_stats(request):
+    """
+    Dashboard numbers for the authenticated user, read from maintained counters.
+    """
+    stats = dashboard_stats(request.user)
+    by_category = []
+    for category_id, count in stats.pop('by_category').items():
+        if not category_id:
+            stats['uncategorized'] = count
+            continue
+        category = category_cache.get(category_id)
+        if category is not None:
+            by_category.append({"id": category["id"], "name": category["name"], "count": count})
+    stats.setdefault('uncategorized', 0)
+    stats['by_category'] = sorted(by_category, key=lambda row: row["id"])
+    return Response(stats, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_tasks(request):
+    """
+    Delta sync: the user's tasks and comments changed since ``?cursor=``, plus
+    ids of deleted tasks, comments and categories.
+
+    Start without a cursor, then pass back ``cursor`` from each response;
+    repeat at once while ``has_more``. Answers 410 when the cursor is older
+    than the kept deletions, meaning the client must start over.
+    """
+    try:
+        tasks, comments, tombstones, cursor, has_more = changes_since(
+            request.user, task_queryset(request, comment_preview=0),  # Comments come separately
+            request.query_params.get('cursor'), sync_limit(request.query_params.get('limit')),
+        )
+    except InvalidCursor as e:
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ExpiredCursor as e:
+        return Response({"detail": str(e)}, status=status.HTTP_410_GONE)
+
+    return Response({
+        "cursor": cursor,
+        "has_more": has_more,
+        "tasks": TaskSerializer(tasks, many=True).data,
+        "comments": TaskCommentSerializer(comments, many=True).data,
+        "deleted": group_tombstones(tombstones),
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_category(request):
@@ -105,11 +314,10 @@ def list_category(request):
     """
     Retrieve all categories for the authenticated user.
     """
-    categories = Category.objects.all()
-    if not categories.exists():
+    categories = category_cache.all()
+    if not categories:
         return Response({"message": "No Category found"}, status=status.HTTP_200_OK)
-    serializer = CategorySerializer(categories, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(categories, status=status.HTTP_200_OK)
 
 @api_view(['PUT', 'PATCH'])
 @permission_classes([permissions.IsAuthenticated])
@@ -144,21 +352,23 @@ def delete_category(request, category_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@renderer_classes(TASK_LIST_RENDERERS)
 def tasks_by_category(request, category_id):
     """
     Retrieve all tasks that belong to a specific category.
     """
-    try:
-        category = Category.objects.get(id=category_id)
-    except Category.DoesNotExist:
+    if category_cache.get(category_id) is None:
         return Response({"error": "Category not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    tasks = Task.objects.filter(category=category, user=request.user)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    tasks = task_queryset(request).filter(category_id=category_id, user=request.user)
+    paginated = paginated_task_response(request, tasks)
+    if paginated is not None:
+        return paginated
+    return Response(task_list_data(request, fast_task_list.values(tasks)), status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@renderer_classes(TASK_LIST_RENDERERS)
 def tasks_filter_based_on_category(request):
     """
     Retrieve all tasks that belong to a specific category.
@@ -168,16 +378,14 @@ def tasks_filter_based_on_category(request):
     if not category_id:
         return Response({"error": "Category ID is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        category = Category.objects.get(id=category_id)
-    except Category.DoesNotExist:
+    if category_cache.get(category_id) is None:
         return Response({"error": "Category not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    tasks = Task.objects.filter(category=category, user=request.user)
-    serializer = TaskSerializer(tasks, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    tasks = task_queryset(request).filter(category_id=category_id, user=request.user)
+    return Response(task_list_data(request, fast_task_list.values(tasks)), status=status.HTTP_200_OK)
 
 @api_view(['GET'])
+@renderer_classes(TASK_LIST_RENDERERS)
 def get_due_soon_tasks(request):
     """
     Get tasks that are due today or tomorrow.
@@ -190,23 +398,23 @@ def get_due_soon_tasks(request):
 
     
     # Filter tasks that are due today or tomorrow
-    tasks_due_soon = Task.objects.filter(
+    tasks_due_soon = task_queryset(request).filter(
         due_date__gte=today_start,
         due_date__lte=tomorrow_end
     ).order_by('due_date')
 
-    serializer = TaskSerializer(tasks_due_soon, many=True)
-    return Response(serializer.data)
+    paginated = paginated_task_response(request, tasks_due_soon)
+    if paginated is not None:
+        return paginated
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def filter_tasks(request):
-    """
-    Retrieve tasks, optionally filtering by category and/or status.
+    return Response(task_list_data(request, fast_task_list.values(tasks_due_soon)))
+
+def apply_task_filters(request, tasks):
     """
-    # Start with the tasks for the authenticated user
-    tasks = Task.objects.filter(user=request.user)
+    Apply the filter_tasks query parameters to a task queryset.
 
+    Returns ``(tasks, None)`` or ``(None, error_response)`` for bad parameters.
+    """
     # Filter by category if provided
     category_id = request.query_params.get('category_id', None)
     if category_id and category_id != "undefined":
@@ -216,7 +424,7 @@ def filter_tasks(request):
     status_filter = request.query_params.get('status', None)
     if status_filter and status_filter != "undefined":
         if status_filter not in ['pending', 'in_progress', 'completed']:
-            return Response(
+            return None, Response(
                 {"detail": "Invalid status filter. Choose from: pending, in_progress, completed."},
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -229,7 +437,7 @@ def filter_tasks(request):
             due_date = timezone.datetime.strptime(due_date_filter, "%Y-%m-%d").date()
             tasks = tasks.filter(due_date=due_date)
         except ValueError:
-            return Response(
+            return None, Response(
                 {"detail": "Invalid date format. Use YYYY-MM-DD."},
                 status=status.HTTP_400_BAD_REQUEST
             )
@@ -241,10 +449,34 @@ def filter_tasks(request):
         tomorrow = now + timezone.timedelta(days=1)
         tasks = tasks.filter(due_date__gte=now.date(), due_date__lte=tomorrow.date())
 
+    return tasks, None
+
+def filtered_task_list_validators(request):
+    _, error = apply_task_filters(request, Task.objects.filter(user=request.user))
+    if error is not None:
+        return None  # Let the view report the bad parameters
+    return list_validators(request, 'filter_tasks')
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(TASK_LIST_RENDERERS)
+@cached_task_list
+@conditional_get(filtered_task_list_validators)
+def filter_tasks(request):
+    """
+    Retrieve tasks, optionally filtering by category and/or status.
+    """
+    # Start with the tasks for the authenticated user
+    tasks, error = apply_task_filters(request, task_queryset(request).filter(user=request.user))
+    if error is not None:
+        return error
+
+    paginated = paginated_task_response(request, tasks)
+    if paginated is not None:
+        return paginated
+
     # Serialize the filtered task data
-    serializer = TaskSerializer(tasks, many=True)
-    
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(task_list_data(request, fast_task_list.values(tasks)), status=status.HTTP_200_OK)
 
 @api_view(['PATCH'])
 @permission_classes([permissions.IsAuthenticated])
@@ -252,24 +484,27 @@ def assign_unassign_task(request, task_id):
     """
     Assign or unassign a task to a user.
     """
-    print("taskid: ",task_id )
+    log_sampled(logger, "assign_unassign_task", user_id=request.user.id, task_id=task_id)
     try:
-        task = Task.objects.get(id=task_id)  # Fetch the task
+        task = task_queryset(request).get(id=task_id)  # Fetch the task
     except Task.DoesNotExist:
         return Response({"detail": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
 
     # Check if the user is the task owner or an admin (permission check)
-    if task.user != request.user and not request.user.is_staff:
+    if task.user_id != request.user.id and not request.user.is_staff:
         return Response({"detail": "You do not have permission to modify this task."},
                         status=status.HTTP_403_FORBIDDEN)
 
     # Get the user to assign or unassign from request data
     user_id = request.data.get("user_id", None)
     
+    previous_assignee_id = task.assigned_to_id
+
     # Handle unassignment if no user_id is provided
     if user_id is None:
         task.assigned_to = None
         task.save()
+        invalidate_user_task_lists(previous_assignee_id)
         # Return task data after unassigning
         return Response(TaskSerializer(task).data, status=status.HTTP_200_OK)
     
@@ -282,41 +517,45 @@ def assign_unassign_task(request, task_id):
     # If task is already assigned, you might want to handle the replacement logic (optional)
     task.assigned_to = assigned_user
     task.save()
+    invalidate_user_task_lists(previous_assignee_id)
 
     # Return task data after assignment
     return Response(TaskSerializer(task).data, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@renderer_classes(TASK_LIST_RENDERERS)
+@cached_task_list
 def get_assigned_tasks(request):
     """
     Get the list of tasks assigned to the currently authenticated user.
     """
     # Get the tasks assigned to the logged-in user
-    tasks = Task.objects.filter(assigned_to=request.user)
+    tasks = task_queryset(request).filter(assigned_to=request.user)
 
-    # Serialize the tasks
-    serializer = TaskSerializer(tasks, many=True)
+    paginated = paginated_task_response(request, tasks)
+    if paginated is not None:
+        return paginated
 
-    return Response(serializer.data)
+    # Serialize the tasks
+    return Response(task_list_data(request, fast_task_list.values(tasks)))
 
 
 @api_view(['GET', 'POST'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get(task_comment_validators)
 def task_comments(request, task_id):
     """
-    Retrieve all comments for a task or add a new comment.
+    Retrieve a task's comments (cursor-paginated, newest first) or add a new comment.
     """
     try:
-        task = Task.objects.get(id=task_id)
+        task = Task.objects.defer('search_vector').get(id=task_id)
     except Task.DoesNotExist:
         return Response({"error": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        # Get all comments for the task
-        comments = TaskComment.objects.filter(task=task).order_by("-timestamp")
-        serializer = TaskCommentSerializer(comments, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        comments = TaskComment.objects.filter(task=task).select_related('user')
+        return paginated_comment_response(request, comments)
 
     elif request.method == 'POST':
         # Create a new comment
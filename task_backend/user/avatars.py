@@ -0,0 +1,137 @@
+import hashlib
+import io
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.views.static import serve
+from PIL import Image, ImageOps
+
+from .models import UserProfile
+
+# Avatars are stored by content: an upload is saved once under its SHA-256
+# (see models.user_avatar_upload_path) and a Celery task renders square WebP
+# thumbnails next to it. Clients are served the smallest thumbnail that fits,
+# never the multi-megabyte original, and since a path never changes content
+# the files can be cached for good.
+
+
+def avatar_sizes():
+    return sorted(getattr(settings, 'AVATAR_SIZES', (32, 64, 128, 256)))
+
+
+def max_upload_bytes():
+    return getattr(settings, 'AVATAR_MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+
+
+def content_hash(file):
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_name(digest, size):
+    return f'avatars/{digest[:2]}/{digest}/{size}.webp'
+
+
+def variant_url(profile, size=None):
+    """
+    URL of the profile's smallest thumbnail at least ``size`` pixels wide
+    (``AVATAR_DEFAULT_SIZE`` if not given; the largest if none is), the
+    original while thumbnails are being rendered, None without an avatar.
+    """
+    if not profile.avatar:
+        return None
+    if not profile.avatar_variants:
+        return profile.avatar.url
+    size = size or getattr(settings, 'AVATAR_DEFAULT_SIZE', 64)
+    sizes = sorted(profile.avatar_variants)
+    fitting = next((variant for variant in sizes if variant >= size), sizes[-1])
+    return default_storage.url(variant_name(profile.avatar_hash, fitting))
+
+
+def store_avatar(profile, upload):
+    """
+    Make ``upload`` the profile's avatar, stored once per distinct content.
+    If the same image was uploaded before, its thumbnails are reused;
+    otherwise they are rendered in the background after the transaction
+    commits. Saves the profile.
+    """
+    digest = content_hash(upload)
+    profile.avatar_hash = digest
+    name = UserProfile._meta.get_field('avatar').generate_filename(profile, upload.name)
+    if default_storage.exists(name):
+        profile.avatar.name = name
+    else:
+        profile.avatar.save(upload.name, upload, save=False)
+    sizes = avatar_sizes()
+    done = all(default_storage.exists(variant_name(digest, size)) for size in sizes)
+    profile.avatar_variants = sizes if done else []
+    profile.save()
+    if not done:
+        transaction.on_commit(lambda: _queue(profile.id))
+
+
+def _queue(profile_id):
+    try:
+        process_avatar.delay(profile_id)
+    except Exception as e:
+        # The avatar still works (the original is served); the sweep renders it later
+        logging.warning(f"Could not queue avatar processing for profile {profile_id}: {e}")
+
+
+def render_variants(digest, source):
+    """Write the missing thumbnails of the image ``source`` (a readable file); returns the sizes."""
+    sizes = avatar_sizes()
+    missing = [size for size in sizes if not default_storage.exists(variant_name(digest, size))]
+    if not missing:
+        return sizes
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        quality = getattr(settings, 'AVATAR_QUALITY', 85)
+        for size in missing:
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, 'WEBP', quality=quality)
+            default_storage.save(variant_name(digest, size), ContentFile(buffer.getvalue()))
+    return sizes
+
+
+@shared_task
+def process_avatar(profile_id):
+    """Render the thumbnails of a profile's avatar, unless they exist or it changed meanwhile."""
+    profile = UserProfile.objects.filter(id=profile_id).first()
+    if profile is None or not profile.avatar or profile.avatar_variants:
+        return
+    with profile.avatar.open('rb') as source:
+        digest = profile.avatar_hash or content_hash(source)  # Uploaded before avatars were hashed
+        sizes = render_variants(digest, source)
+    # Only if it is still the same avatar; a newer upload has its own job
+    UserProfile.objects.filter(id=profile_id, avatar=profile.avatar.name).update(
+        avatar_hash=digest, avatar_variants=sizes)
+
+
+@shared_task
+def process_pending_avatars():
+    """Render avatars whose job was lost (e.g. the broker was down at upload time)."""
+    pending = UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True).filter(avatar_variants=[])
+    for profile_id in pending.values_list('id', flat=True).iterator():
+        try:
+            process_avatar(profile_id)
+        except Exception:
+            logging.exception(f"Failed to process the avatar of profile {profile_id}.")
+
+
+def serve_avatar(request, path, document_root=None):
+    """``django.views.static.serve`` for avatar files, which never change, with long-lived cache headers."""
+    response = serve(request, path, document_root=document_root)
+    max_age = getattr(settings, 'AVATAR_CACHE_MAX_AGE', 365 * 24 * 3600)
+    response['Cache-Control'] = f"public, max-age={max_age}, immutable"
+    return response
@@ -0,0 +1,114 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Authenticated users are cached under a per-user version ("token version").
+# Saving the user, changing their password or logging out bumps it, so a
+# stale copy is never read again and simply ages out.
+VERSION_KEY = "auth-user-version:{}"
+ENTRY_KEY = "auth-user:{user_id}:{version}"
+
+# What authentication and permission checks read. Entries hold these plus the
+# token version (the digest simplejwt's revoke claim carries), never the
+# password hash; any other field is loaded from the database on first access.
+CACHED_FIELDS = ("id", "email", "is_active", "is_staff", "is_superuser")
+
+
+def get_cache():
+    return caches[getattr(settings, "AUTH_USER_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 60)
+
+
+def _fresh_version():
+    # Never reuse a version after the counter is lost (eviction, restart)
+    return time.time_ns()
+
+
+def _entry_key(cache, user_id):
+    version_key = VERSION_KEY.format(user_id)
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, _fresh_version(), timeout=None)
+        version = cache.get(version_key)
+    return ENTRY_KEY.format(user_id=user_id, version=version)
+
+
+async def _aentry_key(cache, user_id):
+    version_key = VERSION_KEY.format(user_id)
+    version = await cache.aget(version_key)
+    if version is None:
+        await cache.aadd(version_key, _fresh_version(), timeout=None)
+        version = await cache.aget(version_key)
+    return ENTRY_KEY.format(user_id=user_id, version=version)
+
+
+def _entry(user):
+    entry = {field: getattr(user, field) for field in CACHED_FIELDS}
+    entry["token_version"] = get_md5_hash_password(user.password)
+    return entry
+
+
+def _user(entry):
+    # A saved instance with every other field deferred: reading one loads it,
+    # and save() only writes the cached fields
+    User = get_user_model()
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in CACHED_FIELDS]
+    user = User.from_db(router.db_for_read(User), names, [entry[name] for name in names])
+    user._token_version = entry["token_version"]
+    return user
+
+
+def token_version(user):
+    """The revoke-token digest of the user's password, without loading it for cached users."""
+    cached = getattr(user, "_token_version", None)
+    return cached if cached is not None else get_md5_hash_password(user.password)
+
+
+def get_user(user_id):
+    """
+    The user with this primary key, from the cache if possible.
+
+    Raises ``DoesNotExist`` like ``User.objects.get``. Missing users are not
+    cached, so a user created right after a failed lookup is found.
+    """
+    if not _timeout():
+        return get_user_model().objects.get(pk=user_id)
+    cache = get_cache()
+    key = _entry_key(cache, user_id)
+    entry = cache.get(key)
+    if entry is None:
+        user = get_user_model().objects.get(pk=user_id)
+        cache.set(key, _entry(user), timeout=_timeout())
+        return user
+    return _user(entry)
+
+
+async def aget_user(user_id):
+    """Async ``get_user``."""
+    if not _timeout():
+        return await get_user_model().objects.aget(pk=user_id)
+    cache = get_cache()
+    key = await _aentry_key(cache, user_id)
+    entry = await cache.aget(key)
+    if entry is None:
+        user = await get_user_model().objects.aget(pk=user_id)
+        await cache.aset(key, _entry(user), timeout=_timeout())
+        return user
+    return _user(entry)
+
+
+def invalidate_user(*user_ids):
+    """Forget the cached copies of these users (None ids are ignored)."""
+    cache = get_cache()
+    for user_id in {user_id for user_id in user_ids if user_id is not None}:
+        try:
+            cache.incr(VERSION_KEY.format(user_id))
+        except ValueError:
+            cache.set(VERSION_KEY.format(user_id), _fresh_version(), timeout=None)
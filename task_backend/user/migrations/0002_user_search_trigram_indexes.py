@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Trigram GIN indexes back both the prefix (ILIKE 'q%') and the fuzzy (%)
+# matches of /user/search/, as long as the prefix match is an ILIKE on the
+# bare column (user.search.ILike; Django's __istartswith wraps it in UPPER()).
+# They need pg_trgm, so they are only created on PostgreSQL; other databases
+# fall back to prefix/substring matching.
+TRIGRAM_COLUMNS = ['email', 'first_name', 'last_name']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('user', 'CustomUser')._meta.db_table
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS user_{column}_trgm_idx ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS user_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,3 +1,5 @@
+import os
+
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 
@@ -25,11 +27,17 @@ class CustomUser(AbstractUser):
         return self.email
     
 def user_avatar_upload_path(instance, filename):
-    return f'avatars/user_{instance.user.id}/{filename}'
+    # Content-addressed (see user.avatars): identical uploads share one file
+    # and its thumbnails, and a path never changes content, so it can be cached forever
+    extension = os.path.splitext(filename)[1].lower()
+    return f'avatars/{instance.avatar_hash[:2]}/{instance.avatar_hash}/original{extension}'
 
 class UserProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name="profile")
     avatar = models.ImageField(upload_to=user_avatar_upload_path, null=True, blank=True)
+    avatar_hash = models.CharField(max_length=64, blank=True, default='', editable=False)  # SHA-256 of the upload
+    # Thumbnail sizes rendered so far (user.avatars.process_avatar); empty until then
+    avatar_variants = models.JSONField(default=list, blank=True, editable=False)
     bio = models.TextField(null=True, blank=True)
     phone_number = models.CharField(max_length=15, null=True, blank=True)
     location = models.CharField(max_length=255, null=True, blank=True)
@@ -0,0 +1,91 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Lookup, Q, Value, When
+from django.db.models.functions import Greatest
+
+from .cache import get_cache
+
+SEARCH_KEY = "user-search:{}"
+SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+RESULT_FIELDS = ('id', 'email', 'first_name', 'last_name')
+
+
+def max_limit():
+    return getattr(settings, 'USER_SEARCH_MAX_LIMIT', 50)
+
+
+class ILike(Lookup):
+    """
+    ``column ILIKE pattern`` on the bare column. ``__istartswith`` compiles to
+    ``UPPER(column::text) LIKE UPPER(...)`` on PostgreSQL, which the trigram
+    indexes on the plain columns cannot serve.
+    """
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', (*lhs_params, *rhs_params)
+
+
+def _matches(query):
+    users = get_user_model().objects.all()
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.lookups import TrigramSimilar
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        # Every branch is an operator the gin_trgm_ops indexes support, so
+        # the planner ORs index scans instead of reading the whole table.
+        # Substring matches are kept whatever their similarity ("ann" finds
+        # joanna), as on other databases; similar ones add typo tolerance.
+        escaped = connection.ops.prep_for_like_query(query)
+        prefix, substring, fuzzy = Q(), Q(), Q()
+        for field in SEARCH_FIELDS:
+            prefix |= Q(ILike(F(field), escaped + '%'))
+            substring |= Q(ILike(F(field), '%' + escaped + '%'))
+            fuzzy |= Q(TrigramSimilar(F(field), query))
+        # Prefix matches first, then the closest of the rest
+        is_prefix = Case(When(prefix, then=Value(0)), default=Value(1), output_field=IntegerField())
+        similarity = Greatest(*(TrigramSimilarity(field, query) for field in SEARCH_FIELDS))
+        return users.filter(substring | fuzzy).annotate(is_prefix=is_prefix, similarity=similarity).order_by(
+            'is_prefix', '-similarity', 'email'
+        )
+
+    prefix = Q()
+    for field in SEARCH_FIELDS:
+        prefix |= Q(**{f'{field}__istartswith': query})
+    is_prefix = Case(When(prefix, then=Value(0)), default=Value(1), output_field=IntegerField())
+    # No trigram support: substring matches stand in for fuzzy ones
+    fuzzy = Q()
+    for field in SEARCH_FIELDS:
+        fuzzy |= Q(**{f'{field}__icontains': query})
+    return users.filter(fuzzy).annotate(is_prefix=is_prefix).order_by('is_prefix', 'email')
+
+
+def search_queryset(query, limit):
+    """The query ``search_users`` runs on a cache miss (see explain_task_queries)."""
+    return _matches(query.strip()).values(*RESULT_FIELDS)[:limit]
+
+
+def search_users(query, limit):
+    """
+    Up to ``limit`` users whose email or first/last name matches ``query``.
+
+    On PostgreSQL, substring and trigram-similar matches are both answered
+    from the trigram GIN indexes, so the cost does not grow with the table.
+    Results are cached for ``USER_SEARCH_CACHE_TIMEOUT`` seconds, since
+    everyone typing the same prefix asks the same question.
+    """
+    query = query.strip()
+    digest = hashlib.sha1(f'{query.lower()}:{limit}'.encode()).hexdigest()
+    cache = get_cache()
+    key = SEARCH_KEY.format(digest)
+    results = cache.get(key)
+    if results is None:
+        results = list(search_queryset(query, limit))
+        cache.set(key, results, timeout=getattr(settings, 'USER_SEARCH_CACHE_TIMEOUT', 30))
+    return results
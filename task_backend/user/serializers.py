@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 
+from .avatars import max_upload_bytes, store_avatar, variant_url
 from .models import UserProfile, CustomUser
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -50,21 +51,44 @@ class UserLoginSerializer(serializers.Serializer):
         data['user'] = user
         return data
 
+class AvatarField(serializers.Field):
+    # Reads as the URL of the smallest thumbnail that fits ?avatar_size= (see
+    # user.avatars); writes take an uploaded image, stored by update()
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', '*')
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+        self.image_field = serializers.ImageField()
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        size = None
+        if request is not None:
+            try:
+                size = int(request.query_params.get('avatar_size', ''))
+            except ValueError:
+                pass
+        url = variant_url(instance, size)
+        if url is None:
+            return None
+        return request.build_absolute_uri(url) if request else url
+
+    def to_internal_value(self, data):
+        upload = self.image_field.to_internal_value(data)
+        if upload.size > max_upload_bytes():
+            raise serializers.ValidationError(f"Avatars must be at most {max_upload_bytes() // (1024 * 1024)} MB.")
+        return {'avatar_upload': upload}
+
 class UserProfileSerializer(serializers.ModelSerializer):
-    avatar = serializers.SerializerMethodField()
+    avatar = AvatarField()
 
     class Meta:
         model = UserProfile
         fields = ['bio', 'avatar', 'phone_number', 'location']
 
-    def get_avatar(self, obj):
-        request = self.context.get('request')
-        if obj.avatar:
-            return request.build_absolute_uri(obj.avatar.url) if request else obj.avatar.url
-        return None
-    
-class UserSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = CustomUser
-        fields = ['id', 'username', 'email'] 
-
+    def update(self, instance, validated_data):
+        upload = validated_data.pop('avatar_upload', None)
+        instance = super().update(instance, validated_data)
+        if upload is not None:
+            store_avatar(instance, upload)
+        return instance
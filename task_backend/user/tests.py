@@ -1,3 +1,224 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from unittest.mock import patch
+from unittest import skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .avatars import process_avatar, serve_avatar, variant_name
+from .cache import CACHED_FIELDS, ENTRY_KEY, VERSION_KEY, get_user
+from .models import UserProfile
+from .search import search_queryset
+
+
+class CachedJWTAuthenticationTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email="cached@gmail.com", password="password123")
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def get_categories(self):
+        # Count only user lookups; list_category may reload the category cache when its TTL runs out
+        user_table = get_user_model()._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/task/categories/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sum(user_table in query["sql"] for query in queries)
+
+    def test_hot_user_needs_no_queries(self):
+        """Test that a repeat request authenticates from the cache"""
+        self.get_categories()
+        self.assertEqual(self.get_categories(), 0)
+        self.assertEqual(self.client.get("/task/async/").status_code, status.HTTP_200_OK)
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        """Test that deactivating a cached user takes effect on the next request"""
+        self.get_categories()
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get("/task/categories/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_invalidates_the_cache(self):
+        """Test that logging out drops the cached user"""
+        self.get_categories()
+        response = self.client.post("/user/logout/", {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.get_categories(), 1)
+        self.assertEqual(self.get_categories(), 0)
+
+    def test_cache_holds_no_password_hash(self):
+        """Test that cached users carry the auth fields and token version, not the password hash"""
+        self.get_categories()
+        version = cache.get(VERSION_KEY.format(self.user.id))
+        entry = cache.get(ENTRY_KEY.format(user_id=self.user.id, version=version))
+        self.assertEqual(set(entry), set(CACHED_FIELDS) | {"token_version"})
+        self.assertNotIn(self.user.password, entry.values())
+
+        with self.assertNumQueries(0):
+            user = get_user(self.user.id)
+            self.assertEqual((user.pk, user.email, user.is_active), (self.user.pk, self.user.email, True))
+        with self.assertNumQueries(1):  # Anything else is loaded on first access
+            self.assertEqual(user.password, self.user.password)
+
+    def test_revoked_token_check_uses_cached_token_version(self):
+        """Test that the password-change check works from the cache and rejects old tokens"""
+        with patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            token = RefreshToken.for_user(self.user).access_token
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.get_categories()
+            self.assertEqual(self.get_categories(), 0)
+
+            self.user.set_password("changed-password")
+            self.user.save()
+            response = self.client.get("/task/categories/")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserSearchTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.me = User.objects.create_user(email="searcher@gmail.com", password="password123")
+        User.objects.create_user(email="anna.smith@gmail.com", password="password123", first_name="Anna")
+        User.objects.create_user(email="bob@example.com", password="password123", first_name="Bob",
+                                 last_name="Annapolis")
+        User.objects.create_user(email="joanna@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.me)
+
+    def test_prefix_matches_come_first(self):
+        """Test that prefix matches on email or names rank above substring matches"""
+        response = self.client.get("/user/search/", {"q": "ann"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user["email"] for user in response.data],
+                         ["anna.smith@gmail.com", "bob@example.com", "joanna@gmail.com"])
+        self.assertEqual(set(response.data[0]), {"id", "email", "first_name", "last_name"})
+
+    def test_limit_and_cache(self):
+        """Test that results are capped by limit and cached briefly"""
+        response = self.client.get("/user/search/", {"q": "ANN", "limit": 1})
+        self.assertEqual([user["email"] for user in response.data], ["anna.smith@gmail.com"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/user/search/", {"q": "ann", "limit": 1})
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(response.data), 1)
+
+    def test_bad_parameters(self):
+        """Test that an empty query or a bad limit is rejected"""
+        self.assertEqual(self.client.get("/user/search/").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/user/search/", {"q": "a", "limit": "x"}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/user/search/", {"q": "a", "limit": 0}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_like_wildcards_are_literal(self):
+        """Test that % and _ in the query match themselves, not anything"""
+        self.assertEqual(self.client.get("/user/search/", {"q": "%"}).data, [])
+
+    @skipUnless(connection.vendor == "postgresql", "The trigram indexes are PostgreSQL only")
+    def test_search_is_answered_from_the_trigram_indexes(self):
+        """Test that the substring and fuzzy matches can both use the GIN indexes, with no table scan"""
+        queryset = search_queryset("ann", 10)
+        self.assertNotIn("UPPER(", str(queryset.query))  # A bare-column ILIKE
+        with connection.cursor() as cursor:
+            # The test table is tiny; ask whether the indexes can serve the query, not whether they pay off
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = queryset.explain()
+
+        self.assertNotIn("Seq Scan", plan)
+        for column in ("email", "first_name", "last_name"):
+            self.assertIn(f"user_{column}_trgm_idx", plan)
+
+
+class AvatarTestCase(APITestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_settings = self.settings(MEDIA_ROOT=self.media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.user = get_user_model().objects.create_user(email="avatar@gmail.com", password="password123")
+        self.client.force_authenticate(user=self.user)
+
+    def image(self, color="red", size=(600, 400)):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, color).save(buffer, "PNG")
+        return SimpleUploadedFile("me.png", buffer.getvalue(), content_type="image/png")
+
+    def upload(self, image, **params):
+        # Runs the processing job inline, as a worker would after the commit
+        with patch.object(process_avatar, "delay", side_effect=process_avatar) as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch("/user/profile/" + ("?" + urlencode(params) if params else ""),
+                                         {"avatar": image}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, delay
+
+    def test_upload_is_resized_in_the_background(self):
+        """Test that an upload gets square thumbnails and the smallest fitting one is served"""
+        response, delay = self.upload(self.image())
+
+        delay.assert_called_once()
+        self.assertIn("/original.png", response.data["avatar"])  # Thumbnails were not rendered yet
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.avatar_variants, [32, 64, 128, 256])
+        with Image.open(default_storage.open(variant_name(profile.avatar_hash, 128))) as thumbnail:
+            self.assertEqual((thumbnail.format, thumbnail.size), ("WEBP", (128, 128)))
+
+        self.assertTrue(self.client.patch("/user/profile/", {"bio": "Hi"}).data["avatar"].endswith("/64.webp"))
+        self.assertTrue(self.client.patch("/user/profile/?avatar_size=100", {}).data["avatar"].endswith("/128.webp"))
+        self.assertTrue(self.client.patch("/user/profile/?avatar_size=999", {}).data["avatar"].endswith("/256.webp"))
+
+    def test_identical_uploads_share_files(self):
+        """Test that the same image uploaded by another user reuses the stored original and thumbnails"""
+        self.upload(self.image("blue"))
+        other = get_user_model().objects.create_user(email="twin@gmail.com", password="password123")
+        self.client.force_authenticate(user=other)
+
+        response, delay = self.upload(self.image("blue"))
+
+        delay.assert_not_called()
+        self.assertTrue(response.data["avatar"].endswith("/64.webp"))
+        self.assertEqual(len({profile.avatar.name for profile in UserProfile.objects.all()}), 1)
+
+    def test_oversized_and_non_image_uploads_are_rejected(self):
+        """Test that avatars are validated before anything is stored"""
+        with self.settings(AVATAR_MAX_UPLOAD_BYTES=100):
+            response = self.client.patch("/user/profile/", {"avatar": self.image()}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        not_an_image = SimpleUploadedFile("me.png", b"plain text", content_type="image/png")
+        response = self.client.patch("/user/profile/", {"avatar": not_an_image}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_avatar_files_are_served_with_long_lived_cache_headers(self):
+        """Test that avatar files are cacheable for good"""
+        self.upload(self.image())
+        profile = UserProfile.objects.get(user=self.user)
+        path = variant_name(profile.avatar_hash, 64).removeprefix("avatars/")
+
+        response = serve_avatar(RequestFactory().get("/"), path, document_root=os.path.join(self.media.name, "avatars"))
+
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import user_register, user_login, user_logout, user_profile, retrieve_users
+from .views import user_register, user_login, user_logout, user_profile, search_users
 
 urlpatterns = [
     path('register/', user_register, name='user_register'),
@@ -7,5 +7,5 @@ urlpatterns = [
     path('logout/', user_logout, name='logout'),
 
     path('profile/', user_profile, name='user-profile'),
-    path('profile/get/', retrieve_users, name='user-retrieve'),
+    path('search/', search_users, name='user-search'),  # GET: ?q=<text>&limit=<n>
 ]
@@ -4,10 +4,13 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import UserProfile, CustomUser
-from .serializers import UserLoginSerializer, UserRegistrationSerializer, UserProfileSerializer, UserSerializer
+from .cache import invalidate_user
+from .models import UserProfile
+from . import search as user_search
+from .serializers import UserLoginSerializer, UserRegistrationSerializer, UserProfileSerializer
 
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
@@ -66,6 +69,7 @@ def user_logout(request):
         # Decode and blacklist the refresh token
         token = RefreshToken(refresh_token)
         token.blacklist()
+        invalidate_user(token.get(api_settings.USER_ID_CLAIM))
 
         return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
 
@@ -79,9 +83,9 @@ def user_profile(request):
     user = request.user
 
     # Ensure the user has a profile
-    profile = UserProfile.objects.get_or_create(user=user)
+    profile, _ = UserProfile.objects.get_or_create(user=user)
     if request.method in ['PUT', 'PATCH']:
-        serializer = UserProfileSerializer(profile, data=request.data, partial=True)
+        serializer = UserProfileSerializer(profile, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -89,11 +93,18 @@ def user_profile(request):
     
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def retrieve_users(request):
+def search_users(request):
     """
-    Retrieve a list of users that can be assigned tasks.
+    Typeahead search for users to assign tasks to: ?q=<text>&limit=<n>.
     """
-    users = CustomUser.objects.all()
-    serializer = UserSerializer(users, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({"detail": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(int(request.query_params.get('limit', 10)), user_search.max_limit())
+    except ValueError:
+        return Response({"detail": "limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+    if limit < 1:
+        return Response({"detail": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(user_search.search_users(query, limit), status=status.HTTP_200_OK)
     
\ No newline at end of file